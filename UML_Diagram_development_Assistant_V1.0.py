@@ -9,16 +9,29 @@
 
 import sys
 import os
+import getopt
 import re
 import time
 import json
 import uuid
+import queue
+import atexit
+import shutil
+import hashlib
+import sqlite3
+import gzip
+import threading
+import subprocess
 import datetime as dt
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from io import StringIO
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from time import perf_counter_ns
-import getopt
 
 
 
@@ -47,6 +60,25 @@ try:
 except ImportError:
     PLANTWEB_RENDERER_AVAILABLE = False
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import asyncio
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTANDARD_AVAILABLE = True
+except ImportError:
+    ZSTANDARD_AVAILABLE = False
+
 # Application Constants with Descriptive Names
 APPLICATION_TITLE = "UML Diagram Development Assistant"
 APPLICATION_VERSION = "v0.9"
@@ -93,6 +125,7 @@ API_PROVIDER_OPENAI = "OpenAI"
 API_PROVIDER_REPLICATE = "Replicate"
 API_PROVIDER_OLLAMA = "Ollama"
 API_PROVIDER_BIGMODEL = "BigModel"  # API for GLM-4
+API_PROVIDER_LLAMA_CPP = "LlamaCpp"  # In-process GGUF model
 
 # Selection Placeholders
 MODEL_SELECTION_PLACEHOLDER = '<Select Model>'
@@ -102,20 +135,174 @@ INTERPRETER_SELECTION_PLACEHOLDER = '<Select Interpreter>'
 INTERPRETER_PLANTWEB = "Plantweb"
 INTERPRETER_PLANTWEB_PLANTUML = INTERPRETER_PLANTWEB + "/PlantUML"
 INTERPRETER_PLANTWEB_GRAPHVIZ = INTERPRETER_PLANTWEB + "/Graphviz"
+INTERPRETER_LOCAL = "Local"
+INTERPRETER_LOCAL_PLANTUML = INTERPRETER_LOCAL + "/PlantUML"
+
+# Local PlantUML Worker Pool Configuration
+LOCAL_PLANTUML_JAVA_EXECUTABLE = os.environ.get("PLANTUML_JAVA", "java")
+LOCAL_PLANTUML_JAR_PATH = os.environ.get("PLANTUML_JAR", "plantuml.jar")
+LOCAL_PLANTUML_POOL_SIZE = 2
+LOCAL_PLANTUML_REQUEST_TIMEOUT_S = 30
+LOCAL_PLANTUML_RECYCLE_AFTER_RENDERS = 500
+LOCAL_PLANTUML_PIPE_DELIMITER = "___UML_GEN_RENDER_END___"
+LOCAL_PLANTUML_WARM_UP_DIAGRAM = "@startuml\nclass WarmUp\n@enduml"
+LOCAL_PLANTUML_RESPAWN_BACKOFF_S = 1.0
+LOCAL_PLANTUML_RESPAWN_MAX_BACKOFF_S = 60.0
+
+# Diagram Model Configuration
+DIAGRAM_MODEL_CACHE_MAX_ENTRIES = 64
+CORE_CLASSES_TOP_FRACTION = 0.3
+CORE_CLASSES_MIN_COUNT = 5
+CORE_CLASSES_MAX_COUNT = 200
+PAGERANK_DAMPING_FACTOR = 0.85
+PAGERANK_MAX_ITERATIONS = 100
+PAGERANK_TOLERANCE = 1e-8
+CLASS_NEIGHBORHOOD_DEFAULT_HOPS = 1
+CLASS_NEIGHBORHOOD_MAX_HOPS = 10
+PLANTUML_SIMPLE_NAME_PATTERN = re.compile(r'[\w.$]+')
+PLANTUML_MEMBER_SEPARATORS = ("--", "..", "==", "__")
+PLANTUML_CLASSIFIER_HEADER_PATTERN = re.compile(
+    r'^(?P<kind>abstract\s+class|abstract|class|interface|enum)\s+'
+    r'(?P<name>"[^"]+"|[\w.$]+)(?:\s+as\s+(?P<alias>[\w.$]+))?'
+    r'(?P<rest>[^{]*)(?P<body>\{.*)?$'
+)
+PLANTUML_PACKAGE_PATTERN = re.compile(r'^(?:package|namespace)\s+(?P<name>"[^"]+"|[\w.$:]+)?[^{]*\{\s*$')
+PLANTUML_RELATIONSHIP_PATTERN = re.compile(
+    r'^(?P<left>"[^"]+"|[\w$]+(?:\.[\w$]+)*)\s*(?:"[^"]*"\s*)?'
+    r'(?P<arrow>(?:<\||<|\*|o(?=[-.])|\+|#|x(?=[-.])|\})?[-.]+'
+    r'(?:(?:\[[^\]]*\]|up|down|left|right|[udlr])[-.]+)?'
+    r'(?:\|>|>|\*|o(?=[\s"])|\+|#|x(?=[\s"])|\{)?)'
+    r'\s*(?:"[^"]*"\s*)?(?P<right>"[^"]+"|[\w$]+(?:\.[\w$]+)*)\s*(?::\s*(?P<label>.*))?$'
+)
+
+# PlantUML Syntax Correction Configuration
+PLANTUML_DISABLED_CORRECTION_RULES = [
+    rule_name.strip() for rule_name in os.environ.get("PLANTUML_DISABLED_CORRECTION_RULES", "").split(",")
+    if rule_name.strip()
+]
+
+# Batch Rendering Configuration
+BATCH_RENDER_MAX_WORKERS = 8
+
+# Speculative Projection Rendering Configuration
+SPECULATIVE_RENDER_MAX_WORKERS = 2
+
+# Streaming Diagram Detection Configuration
+STREAMING_RENDER_MAX_WORKERS = 2
+STREAMING_PREVIEW_INTERVAL_S = 1.5
+STREAMING_PREVIEW_MIN_LINES = 3
 
 # Interpreter Default Parameters
 INTERPRETER_DEFAULT_PARAMETERS = {
     INTERPRETER_PLANTWEB_PLANTUML: {
         'Output format': ['SVG', 'PNG'],
-        'Use cache': False
+        'Use cache': True
     },
     INTERPRETER_PLANTWEB_GRAPHVIZ: {
         'Output format': ['SVG', 'PNG'],
-        'Use cache': False
+        'Use cache': True
+    },
+    INTERPRETER_LOCAL_PLANTUML: {
+        'Output format': ['SVG', 'PNG'],
+        'Use cache': True,
+        'PlantUML jar': LOCAL_PLANTUML_JAR_PATH,
+        'Pool size': LOCAL_PLANTUML_POOL_SIZE,
+        'Request timeout (s)': LOCAL_PLANTUML_REQUEST_TIMEOUT_S,
+        'Recycle after renders': LOCAL_PLANTUML_RECYCLE_AFTER_RENDERS
     },
     # Can add more interpreter options here
 }
 
+# Conversation Log Configuration
+CONVERSATION_LOG_ROOT_DIRECTORY = "uml_generator_logs"
+CONVERSATION_LOG_SHARD_DIRECTORY = "conversations"
+CONVERSATION_LOG_FORMAT = "uml-gen-conversation-log"
+CONVERSATION_LOG_FORMAT_VERSION = 1
+CONVERSATION_LOG_SECTIONS = ("llm_configurations", "int_configurations", "conversation")
+CONVERSATION_LOG_FSYNC_POLICIES = ("always", "interval", "never")
+CONVERSATION_LOG_FSYNC_POLICY = os.environ.get("UML_LOG_FSYNC_POLICY", "interval")
+CONVERSATION_LOG_FSYNC_INTERVAL_S = 1.0
+CONVERSATION_STORAGE_BACKENDS = ("jsonl", "sqlite")
+CONVERSATION_STORAGE_BACKEND = os.environ.get("UML_CONVERSATION_STORAGE", "jsonl")
+CONVERSATION_DATABASE_PATH = os.path.join(CONVERSATION_LOG_ROOT_DIRECTORY, "conversations.sqlite3")
+ARTIFACT_BLOB_DIRECTORY = os.path.join(CONVERSATION_LOG_ROOT_DIRECTORY, "blobs")
+ARTIFACT_BLOB_FIELDS = ("int_input", "int_output")
+# Rendered output is large and repeats; diagram code stays inline so it remains searchable
+ARTIFACT_DEDUPLICATED_FIELDS = ("int_output",)
+ARTIFACT_BLOB_ZSTD_LEVEL = 10
+ARTIFACT_BLOB_GZIP_LEVEL = 6
+CONVERSATION_WRITER_QUEUE_SIZE = 1024
+CONVERSATION_WRITER_BATCH_SIZE = 64
+CONVERSATION_WRITER_FLUSH_INTERVAL_S = 0.5
+CONVERSATION_WRITER_SUBMIT_TIMEOUT_S = 5.0
+CONVERSATION_WRITER_FLUSH_TIMEOUT_S = 10.0
+
+# Conversation Log Retention Configuration
+RETENTION_MAX_TOTAL_BYTES = 2 * 1024 * 1024 * 1024
+RETENTION_MAX_CONVERSATION_BYTES = 128 * 1024 * 1024
+RETENTION_MAX_AGE_DAYS = 30
+RETENTION_SWEEP_INTERVAL_S = 900
+RETENTION_ACTIVE_GRACE_S = 3600  # Conversations written to this recently are never evicted
+RETENTION_BLOB_GRACE_S = 3600  # Unreferenced blobs this new may belong to a log record still being written
+
+# Render Cache Configuration
+RENDER_CACHE_DIRECTORY = "uml_render_cache"
+RENDER_CACHE_MAX_MEMORY_ENTRIES = 128
+RENDER_CACHE_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+# HTTP Session Pool Configuration
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+HTTP_CONNECT_TIMEOUT_S = 5
+HTTP_READ_TIMEOUT_S = 120
+HTTP_RETRY_TOTAL = 3
+HTTP_RETRY_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Async Language Model Client Configuration
+OPENAI_COMPATIBLE_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1/")
+ASYNC_LLM_MAX_CONCURRENCY = {
+    API_PROVIDER_BIGMODEL: 4,
+    API_PROVIDER_OPENAI: 4,
+    API_PROVIDER_OLLAMA: 2
+}
+
+# LLM Response Cache Configuration
+LLM_RESPONSE_CACHE_PATH = "uml_llm_response_cache.sqlite3"
+LLM_RESPONSE_CACHE_TTL_S = 7 * 24 * 3600
+LLM_RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LLM_RESPONSE_CACHE_REPLAY_CHUNK_CHARS = 64
+
+# Conversation Context Compaction Configuration
+CONTEXT_TOKEN_BUDGET = 6000
+CONTEXT_RECENT_TURNS = 3
+CONTEXT_STUB_PREVIEW_CHARS = 160
+
+# Ollama Session Configuration
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+OLLAMA_KEEP_ALIVE = "30m"
+# Ollama only loads the model for an empty prompt, so prefix evaluation sends a minimal one
+OLLAMA_PREFIX_PROMPT = " "
+
+# In-Process llama.cpp Configuration
+LLAMA_CPP_MODEL_PATH = os.environ.get("LLAMA_CPP_MODEL_PATH", "models/model.gguf")
+LLAMA_CPP_N_THREADS = os.cpu_count() or 4
+LLAMA_CPP_N_CTX = 4096
+LLAMA_CPP_USE_MMAP = True
+LLAMA_CPP_USE_MLOCK = False
+LLAMA_CPP_MAX_TOKENS = 2048
+LLAMA_CPP_GENERATION_PARAMETERS = ("temperature", "top_p", "top_k", "max_tokens", "repeat_penalty", "stop")
+
+# Provider Race Configuration
+RACE_HEDGE_DELAY_MS = 1500
+RACE_TTFT_HISTORY_SIZE = 50
+# Sampling settings that racing providers take over from the selected model; everything else is per provider
+RACE_SHARED_MODEL_PARAMETERS = ("temperature", "top_p")
+
+# Streaming Response Display Configuration
+STREAM_FLUSH_INTERVAL_MS = 50
+STREAM_FLUSH_SIZE_CHARS = 512
+
 # Default API Configuration
 DEFAULT_API_CONFIGURATION = {
     "api_key": {
@@ -129,6 +316,94 @@ DEFAULT_API_CONFIGURATION = {
     "model_name": {
         "value": "glm-4-plus",
         "description": "Model name, obtained from the interface platform, must be set correctly when using the online interface."
+    },
+    "stream_flush_interval_ms": {
+        "value": STREAM_FLUSH_INTERVAL_MS,
+        "description": "Longest time streamed response text is buffered before the chat view is updated, in milliseconds."
+    },
+    "use_async_client": {
+        "value": False,
+        "description": "Stream BigModel, Ollama and OpenAI answers through the shared asyncio client instead of blocking requests."
+    },
+    "use_response_cache": {
+        "value": False,
+        "description": "Replay identical prompts from a local cache. Only used when the temperature is 0."
+    },
+    "context_token_budget": {
+        "value": CONTEXT_TOKEN_BUDGET,
+        "description": "Estimated prompt tokens above which older conversation turns are replaced with short stubs."
+    },
+    "context_recent_turns": {
+        "value": CONTEXT_RECENT_TURNS,
+        "description": "Number of recent user/assistant turns that are always sent verbatim."
+    },
+    "ollama_base_url": {
+        "value": OLLAMA_BASE_URL,
+        "description": "Address of the Ollama server used by the Ollama models."
+    },
+    "ollama_keep_alive": {
+        "value": OLLAMA_KEEP_ALIVE,
+        "description": "How long Ollama keeps the model loaded after a request, for example 30m, 1h or -1m for always."
+    },
+    "llama_cpp_model_path": {
+        "value": LLAMA_CPP_MODEL_PATH,
+        "description": "Path of the GGUF model file loaded by the in-process llama.cpp provider."
+    },
+    "llama_cpp_n_threads": {
+        "value": LLAMA_CPP_N_THREADS,
+        "description": "CPU threads used by llama.cpp for generation."
+    },
+    "llama_cpp_n_ctx": {
+        "value": LLAMA_CPP_N_CTX,
+        "description": "Context window of the llama.cpp model, in tokens."
+    },
+    "llama_cpp_use_mmap": {
+        "value": LLAMA_CPP_USE_MMAP,
+        "description": "Memory-map the model file instead of reading it into memory."
+    },
+    "llama_cpp_use_mlock": {
+        "value": LLAMA_CPP_USE_MLOCK,
+        "description": "Lock the model in RAM so it is never swapped out."
+    },
+    "conversation_storage_backend": {
+        "value": CONVERSATION_STORAGE_BACKEND,
+        "description": "Where conversations are stored: JSON Lines log files per conversation, or one indexed SQLite database."
+    },
+    "deduplicate_artifacts": {
+        "value": True,
+        "description": "Store rendered diagrams once per distinct content, compressed, and reference them from the log by SHA-256 digest; diagram code stays inline."
+    },
+    "retention_max_total_mb": {
+        "value": RETENTION_MAX_TOTAL_BYTES // (1024 * 1024),
+        "description": "Size cap of the conversation log directory; the least recently used conversations are removed above it."
+    },
+    "retention_max_conversation_mb": {
+        "value": RETENTION_MAX_CONVERSATION_BYTES // (1024 * 1024),
+        "description": "Size cap of one conversation; its least recently used content files are removed above it."
+    },
+    "retention_max_age_days": {
+        "value": RETENTION_MAX_AGE_DAYS,
+        "description": "Conversations not written to for this many days are deleted."
+    },
+    "background_log_writes": {
+        "value": True,
+        "description": "Persist conversation logs and content files on a background writer thread instead of while responding."
+    },
+    "log_fsync_policy": {
+        "value": CONVERSATION_LOG_FSYNC_POLICY,
+        "description": "When conversation log records are forced to disk: after every record, at most once per second, or left to the OS."
+    },
+    "race_models": {
+        "value": [],
+        "description": "Additional models that race the selected model; the first to stream a token answers."
+    },
+    "race_hedge_delay_ms": {
+        "value": RACE_HEDGE_DELAY_MS,
+        "description": "Time to wait for a first token before the next racing model is started, in milliseconds."
+    },
+    "stream_flush_size_chars": {
+        "value": STREAM_FLUSH_SIZE_CHARS,
+        "description": "Number of buffered response characters that triggers an immediate chat view update."
     }
 }
 
@@ -202,6 +477,564 @@ MSG_FORMAT_INIT = MESSAGE_FORMAT_INITIAL
 MSG_FORMAT_PROMPT = MESSAGE_FORMAT_PROMPT
 
 
+class UMLMember:
+    """A single attribute or operation line inside a classifier body."""
+
+    __slots__ = ("text", "visibility", "is_method")
+
+    def __init__(self, text, visibility, is_method):
+        self.text = text
+        self.visibility = visibility
+        self.is_method = is_method
+
+
+class UMLClassifier:
+    """A class, abstract class, interface or enum declared in the diagram."""
+
+    __slots__ = ("name", "kind", "display_name", "stereotype", "package", "members")
+
+    def __init__(self, name, kind, display_name=None, stereotype=None, package=None):
+        self.name = name
+        self.kind = kind
+        self.display_name = display_name
+        self.stereotype = stereotype
+        self.package = package
+        self.members = []
+
+    def reference(self):
+        """Return the PlantUML reference for this classifier, quoting or aliasing as needed."""
+        if self.display_name:
+            return f'"{self.display_name}" as {self.name}'
+        if PLANTUML_SIMPLE_NAME_PATTERN.fullmatch(self.name):
+            return self.name
+        return f'"{self.name}"'
+
+    def declaration(self, with_body=True):
+        """Return a detail-free declaration line for projections."""
+        return f"{self.kind} {self.reference()} {{}}" if with_body else f"{self.kind} {self.reference()}"
+
+
+class UMLPackage:
+    """A package or namespace grouping classifiers."""
+
+    __slots__ = ("name", "parent", "classifier_names")
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.classifier_names = []
+
+
+class UMLRelationship:
+    """
+    A typed edge between two classifiers.
+
+    Inheritance and realization edges point from child to parent, composition and
+    aggregation edges from the whole to the part, and associations and dependencies
+    in the direction of the arrow.
+    """
+
+    __slots__ = ("source", "target", "kind", "label", "source_line")
+
+    def __init__(self, source, target, kind, label, source_line):
+        self.source = source
+        self.target = target
+        self.kind = kind
+        self.label = label
+        self.source_line = source_line
+
+
+class UMLSourceSegment:
+    """
+    One top-level statement of the source: a classifier with its body, a relationship,
+    a block boundary or an ignored line.
+
+    Segments only depend on their own lines and the enclosing package path, which is
+    what lets an edit re-parse the segments it touches and keep all the others.
+    """
+
+    __slots__ = ("line_count", "package_path", "classifier", "relationships", "block_action", "block_name")
+
+    def __init__(self, package_path):
+        self.line_count = 1
+        self.package_path = package_path
+        self.classifier = None
+        self.relationships = ()
+        self.block_action = None
+        self.block_name = None
+
+    def package_path_after(self):
+        """Return the enclosing package path for the statement that follows this one."""
+        if self.block_action == "open":
+            return self.package_path + (self.block_name,)
+        if self.block_action == "close" and self.package_path:
+            return self.package_path[:-1]
+        return self.package_path
+
+
+class UMLDiagramModel:
+    """Intermediate representation of a PlantUML class diagram."""
+
+    __slots__ = ("classifiers", "relationships", "packages", "source_lines", "segments", "segment_starts")
+
+    def __init__(self, source_lines=None, segments=None):
+        self.classifiers = {}
+        self.relationships = []
+        self.packages = {}
+        self.source_lines = source_lines or []
+        self.segments = segments or []
+        self.segment_starts = []
+
+    def relationships_of_kind(self, *relationship_kinds):
+        """Return the relationships whose kind is one of the given kinds, in source order."""
+        return [relationship for relationship in self.relationships if relationship.kind in relationship_kinds]
+
+    def classifiers_of_kind(self, *classifier_kinds):
+        """Return the classifiers whose kind is one of the given kinds, in declaration order."""
+        return [classifier for classifier in self.classifiers.values() if classifier.kind in classifier_kinds]
+
+
+class PlantUMLParser:
+    """
+    Line-oriented parser that turns PlantUML class diagram code into a UMLDiagramModel.
+
+    Each line is classified once as a directive, classifier header, member, package
+    boundary or relationship, and relationship arrows are typed from their heads
+    and line style rather than by substring checks.
+    """
+
+    def parse(self, diagram_code):
+        """Parse diagram code into a new UMLDiagramModel."""
+        source_lines = diagram_code.split('\n')
+        segments = [segment for segment, _, _ in self.iterate_segments(source_lines, 0, ())]
+        return self.assemble_model(source_lines, segments)
+
+    def reparse(self, previous_model, source_lines):
+        """
+        Build the model for edited source lines from the model of the previous version.
+
+        Only the segments overlapping the edited line range are parsed again; parsing
+        stops as soon as it lines up with an unchanged segment boundary in the same
+        package context, and the untouched segments are reused as they are.
+        """
+        previous_lines = previous_model.source_lines
+        previous_segments = previous_model.segments
+        if not previous_segments:
+            return self.parse('\n'.join(source_lines))
+
+        # Locate the edited range by trimming the common prefix and suffix
+        common_prefix = 0
+        shortest_length = min(len(previous_lines), len(source_lines))
+        while common_prefix < shortest_length and previous_lines[common_prefix] == source_lines[common_prefix]:
+            common_prefix += 1
+        common_suffix = 0
+        while (common_suffix < shortest_length - common_prefix
+               and previous_lines[-1 - common_suffix] == source_lines[-1 - common_suffix]):
+            common_suffix += 1
+        previous_change_end = len(previous_lines) - common_suffix
+        line_delta = len(source_lines) - len(previous_lines)
+
+        first_segment = max(bisect_right(previous_model.segment_starts, common_prefix) - 1, 0)
+        start_line = previous_model.segment_starts[first_segment]
+        reparsed_segments = []
+
+        for segment, next_line, package_path in self.iterate_segments(
+                source_lines, start_line, previous_segments[first_segment].package_path):
+            reparsed_segments.append(segment)
+            previous_line = next_line - line_delta
+            if previous_line < previous_change_end:
+                continue
+            resume_segment = bisect_left(previous_model.segment_starts, previous_line)
+            if (resume_segment < len(previous_segments)
+                    and previous_model.segment_starts[resume_segment] == previous_line
+                    and previous_segments[resume_segment].package_path == package_path):
+                return self.assemble_model(source_lines, previous_segments[:first_segment] + reparsed_segments
+                                           + previous_segments[resume_segment:])
+
+        return self.assemble_model(source_lines, previous_segments[:first_segment] + reparsed_segments)
+
+    def iterate_segments(self, source_lines, line_index, package_path):
+        """Yield (segment, next line index, package path after it) from a line onwards."""
+        while line_index < len(source_lines):
+            segment = self.parse_segment(source_lines, line_index, package_path)
+            line_index += segment.line_count
+            package_path = segment.package_path_after()
+            yield segment, line_index, package_path
+
+    def parse_segment(self, source_lines, line_index, package_path):
+        """Parse the statement starting at a line into a segment."""
+        segment = UMLSourceSegment(package_path)
+        line = source_lines[line_index]
+        stripped = line.strip()
+
+        if not stripped or stripped.startswith("'") or stripped.startswith('@'):
+            return segment
+
+        header_match = PLANTUML_CLASSIFIER_HEADER_PATTERN.match(stripped)
+        if header_match:
+            self.parse_classifier(segment, header_match, source_lines, line_index)
+            return segment
+
+        if stripped.startswith('}'):
+            segment.block_action = "close"
+            return segment
+
+        package_match = PLANTUML_PACKAGE_PATTERN.match(stripped)
+        if package_match:
+            segment.block_action = "open"
+            segment.block_name = (package_match.group('name') or '').strip('"')
+            return segment
+        if stripped.endswith('{'):
+            # Other grouping blocks only need to keep the braces balanced
+            segment.block_action = "open"
+            return segment
+
+        relationship_match = PLANTUML_RELATIONSHIP_PATTERN.match(stripped)
+        if relationship_match:
+            segment.relationships = (self.build_relationship(relationship_match, line),)
+        return segment
+
+    def parse_classifier(self, segment, header_match, source_lines, line_index):
+        """Fill a segment with a classifier, its body members and edges implied by its header."""
+        kind = header_match.group('kind').split()[0]
+        kind = "abstract class" if kind == "abstract" else kind
+        name_text = header_match.group('name')
+        alias = header_match.group('alias')
+        display_name = name_text.strip('"') if alias else None
+        classifier_name = alias or name_text.strip('"')
+        header_rest = header_match.group('rest') or ''
+        stereotype_match = re.search(r'<<([^>]+)>>', header_rest)
+
+        package_name = next((name for name in reversed(segment.package_path) if name is not None), None)
+        classifier = UMLClassifier(classifier_name, kind, display_name,
+                                   stereotype_match.group(1).strip() if stereotype_match else None,
+                                   package_name)
+        segment.classifier = classifier
+
+        # Members on the header line and on following lines until the body closes
+        body_text = header_match.group('body')
+        if body_text:
+            body_depth = body_text.count('{') - body_text.count('}')
+            if body_depth <= 0:
+                self.add_member(classifier, body_text[1:].rsplit('}', 1)[0].strip())
+            else:
+                self.add_member(classifier, body_text[1:].strip())
+            while body_depth > 0 and line_index + segment.line_count < len(source_lines):
+                stripped = source_lines[line_index + segment.line_count].strip()
+                segment.line_count += 1
+                body_depth += stripped.count('{') - stripped.count('}')
+                if body_depth <= 0:
+                    self.add_member(classifier, stripped.rsplit('}', 1)[0].strip())
+                else:
+                    self.add_member(classifier, stripped)
+
+        # Inline "extends"/"implements" clauses become explicit edges
+        implied_relationships = []
+        clause_text = re.sub(r'<[^<>]*>', '', re.sub(r'<<[^>]*>>', ' ', header_rest))
+        for clause_keyword, relationship_kind, arrow in (("extends", "inheritance", "--|>"),
+                                                         ("implements", "realization", "..|>")):
+            clause_match = re.search(r'\b' + clause_keyword + r'\s+([\w.$,\s]+?)(?=\s+(?:extends|implements)\b|\s*#|\s*$)',
+                                     clause_text)
+            if not clause_match:
+                continue
+            for parent_name in clause_match.group(1).split(','):
+                parent_name = parent_name.strip()
+                if parent_name:
+                    implied_relationships.append(UMLRelationship(
+                        classifier_name, parent_name, relationship_kind, None,
+                        f"{classifier_name} {arrow} {parent_name}"))
+        segment.relationships = tuple(implied_relationships)
+
+    def assemble_model(self, source_lines, segments):
+        """Build the classifier, relationship and package indexes of a model from its segments."""
+        diagram_model = UMLDiagramModel(source_lines, segments)
+        segment_start = 0
+        for segment in segments:
+            diagram_model.segment_starts.append(segment_start)
+            segment_start += segment.line_count
+
+            if segment.block_action == "open" and segment.block_name is not None:
+                parent_name = next((name for name in reversed(segment.package_path) if name is not None), None)
+                diagram_model.packages[segment.block_name] = UMLPackage(
+                    segment.block_name, diagram_model.packages.get(parent_name))
+            if segment.classifier is not None:
+                classifier = segment.classifier
+                diagram_model.classifiers[classifier.name] = classifier
+                if classifier.package in diagram_model.packages:
+                    diagram_model.packages[classifier.package].classifier_names.append(classifier.name)
+            if segment.relationships:
+                diagram_model.relationships.extend(segment.relationships)
+        return diagram_model
+
+    def add_member(self, classifier, member_text):
+        """Add a member line to a classifier, skipping separators."""
+        if not member_text or member_text in PLANTUML_MEMBER_SEPARATORS or member_text.startswith("'"):
+            return
+        visibility = member_text[0] if member_text[0] in "+-#~" else None
+        classifier.members.append(UMLMember(member_text, visibility, '(' in member_text))
+
+    def build_relationship(self, relationship_match, source_line):
+        """Create a typed relationship from a matched relationship line."""
+        left_operand = relationship_match.group('left').strip('"')
+        right_operand = relationship_match.group('right').strip('"')
+        arrow = relationship_match.group('arrow')
+        label = relationship_match.group('label')
+        label = label.strip() if label else None
+
+        left_head = '<|' if arrow.startswith('<|') else (arrow[0] if arrow[0] in '<*o+#x}' else '')
+        right_head = '|>' if arrow.endswith('|>') else (arrow[-1] if arrow[-1] in '>*o+#x{' else '')
+        is_dotted = '.' in arrow
+
+        if left_head == '<|' or right_head == '|>':
+            kind = "realization" if is_dotted else "inheritance"
+            # Edges point from child to parent
+            if left_head == '<|':
+                return UMLRelationship(right_operand, left_operand, kind, label, source_line)
+            return UMLRelationship(left_operand, right_operand, kind, label, source_line)
+
+        for head, kind in (('*', "composition"), ('o', "aggregation")):
+            # Edges point from the whole (diamond side) to the part
+            if left_head == head:
+                return UMLRelationship(left_operand, right_operand, kind, label, source_line)
+            if right_head == head:
+                return UMLRelationship(right_operand, left_operand, kind, label, source_line)
+
+        kind = "dependency" if is_dotted else "association"
+        if left_head == '<' and right_head != '>':
+            return UMLRelationship(right_operand, left_operand, kind, label, source_line)
+        return UMLRelationship(left_operand, right_operand, kind, label, source_line)
+
+
+class DiagramGraphIndex:
+    """
+    Adjacency index over the classifiers and relationships of a diagram model.
+
+    Classifiers are mapped to integer ids and the undirected adjacency is stored in
+    CSR form (indptr/indices), as NumPy arrays when NumPy is installed. Degree and
+    PageRank centrality are computed from those arrays without per-node Python loops.
+    """
+
+    def __init__(self, diagram_model):
+        self.node_names = list(diagram_model.classifiers)
+        self.node_ids = {node_name: node_id for node_id, node_name in enumerate(self.node_names)}
+        edge_sources = []
+        edge_targets = []
+        for relationship in diagram_model.relationships:
+            edge_sources.append(self.add_node(relationship.source))
+            edge_targets.append(self.add_node(relationship.target))
+
+        node_count = len(self.node_names)
+        self.pagerank_scores = None
+        if NUMPY_AVAILABLE:
+            edge_sources = np.asarray(edge_sources, dtype=np.int64)
+            edge_targets = np.asarray(edge_targets, dtype=np.int64)
+            self.adjacency_sources = np.concatenate((edge_sources, edge_targets))
+            self.adjacency_targets = np.concatenate((edge_targets, edge_sources))
+            self.degrees = np.bincount(self.adjacency_sources, minlength=node_count)
+            self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+            np.cumsum(self.degrees, out=self.indptr[1:])
+            self.indices = self.adjacency_targets[np.argsort(self.adjacency_sources, kind='stable')]
+        else:
+            self.adjacency_sources = edge_sources + edge_targets
+            self.adjacency_targets = edge_targets + edge_sources
+            adjacency_lists = [[] for _ in range(node_count)]
+            for source_id, target_id in zip(self.adjacency_sources, self.adjacency_targets):
+                adjacency_lists[source_id].append(target_id)
+            self.degrees = [len(neighbors) for neighbors in adjacency_lists]
+            self.indptr = [0]
+            self.indices = []
+            for neighbors in adjacency_lists:
+                self.indices.extend(neighbors)
+                self.indptr.append(len(self.indices))
+
+    def add_node(self, node_name):
+        """Return the id of a node, adding relationship endpoints that were never declared."""
+        node_id = self.node_ids.get(node_name)
+        if node_id is None:
+            node_id = len(self.node_names)
+            self.node_names.append(node_name)
+            self.node_ids[node_name] = node_id
+        return node_id
+
+    def get_pagerank_scores(self):
+        """Return PageRank centrality per node id over the undirected adjacency, computed once."""
+        if self.pagerank_scores is not None:
+            return self.pagerank_scores
+
+        node_count = len(self.node_names)
+        if node_count == 0:
+            self.pagerank_scores = []
+            return self.pagerank_scores
+
+        if NUMPY_AVAILABLE:
+            out_degrees = self.degrees.astype(np.float64)
+            dangling_nodes = out_degrees == 0
+            safe_degrees = np.where(dangling_nodes, 1.0, out_degrees)
+            scores = np.full(node_count, 1.0 / node_count)
+            for _ in range(PAGERANK_MAX_ITERATIONS):
+                contributions = (scores / safe_degrees)[self.adjacency_sources]
+                updated_scores = np.bincount(self.adjacency_targets, weights=contributions, minlength=node_count)
+                updated_scores = (PAGERANK_DAMPING_FACTOR * (updated_scores + scores[dangling_nodes].sum() / node_count)
+                                  + (1.0 - PAGERANK_DAMPING_FACTOR) / node_count)
+                converged = np.abs(updated_scores - scores).sum() < PAGERANK_TOLERANCE
+                scores = updated_scores
+                if converged:
+                    break
+            self.pagerank_scores = scores
+            return self.pagerank_scores
+
+        scores = [1.0 / node_count] * node_count
+        for _ in range(PAGERANK_MAX_ITERATIONS):
+            dangling_total = sum(score for score, degree in zip(scores, self.degrees) if degree == 0)
+            updated_scores = [0.0] * node_count
+            for source_id, target_id in zip(self.adjacency_sources, self.adjacency_targets):
+                updated_scores[target_id] += scores[source_id] / self.degrees[source_id]
+            updated_scores = [PAGERANK_DAMPING_FACTOR * (score + dangling_total / node_count)
+                              + (1.0 - PAGERANK_DAMPING_FACTOR) / node_count for score in updated_scores]
+            converged = sum(abs(new - old) for new, old in zip(updated_scores, scores)) < PAGERANK_TOLERANCE
+            scores = updated_scores
+            if converged:
+                break
+        self.pagerank_scores = scores
+        return self.pagerank_scores
+
+    def collect_neighborhood(self, focus_name, hops):
+        """Return the names of the nodes within the given number of hops of the focus node, in id order."""
+        focus_id = self.node_ids.get(focus_name)
+        if focus_id is None:
+            return []
+
+        # Breadth-first search over integer ids, one frontier per hop
+        visited_ids = {focus_id}
+        frontier_ids = [focus_id]
+        for _ in range(max(0, hops)):
+            next_frontier_ids = []
+            for node_id in frontier_ids:
+                for neighbor_id in self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]:
+                    neighbor_id = int(neighbor_id)
+                    if neighbor_id not in visited_ids:
+                        visited_ids.add(neighbor_id)
+                        next_frontier_ids.append(neighbor_id)
+            if not next_frontier_ids:
+                break
+            frontier_ids = next_frontier_ids
+        return [self.node_names[node_id] for node_id in sorted(visited_ids)]
+
+    def rank_core_nodes(self, top_k=None, top_fraction=CORE_CLASSES_TOP_FRACTION, min_count=CORE_CLASSES_MIN_COUNT):
+        """Return the names of the most central nodes, keeping the top k or the top fraction of nodes."""
+        node_count = len(self.node_names)
+        keep_count = top_k if top_k is not None else max(min_count, int(round(node_count * top_fraction)))
+        if keep_count >= node_count:
+            return list(self.node_names)
+
+        scores = self.get_pagerank_scores()
+        if NUMPY_AVAILABLE:
+            # Highest PageRank first, degree breaks ties
+            ranked_ids = np.lexsort((-self.degrees, -scores))[:keep_count].tolist()
+        else:
+            ranked_ids = sorted(range(node_count), key=lambda node_id: (-scores[node_id], -self.degrees[node_id]))[:keep_count]
+        return [self.node_names[node_id] for node_id in sorted(ranked_ids)]
+
+
+class DiagramModelCache:
+    """Bounded LRU of parsed diagram models, and of their graph indexes, keyed by the hash of the diagram code."""
+
+    def __init__(self, max_entries=DIAGRAM_MODEL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.diagram_models = OrderedDict()
+        self.graph_indexes = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.diagram_parser = PlantUMLParser()
+        self.statistics = {"hits": 0, "parses": 0, "graph_index_hits": 0, "graph_index_builds": 0}
+
+    @staticmethod
+    def hash_diagram_code(diagram_code):
+        """Return the key under which the model for this diagram code is cached."""
+        return hashlib.sha256(diagram_code.encode('utf-8')).hexdigest()
+
+    def get_model(self, diagram_code):
+        """Return the parsed model for the diagram code, parsing it only on first use."""
+        code_hash = self.hash_diagram_code(diagram_code)
+        with self.cache_lock:
+            if code_hash in self.diagram_models:
+                self.diagram_models.move_to_end(code_hash)
+                self.statistics["hits"] += 1
+                return self.diagram_models[code_hash]
+
+        diagram_model = self.diagram_parser.parse(diagram_code)
+        self.store_model(code_hash, diagram_model)
+        with self.cache_lock:
+            self.statistics["parses"] += 1
+        return diagram_model
+
+    def store_model(self, code_hash, diagram_model):
+        """Insert a model into the cache, evicting the least recently used entries."""
+        with self.cache_lock:
+            self.diagram_models[code_hash] = diagram_model
+            self.diagram_models.move_to_end(code_hash)
+            while len(self.diagram_models) > self.max_entries:
+                self.diagram_models.popitem(last=False)
+
+    def get_graph_index(self, diagram_code):
+        """Return the graph index for the diagram code, building it only on first use."""
+        code_hash = self.hash_diagram_code(diagram_code)
+        with self.cache_lock:
+            if code_hash in self.graph_indexes:
+                self.graph_indexes.move_to_end(code_hash)
+                self.statistics["graph_index_hits"] += 1
+                return self.graph_indexes[code_hash]
+
+        graph_index = DiagramGraphIndex(self.get_model(diagram_code))
+        with self.cache_lock:
+            self.statistics["graph_index_builds"] += 1
+            self.graph_indexes[code_hash] = graph_index
+            while len(self.graph_indexes) > self.max_entries:
+                self.graph_indexes.popitem(last=False)
+        return graph_index
+
+
+@st.cache_resource
+def get_shared_diagram_model_cache():
+    """Return the process-wide cache of parsed diagram models."""
+    return DiagramModelCache()
+
+
+class IncrementalPlantUMLParser:
+    """
+    Keeps the model of an editor buffer up to date across edits.
+
+    Each update re-parses only the segments touched by the edit, patches them into
+    the previous model and publishes the result to the shared model cache, so the
+    projections that follow do not parse the buffer again.
+    """
+
+    def __init__(self):
+        self.diagram_parser = PlantUMLParser()
+        self.diagram_model = None
+        self.statistics = {"full_parses": 0, "incremental_parses": 0, "unchanged": 0}
+
+    def update(self, diagram_code):
+        """Return the model for the current buffer, re-parsing only what changed since the last update."""
+        source_lines = diagram_code.split('\n')
+        previous_model = self.diagram_model
+
+        if previous_model is not None and previous_model.source_lines == source_lines:
+            self.statistics["unchanged"] += 1
+            return previous_model
+
+        if previous_model is None:
+            diagram_model = self.diagram_parser.parse(diagram_code)
+            self.statistics["full_parses"] += 1
+        else:
+            diagram_model = self.diagram_parser.reparse(previous_model, source_lines)
+            self.statistics["incremental_parses"] += 1
+
+        self.diagram_model = diagram_model
+        model_cache = get_shared_diagram_model_cache()
+        model_cache.store_model(model_cache.hash_diagram_code(diagram_code), diagram_model)
+        return diagram_model
+
+
 class ProjectionManager:
     """
     Manages different projection views for UML diagrams.
@@ -210,191 +1043,457 @@ class ProjectionManager:
     by filtering or highlighting elements based on different criteria.
     """
 
-    def __init__(self):
+    def __init__(self, diagram_model_cache=None):
         print("Initializing Projection Manager...")
+        # Background renders pass a cache resolved on the script thread
+        self.diagram_model_cache = diagram_model_cache or get_shared_diagram_model_cache()
         self.available_projections = {
             "Full Diagram": "Complete diagram with all elements and details",
             "Core Classes Only": "Main classes without implementation details",
             "Inheritance Hierarchy": "Focus on class inheritance relationships",
             "Associations Only": "Focus on associations between classes",
             "Interface Implementations": "Classes and their implemented interfaces",
-            "Simplified View": "Classes with minimal details for overview"
+            "Simplified View": "Classes with minimal details for overview",
+            "Class Neighborhood": "A focus class and the classes within a few relationship hops of it"
         }
+        # Projections whose output depends on projection options and not only on the diagram code
+        self.parameterized_projections = {"Class Neighborhood"}
         self.current_projection = "Full Diagram"
 
-    def apply_projection(self, diagram_code, projection_name):
+    def apply_projection(self, diagram_code, projection_name, projection_options=None):
         """Apply the selected projection to the diagram code"""
         if projection_name == "Full Diagram":
             return diagram_code
 
-        # Parse the PlantUML code
-        lines = diagram_code.split('\n')
-        result_lines = []
-        class_blocks = {}
-        relationships = []
-        current_class = None
-        in_class_def = False
-
-        # First pass - identify elements
-        for line in lines:
-            stripped = line.strip()
-
-            # Keep PlantUML directives
-            if stripped.startswith('@startuml') or stripped.startswith('@enduml'):
-                continue
-
-            # Track class definitions
-            if stripped.startswith('class ') or stripped.startswith('interface '):
-                parts = stripped.split(' ', 2)
-                if len(parts) > 1:
-                    class_name = parts[1].split('{')[0].strip()
-                    current_class = class_name
-                    class_blocks[current_class] = []
-                    in_class_def = '{' in stripped
-
-            # Add line to current class block
-            if in_class_def and current_class:
-                class_blocks[current_class].append(line)
-                if '}' in stripped:
-                    in_class_def = False
-
-            # Track relationships
-            elif '-->' in stripped or '<--' in stripped or '--|>' in stripped or '<|--' in stripped or '--' in stripped:
-                relationships.append(line)
+        # Parse once per distinct diagram; every projection reads the same model
+        diagram_model = self.diagram_model_cache.get_model(diagram_code)
 
         # Apply specific projection filters
         if projection_name == "Core Classes Only":
-            return self._apply_core_classes_projection(diagram_code, class_blocks, relationships)
+            return self._apply_core_classes_projection(diagram_code, diagram_model, projection_options or {})
         elif projection_name == "Inheritance Hierarchy":
-            return self._apply_inheritance_projection(diagram_code, class_blocks, relationships)
+            return self._apply_inheritance_projection(diagram_code, diagram_model)
         elif projection_name == "Associations Only":
-            return self._apply_associations_projection(diagram_code, class_blocks, relationships)
+            return self._apply_associations_projection(diagram_code, diagram_model)
         elif projection_name == "Interface Implementations":
-            return self._apply_interface_projection(diagram_code, class_blocks, relationships)
+            return self._apply_interface_projection(diagram_code, diagram_model)
         elif projection_name == "Simplified View":
-            return self._apply_simplified_projection(diagram_code, class_blocks, relationships)
+            return self._apply_simplified_projection(diagram_code, diagram_model)
+        elif projection_name == "Class Neighborhood":
+            return self._apply_neighborhood_projection(diagram_code, diagram_model, projection_options or {})
 
         # Default - return original
         return diagram_code
 
-    def _apply_core_classes_projection(self, original_code, class_blocks, relationships):
-        """Filter to show only core classes with minimal details"""
-        # Implementation would analyze relationships to identify central classes
-        # For now, use a simple approach that keeps all classes but removes details
+    def _build_projection_code(self, header_comment, element_lines, relationships):
+        """Assemble projection output from declaration lines and relationships"""
+        result_lines = ["@startuml", "", f"' {header_comment}", ""]
+        result_lines.extend(element_lines)
+        result_lines.extend(relationship.source_line for relationship in relationships)
+        result_lines.append("@enduml")
+        return "\n".join(result_lines)
+
+    def _apply_core_classes_projection(self, original_code, diagram_model, projection_options):
+        """Filter to show only the most central classes with minimal details"""
+        # Rank classes by PageRank over the relationship graph and keep the top ones
+        graph_index = self.diagram_model_cache.get_graph_index(original_code)
+        core_names = graph_index.rank_core_nodes(
+            projection_options.get("top_k"),
+            projection_options.get("top_fraction", CORE_CLASSES_TOP_FRACTION)
+        )
+        core_name_set = set(core_names)
+
+        element_lines = []
+        for class_name in core_names:
+            classifier = diagram_model.classifiers.get(class_name)
+            element_lines.append(classifier.declaration() if classifier else f"class {class_name} {{}}")
+
+        return self._build_projection_code(
+            "Core Classes Projection - Showing main classes without details",
+            element_lines,
+            [relationship for relationship in diagram_model.relationships
+             if relationship.source in core_name_set and relationship.target in core_name_set]
+        )
+
+    def _apply_inheritance_projection(self, original_code, diagram_model):
+        """Focus on inheritance relationships"""
+        return self._build_projection_code(
+            "Inheritance Hierarchy Projection - Focusing on class inheritance",
+            [classifier.declaration() for classifier in diagram_model.classifiers.values()],
+            diagram_model.relationships_of_kind("inheritance")
+        )
 
-        result = "@startuml\n"
-        result += "\n' Core Classes Projection - Showing main classes without details\n\n"
+    def _apply_associations_projection(self, original_code, diagram_model):
+        """Focus on class associations"""
+        return self._build_projection_code(
+            "Associations Projection - Focusing on relationships between classes",
+            [classifier.declaration() for classifier in diagram_model.classifiers.values()],
+            diagram_model.relationships_of_kind("association", "composition", "aggregation")
+        )
 
-        for class_name in class_blocks:
-            result += f"class {class_name} {{}}\n"
+    def _apply_interface_projection(self, original_code, diagram_model):
+        """Focus on interfaces and implementations"""
+        interfaces = diagram_model.classifiers_of_kind("interface")
+        interface_names = {interface.name for interface in interfaces}
+        realizations = diagram_model.relationships_of_kind("realization")
 
-        # Keep all relationships
-        for rel in relationships:
-            result += f"{rel}\n"
+        # Classes that realize one of the declared interfaces
+        implementing_classes = []
+        for relationship in realizations:
+            if relationship.target in interface_names and relationship.source not in implementing_classes:
+                implementing_classes.append(relationship.source)
 
-        result += "@enduml"
-        return result
+        element_lines = [interface.declaration() for interface in interfaces]
+        for class_name in implementing_classes:
+            classifier = diagram_model.classifiers.get(class_name)
+            element_lines.append(classifier.declaration() if classifier else f"class {class_name} {{}}")
 
-    def _apply_inheritance_projection(self, original_code, class_blocks, relationships):
-        """Focus on inheritance relationships"""
-        result = "@startuml\n"
-        result += "\n' Inheritance Hierarchy Projection - Focusing on class inheritance\n\n"
+        return self._build_projection_code(
+            "Interface Implementation Projection - Focusing on interfaces",
+            element_lines,
+            realizations
+        )
 
-        # Keep all class declarations but simplified
-        for class_name in class_blocks:
-            result += f"class {class_name} {{}}\n"
+    def _apply_simplified_projection(self, original_code, diagram_model):
+        """Show a simplified view with minimal class details"""
+        return self._build_projection_code(
+            "Simplified Projection - Overview with minimal details",
+            [classifier.declaration(with_body=False) for classifier in diagram_model.classifiers.values()],
+            diagram_model.relationships
+        )
 
-        # Filter relationships to keep only inheritance
-        for rel in relationships:
-            if '--|>' in rel or '<|--' in rel:
-                result += f"{rel}\n"
+    def _apply_neighborhood_projection(self, original_code, diagram_model, projection_options):
+        """Filter to a focus class and the classes within a number of relationship hops"""
+        graph_index = self.diagram_model_cache.get_graph_index(original_code)
+        focus_class = projection_options.get("focus_class")
+        hops = projection_options.get("hops", CLASS_NEIGHBORHOOD_DEFAULT_HOPS)
+        neighborhood_names = graph_index.collect_neighborhood(focus_class, hops)
+        if not neighborhood_names:
+            # An unknown focus class yields an empty projection rather than the whole diagram
+            focus_label = str(focus_class or "").replace('"', "'")
+            return self._build_projection_code(
+                f"Class Neighborhood Projection - {focus_label} not found",
+                [f'note "Focus class \'{focus_label}\' was not found in the diagram" as FocusClassWarning'],
+                []
+            )
+        neighborhood_name_set = set(neighborhood_names)
+
+        element_lines = []
+        for class_name in neighborhood_names:
+            classifier = diagram_model.classifiers.get(class_name)
+            element_lines.append(classifier.declaration() if classifier else f"class {class_name} {{}}")
+
+        return self._build_projection_code(
+            f"Class Neighborhood Projection - {focus_class} within {hops} hop(s)",
+            element_lines,
+            [relationship for relationship in diagram_model.relationships
+             if relationship.source in neighborhood_name_set and relationship.target in neighborhood_name_set]
+        )
 
-        result += "@enduml"
-        return result
+    def get_available_projections(self):
+        """Return list of available projection names"""
+        return list(self.available_projections.keys())
 
-    def _apply_associations_projection(self, original_code, class_blocks, relationships):
-        """Focus on class associations"""
-        result = "@startuml\n"
-        result += "\n' Associations Projection - Focusing on relationships between classes\n\n"
+    def get_projection_description(self, projection_name):
+        """Return description text for the given projection"""
+        return self.available_projections.get(projection_name, "No description available")
 
-        # Keep all class declarations but simplified
-        for class_name in class_blocks:
-            result += f"class {class_name} {{}}\n"
 
-        # Filter relationships to keep only associations (not inheritance)
-        for rel in relationships:
-            if '-->' in rel or '<--' in rel or '--' in rel:
-                if not ('--|>' in rel or '<|--' in rel):
-                    result += f"{rel}\n"
+class ContentAddressedBlobStore:
+    """
+    Compressed, deduplicated store for rendered diagrams.
 
-        result += "@enduml"
-        return result
+    Each distinct content is written once, named by the SHA-256 digest of its
+    uncompressed bytes under a two-character fan-out directory, and compressed
+    with zstd when the zstandard library is installed or gzip otherwise. Writes
+    go through a temporary file and an atomic rename, so a blob is either
+    complete or absent.
+    """
 
-    def _apply_interface_projection(self, original_code, class_blocks, relationships):
-        """Focus on interfaces and implementations"""
-        # In a real implementation, we'd identify interfaces and implementing classes
-        # For now, use a placeholder implementation
-        result = "@startuml\n"
-        result += "\n' Interface Implementation Projection - Focusing on interfaces\n\n"
-
-        # Identify interfaces (simplified approach - just look for interface keyword)
-        interfaces = set()
-        implementing_classes = set()
-
-        for line in original_code.split('\n'):
-            if line.strip().startswith('interface '):
-                interface_name = line.strip().split(' ')[1].split('{')[0].strip()
-                interfaces.add(interface_name)
-
-        # Identify implementation relationships
-        for rel in relationships:
-            if '..|>' in rel:  # Implementation relationship in PlantUML
-                parts = rel.split('..|>')
-                if len(parts) == 2:
-                    class_name = parts[0].strip()
-                    interface_name = parts[1].strip()
-                    if interface_name in interfaces:
-                        implementing_classes.add(class_name)
-
-        # Add interfaces to result
-        for interface in interfaces:
-            result += f"interface {interface} {{}}\n"
-
-        # Add implementing classes
-        for class_name in implementing_classes:
-            result += f"class {class_name} {{}}\n"
+    ENCODING_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
 
-        # Add implementation relationships
-        for rel in relationships:
-            if '..|>' in rel:
-                result += f"{rel}\n"
+    def __init__(self, blob_directory=ARTIFACT_BLOB_DIRECTORY):
+        print("Initializing Content-Addressed Blob Store...")
+        self.blob_directory = blob_directory
+        self.encoding = "zstd" if ZSTANDARD_AVAILABLE else "gzip"
+        self.statistics_lock = threading.Lock()
+        self.statistics = {"stored_blobs": 0, "deduplicated": 0, "raw_bytes": 0, "stored_bytes": 0, "deduplicated_bytes": 0}
 
-        result += "@enduml"
-        return result
+    @staticmethod
+    def compute_digest(content):
+        """Return the SHA-256 hex digest of a text content."""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-    def _apply_simplified_projection(self, original_code, class_blocks, relationships):
-        """Show a simplified view with minimal class details"""
-        result = "@startuml\n"
-        result += "\n' Simplified Projection - Overview with minimal details\n\n"
+    @staticmethod
+    def compress_content(content, encoding):
+        """Compress a text content with the given encoding."""
+        content_bytes = content.encode("utf-8")
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=ARTIFACT_BLOB_ZSTD_LEVEL).compress(content_bytes)
+        return gzip.compress(content_bytes, compresslevel=ARTIFACT_BLOB_GZIP_LEVEL, mtime=0)
 
-        # Extract class names and add them with no details
-        for class_name in class_blocks:
-            result += f"class {class_name}\n"
+    @staticmethod
+    def decompress_content(compressed_bytes, encoding):
+        """Decompress a stored blob back to text."""
+        if encoding == "zstd":
+            return zstandard.ZstdDecompressor().decompress(compressed_bytes).decode("utf-8")
+        return gzip.decompress(compressed_bytes).decode("utf-8")
+
+    def get_blob_path(self, content_digest, encoding):
+        """Return the file path of a blob for an encoding."""
+        return os.path.join(self.blob_directory, content_digest[:2], content_digest + self.ENCODING_EXTENSIONS[encoding])
+
+    def find_blob(self, content_digest):
+        """Return (path, encoding) of an existing blob in any encoding, or None."""
+        for encoding in self.ENCODING_EXTENSIONS:
+            blob_path = self.get_blob_path(content_digest, encoding)
+            if os.path.isfile(blob_path):
+                return blob_path, encoding
+        return None
 
-        # Add all relationships
-        for rel in relationships:
-            result += f"{rel}\n"
+    def store(self, content, content_digest=None):
+        """Store a content unless an identical one is stored already, and return its digest."""
+        content_digest = content_digest or self.compute_digest(content)
+        raw_size = len(content.encode("utf-8"))
+        existing_blob = self.find_blob(content_digest)
+        if existing_blob:
+            try:
+                # A fresh modification time keeps the blob inside the grace period of the retention sweep
+                os.utime(existing_blob[0])
+            except OSError:
+                existing_blob = None
+        if existing_blob:
+            with self.statistics_lock:
+                self.statistics["deduplicated"] += 1
+                self.statistics["deduplicated_bytes"] += raw_size
+            return content_digest
+
+        compressed_bytes = self.compress_content(content, self.encoding)
+        blob_path = self.get_blob_path(content_digest, self.encoding)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        temporary_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_path, 'wb') as blob_file:
+            blob_file.write(compressed_bytes)
+        os.replace(temporary_path, blob_path)
+        with self.statistics_lock:
+            self.statistics["stored_blobs"] += 1
+            self.statistics["raw_bytes"] += raw_size
+            self.statistics["stored_bytes"] += len(compressed_bytes)
+        return content_digest
+
+    def load(self, content_digest):
+        """Return the content of a blob, or None when it is not stored."""
+        existing_blob = self.find_blob(content_digest)
+        if not existing_blob:
+            return None
+        blob_path, encoding = existing_blob
+        with open(blob_path, 'rb') as blob_file:
+            return self.decompress_content(blob_file.read(), encoding)
 
-        result += "@enduml"
-        return result
+    def get_statistics(self):
+        """Return blob, deduplication and compression counters."""
+        with self.statistics_lock:
+            compression_ratio = self.statistics["raw_bytes"] / self.statistics["stored_bytes"] if self.statistics["stored_bytes"] else None
+            return dict(self.statistics, encoding=self.encoding, compression_ratio=compression_ratio)
 
-    def get_available_projections(self):
-        """Return list of available projection names"""
-        return list(self.available_projections.keys())
 
-    def get_projection_description(self, projection_name):
-        """Return description text for the given projection"""
-        return self.available_projections.get(projection_name, "No description available")
+@st.cache_resource
+def get_artifact_blob_store():
+    """Return the process-wide artifact blob store."""
+    return ContentAddressedBlobStore()
+
+
+class BackgroundConversationWriter:
+    """
+    Write-behind queue for conversation log records and content files.
+
+    Storage objects submit writes to a bounded queue and return immediately. A
+    writer thread drains the queue in batches, hands each storage all of its log
+    records in one call and writes repeated content files only once. A batch is
+    written when it is full, when the flush interval has passed since its first
+    write, and on flush or shutdown. A full queue blocks the caller rather than
+    letting a record overtake earlier ones, and once the writer has stopped the
+    caller writes what is left in the queue, in order. Queue depth and the time
+    from submission to persistence are tracked.
+    """
+
+    def __init__(self, max_queue_size=CONVERSATION_WRITER_QUEUE_SIZE, batch_size=CONVERSATION_WRITER_BATCH_SIZE,
+                 flush_interval_seconds=CONVERSATION_WRITER_FLUSH_INTERVAL_S):
+        print("Initializing Background Conversation Writer...")
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.write_queue = queue.Queue(maxsize=max_queue_size)
+        self.synchronous_write_lock = threading.Lock()
+        self.statistics_lock = threading.Lock()
+        self.statistics = {
+            "submitted": 0,
+            "batches": 0,
+            "log_records": 0,
+            "content_files": 0,
+            "coalesced_files": 0,
+            "write_errors": 0,
+            "synchronous_writes": 0,
+            "backpressure_waits": 0,
+            "flush_timeouts": 0,
+            "max_queue_depth": 0,
+            "total_latency_s": 0.0,
+            "max_latency_s": 0.0
+        }
+        self.writer_thread = threading.Thread(target=self.run_writer_loop, name="uml-log-writer", daemon=True)
+        self.writer_thread.start()
+
+    def submit(self, operation, storage_sink, payload, timeout_seconds=CONVERSATION_WRITER_SUBMIT_TIMEOUT_S):
+        """Queue a (conversation id, log record) or (path, content) file write; written in the caller if the writer is stopped."""
+        queued_item = (operation, storage_sink, payload, perf_counter_ns())
+        while self.writer_thread.is_alive():
+            try:
+                self.write_queue.put(queued_item, timeout=timeout_seconds)
+            except queue.Full:
+                # Waiting keeps the log in order; a write of our own would land before the queued records
+                with self.statistics_lock:
+                    self.statistics["backpressure_waits"] += 1
+                continue
+            with self.statistics_lock:
+                self.statistics["submitted"] += 1
+                self.statistics["max_queue_depth"] = max(self.statistics["max_queue_depth"], self.write_queue.qsize())
+            return
+        # Losing the write is worse than writing it in the caller
+        self.write_remaining_synchronously(queued_item)
+
+    def write_remaining_synchronously(self, queued_item=None):
+        """Write the writes a stopped writer left queued and then the given one, in submission order."""
+        with self.synchronous_write_lock:
+            pending_writes = []
+            while True:
+                try:
+                    remaining_item = self.write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if remaining_item[0] in ("log", "file"):
+                    pending_writes.append(remaining_item)
+                else:
+                    remaining_item[2].set()
+            if queued_item is not None:
+                pending_writes.append(queued_item)
+            if pending_writes:
+                self.write_batch(pending_writes)
+                with self.statistics_lock:
+                    self.statistics["synchronous_writes"] += len(pending_writes)
+
+    def run_writer_loop(self):
+        """Collect queued writes into batches and persist them until shutdown."""
+        pending_writes = []
+        batch_start_time = 0.0
+        while True:
+            wait_timeout = None
+            if pending_writes:
+                wait_timeout = max(0.0, self.flush_interval_seconds - (time.monotonic() - batch_start_time))
+            try:
+                queued_item = self.write_queue.get(timeout=wait_timeout)
+            except queue.Empty:
+                queued_item = None
+
+            if queued_item is not None and queued_item[0] in ("log", "file"):
+                if not pending_writes:
+                    batch_start_time = time.monotonic()
+                pending_writes.append(queued_item)
+                if len(pending_writes) < self.batch_size:
+                    continue
+
+            if pending_writes:
+                self.write_batch(pending_writes)
+                pending_writes = []
+            if queued_item is not None and queued_item[0] in ("flush", "stop"):
+                queued_item[2].set()
+                if queued_item[0] == "stop":
+                    return
+
+    def write_batch(self, pending_writes):
+        """Write one batch, grouping log records and content files per storage."""
+        log_records = OrderedDict()
+        content_files = OrderedDict()
+        coalesced_files = 0
+        for operation, storage_sink, payload, _ in pending_writes:
+            if operation == "log":
+                conversation_id, log_record = payload
+                log_records.setdefault((storage_sink, conversation_id), []).append(log_record)
+            else:
+                sink_files = content_files.setdefault(storage_sink, OrderedDict())
+                file_path, content = payload
+                if file_path in sink_files:
+                    coalesced_files += 1
+                sink_files[file_path] = content
+
+        write_errors = 0
+        for (storage_sink, conversation_id), sink_records in log_records.items():
+            try:
+                storage_sink.write_log_batch(sink_records, conversation_id)
+            except Exception as error:
+                print(f"Error writing conversation log: {error}")
+                write_errors += 1
+        for storage_sink, sink_files in content_files.items():
+            try:
+                storage_sink.write_content_batch(sink_files)
+            except Exception as error:
+                print(f"Error writing content files: {error}")
+                write_errors += 1
+
+        persisted_time = perf_counter_ns()
+        write_latencies = [(persisted_time - enqueue_time) / 1e+9 for _, _, _, enqueue_time in pending_writes]
+        with self.statistics_lock:
+            self.statistics["batches"] += 1
+            self.statistics["log_records"] += sum(len(sink_records) for sink_records in log_records.values())
+            self.statistics["content_files"] += sum(len(sink_files) for sink_files in content_files.values())
+            self.statistics["coalesced_files"] += coalesced_files
+            self.statistics["write_errors"] += write_errors
+            self.statistics["total_latency_s"] += sum(write_latencies)
+            self.statistics["max_latency_s"] = max(self.statistics["max_latency_s"], max(write_latencies))
+
+    def flush(self, timeout_seconds=CONVERSATION_WRITER_FLUSH_TIMEOUT_S):
+        """Wait until every write submitted so far is persisted; returns False if that did not happen in time."""
+        flush_event = threading.Event()
+        flush_deadline = time.monotonic() + timeout_seconds
+        if not self.writer_thread.is_alive():
+            # Writes queued just before the writer stopped are written here
+            self.write_remaining_synchronously()
+            flushed = True
+        else:
+            try:
+                self.write_queue.put(("flush", None, flush_event, perf_counter_ns()), timeout=timeout_seconds)
+                flushed = flush_event.wait(max(0.0, flush_deadline - time.monotonic()))
+            except queue.Full:
+                flushed = False
+        if not flushed:
+            print("Conversation writer did not persist its queued writes in time")
+            with self.statistics_lock:
+                self.statistics["flush_timeouts"] += 1
+        return flushed
+
+    def get_statistics(self):
+        """Return queue depth, batch counters and average and maximum write latency."""
+        with self.statistics_lock:
+            written_count = self.statistics["log_records"] + self.statistics["content_files"] + self.statistics["coalesced_files"]
+            return dict(self.statistics, queue_depth=self.write_queue.qsize(),
+                        average_latency_s=self.statistics["total_latency_s"] / written_count if written_count else 0.0)
+
+    def shutdown(self, timeout_seconds=10):
+        """Persist the queued writes and stop the writer thread."""
+        if not self.writer_thread.is_alive():
+            return
+        stop_event = threading.Event()
+        try:
+            self.write_queue.put(("stop", None, stop_event, perf_counter_ns()), timeout=timeout_seconds)
+        except queue.Full:
+            return
+        stop_event.wait(timeout_seconds)
+
+
+@st.cache_resource
+def get_conversation_writer():
+    """Return the process-wide background writer for conversation logs."""
+    conversation_writer = BackgroundConversationWriter()
+    atexit.register(conversation_writer.shutdown)
+    return conversation_writer
 
 
 class ConversationDataStorage:
@@ -406,12 +1505,24 @@ class ConversationDataStorage:
     - Record user prompts and AI responses
     - Save model configurations used in conversations
     - Store generated diagram code and output
+
+    The conversation log is an append-only JSON Lines file: a header record
+    followed by one record per entry, so logging costs the same on every turn and
+    a crash can at most tear the last line. export_conversation_log rebuilds the
+    three-section JSON document on demand.
     """
 
+    # Log directories of the current conversation of every storage, which log retention never removes
+    open_log_directories = set()
+    open_log_directories_lock = threading.Lock()
+
     def __init__(self):
         print("Initializing Conversation Data Storage System...")
-        self.log_directory = "uml_generator_logs"
+        self.log_root_directory = CONVERSATION_LOG_ROOT_DIRECTORY
+        self.log_directory = CONVERSATION_LOG_ROOT_DIRECTORY
         self.conversation_log_file = None
+        # Log files of this session's conversations, for records still queued when a conversation is replaced
+        self.conversation_log_files = {}
         self.current_timestamp = None
         self.conversation_identifier = ""
         self.initial_welcome_message = ""
@@ -420,29 +1531,22 @@ class ConversationDataStorage:
         self.previous_language_model_config = ""
         self.previous_interpreter = ""
         self.previous_interpreter_config = ""
+        self.fsync_policy = CONVERSATION_LOG_FSYNC_POLICY
+        self.deduplicate_artifacts = False
+        self.background_writes = False
+        self.log_file_handle = None
+        self.last_fsync_time = 0.0
+        self.fsync_timer = None
+        self.log_lock = threading.Lock()
 
 
     def write_log_entry(self, key, data):
         """Write data to the JSON log file"""
-        if not os.path.isfile(self.conversation_log_file):
-            self.initialize_conversation_log_file()
-
-        with open(self.conversation_log_file, 'r+') as f:
-            file_data = json.load(f)
-            file_data[key].append(data)
-            f.seek(0)
-            json.dump(file_data, f, indent=4)
+        self.append_to_log_file(key, data)
 
     def write_content_file(self, msg_id, prefix, content, extension):
         """Write content to a file with appropriate naming"""
-        filename = f"uml-gen-{self.generate_timestamp()}-{msg_id}-{prefix}{extension}"
-        os.makedirs(self.log_directory, exist_ok=True)
-
-        try:
-            with open(os.path.join(self.log_directory, filename), 'w') as f:
-                f.write(content)
-        except Exception as e:
-            print(f"Error writing file: {e}")
+        self.save_content_to_file(msg_id, prefix, content, extension)
 
 
     def record_llm_response(self, response, execution_duration_ns):
@@ -460,28 +1564,165 @@ class ConversationDataStorage:
         self.write_content_file(self.current_message_id, "response", response, ".txt")
 
 
-    def initialize_conversation_log_file(self):
-        """Creates a new log file with basic structure for storing conversation data."""
-        log_structure = {
-            "llm_configurations": [],
-            "int_configurations": [],
-            "conversation": []
+    @staticmethod
+    def build_log_header_record(conversation_id):
+        """Return the header record that starts the log file of a conversation."""
+        return {
+            "record": "header",
+            "format": CONVERSATION_LOG_FORMAT,
+            "version": CONVERSATION_LOG_FORMAT_VERSION,
+            "conversation_id": conversation_id,
+            "created": int(time.time()),
+            "sections": list(CONVERSATION_LOG_SECTIONS)
         }
 
+    def initialize_conversation_log_file(self):
+        """Creates a new log file that starts with a header record describing the conversation."""
         os.makedirs(self.log_directory, exist_ok=True)
-        with open(self.conversation_log_file, 'w') as file:
-            json.dump(log_structure, file, indent=4)
+        self.close_log_file()
+        self.log_file_handle = open(self.conversation_log_file, 'a', encoding='utf-8')
+        if self.log_file_handle.tell() == 0:
+            self.write_log_records([self.build_log_header_record(self.conversation_identifier)])
 
     def append_to_log_file(self, section_key, data_entry):
-        """Append a new data entry to a specific section in the JSON log file."""
-        if not os.path.isfile(self.conversation_log_file):
-            self.initialize_conversation_log_file()
+        """Append a new data entry to a specific section of the JSON Lines log file."""
+        log_record = {"record": "entry", "section": section_key, "entry": data_entry}
+        # The conversation is fixed now, not when a queued record is eventually written
+        if self.background_writes:
+            get_conversation_writer().submit("log", self, (self.conversation_identifier, log_record))
+        else:
+            self.write_log_batch([log_record], self.conversation_identifier)
+
+    def set_background_writes(self, enabled):
+        """Switch between background and synchronous writes, persisting queued writes before going synchronous."""
+        if self.background_writes and not enabled:
+            get_conversation_writer().flush()
+        self.background_writes = enabled
+
+    def write_log_batch(self, log_records, conversation_id=None):
+        """Append log records to the log of their conversation, creating the current log on first use."""
+        if self.deduplicate_artifacts:
+            # Blobs are stored before the records that reference them
+            log_records = [self.reference_artifact_blobs(log_record) for log_record in log_records]
+        with self.log_lock:
+            if conversation_id not in (None, self.conversation_identifier):
+                self.append_to_earlier_log_file(conversation_id, log_records)
+                return
+            if self.log_file_handle is None:
+                self.initialize_conversation_log_file()
+            self.write_log_records(log_records)
+
+    def append_to_earlier_log_file(self, conversation_id, log_records):
+        """Append records that were queued for a conversation which has since been replaced; the caller holds the lock."""
+        log_file_path = self.conversation_log_files.get(conversation_id)
+        if not log_file_path:
+            print(f"Dropping {len(log_records)} log records of unknown conversation {conversation_id}")
+            return
+        os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+        with open(log_file_path, 'a', encoding='utf-8') as log_file:
+            # Logs are created on their first record, which may be one of these
+            if log_file.tell() == 0:
+                log_records = [self.build_log_header_record(conversation_id)] + list(log_records)
+            log_file.write("".join(json.dumps(log_record, ensure_ascii=False) + "\n" for log_record in log_records))
+            log_file.flush()
+            if self.fsync_policy != "never":
+                os.fsync(log_file.fileno())
+
+    def reference_artifact_blobs(self, log_record):
+        """Move diagram code and rendered output of a record into the blob store, keeping their digests."""
+        log_entry = log_record["entry"]
+        if not any(isinstance(log_entry.get(field_name), str) for field_name in ARTIFACT_DEDUPLICATED_FIELDS):
+            return log_record
+        blob_store = get_artifact_blob_store()
+        referenced_entry = {}
+        for field_name, field_value in log_entry.items():
+            if field_name in ARTIFACT_DEDUPLICATED_FIELDS and isinstance(field_value, str):
+                referenced_entry[f"{field_name}_blob"] = blob_store.store(field_value)
+            else:
+                referenced_entry[field_name] = field_value
+        return dict(log_record, entry=referenced_entry)
+
+    def write_log_records(self, log_records):
+        """Write records one per line with a single flush, and force them to disk according to the fsync policy."""
+        self.log_file_handle.write("".join(json.dumps(log_record, ensure_ascii=False) + "\n" for log_record in log_records))
+        self.log_file_handle.flush()
+        seconds_since_fsync = time.monotonic() - self.last_fsync_time
+        if self.fsync_policy == "always" or (
+                self.fsync_policy == "interval" and seconds_since_fsync >= CONVERSATION_LOG_FSYNC_INTERVAL_S):
+            os.fsync(self.log_file_handle.fileno())
+            self.last_fsync_time = time.monotonic()
+        elif self.fsync_policy == "interval" and self.fsync_timer is None:
+            # The last records of a burst reach the disk when the interval ends, not with the next record
+            self.fsync_timer = threading.Timer(CONVERSATION_LOG_FSYNC_INTERVAL_S - seconds_since_fsync,
+                                               self.sync_log_file)
+            self.fsync_timer.daemon = True
+            self.fsync_timer.start()
+
+    def sync_log_file(self):
+        """Force the records written since the last fsync to disk; runs on the interval timer."""
+        with self.log_lock:
+            self.fsync_timer = None
+            if self.log_file_handle is not None:
+                os.fsync(self.log_file_handle.fileno())
+                self.last_fsync_time = time.monotonic()
+
+    def close_log_file(self):
+        """Force pending records to disk and close the log file."""
+        if self.fsync_timer is not None:
+            self.fsync_timer.cancel()
+            self.fsync_timer = None
+        if self.log_file_handle is not None:
+            if self.fsync_policy != "never":
+                os.fsync(self.log_file_handle.fileno())
+            self.log_file_handle.close()
+            self.log_file_handle = None
 
-        with open(self.conversation_log_file, 'r+') as file:
-            file_contents = json.load(file)
-            file_contents[section_key].append(data_entry)
-            file.seek(0)
-            json.dump(file_contents, file, indent=4)
+    @staticmethod
+    def export_conversation_log(log_file_path, output_file_path=None, blob_directory=ARTIFACT_BLOB_DIRECTORY):
+        """Rebuild the three-section JSON document from a JSON Lines log and write it next to the log."""
+        log_document = {section_key: [] for section_key in CONVERSATION_LOG_SECTIONS}
+        blob_store = None
+        with open(log_file_path, 'r', encoding='utf-8') as log_file:
+            log_lines = log_file.read().splitlines()
+
+        for line_number, log_line in enumerate(log_lines, start=1):
+            if not log_line.strip():
+                continue
+            try:
+                log_record = json.loads(log_line)
+            except json.JSONDecodeError:
+                # Only the last line can be torn by a crash during a write
+                if line_number == len(log_lines):
+                    print(f"Skipping incomplete last record in {log_file_path}")
+                    continue
+                raise
+            if log_record.get("record") != "entry":
+                continue
+            log_entry = log_record["entry"]
+            if any(f"{field_name}_blob" in log_entry for field_name in ARTIFACT_BLOB_FIELDS):
+                # Resolve blob references back to the inline content of the original format
+                blob_store = blob_store or ContentAddressedBlobStore(blob_directory)
+                resolved_entry = {}
+                for field_name, field_value in log_entry.items():
+                    if field_name.endswith("_blob") and field_name[:-len("_blob")] in ARTIFACT_BLOB_FIELDS:
+                        resolved_entry[field_name[:-len("_blob")]] = blob_store.load(field_value)
+                    else:
+                        resolved_entry[field_name] = field_value
+                log_entry = resolved_entry
+            log_document.setdefault(log_record["section"], []).append(log_entry)
+
+        output_file_path = output_file_path or os.path.splitext(log_file_path)[0] + ".json"
+        temporary_file_path = output_file_path + ".tmp"
+        with open(temporary_file_path, 'w', encoding='utf-8') as output_file:
+            json.dump(log_document, output_file, indent=4, ensure_ascii=False)
+        os.replace(temporary_file_path, output_file_path)
+        return output_file_path
+
+    @classmethod
+    def get_open_log_directories(cls):
+        """Return the log directories of the conversations currently being written."""
+        with cls.open_log_directories_lock:
+            return set(cls.open_log_directories)
 
     def generate_timestamp(self):
         """Generate a formatted timestamp for file naming and logging."""
@@ -489,6 +1730,10 @@ class ConversationDataStorage:
 
     def create_new_conversation(self, welcome_message):
         """Initialize a new conversation with a unique identifier and welcome message."""
+        # Records queued for the previous conversation must land in its own log
+        if self.background_writes:
+            get_conversation_writer().flush()
+
         self.initial_welcome_message = welcome_message
         self.current_message_id = 0
         self.previous_language_model = ""
@@ -496,9 +1741,19 @@ class ConversationDataStorage:
         self.previous_interpreter = ""
         self.previous_interpreter_config = ""
 
-        self.conversation_identifier = f"uml-gen-{self.generate_timestamp()}"
-        self.log_directory = os.path.join(self.log_directory, self.conversation_identifier)
-        self.conversation_log_file = os.path.join(self.log_directory, f"{self.conversation_identifier}.json")
+        # The random suffix keeps sessions started in the same second apart
+        self.conversation_identifier = f"uml-gen-{self.generate_timestamp()}-{uuid.uuid4().hex[:6]}"
+        previous_log_directory = os.path.abspath(self.log_directory) if self.conversation_log_file else None
+        # Conversations are sharded by day below the log root, not nested in the previous conversation
+        self.log_directory = os.path.join(self.log_root_directory, CONVERSATION_LOG_SHARD_DIRECTORY,
+                                          dt.datetime.now().strftime("%Y%m%d"), self.conversation_identifier)
+        with ConversationDataStorage.open_log_directories_lock:
+            ConversationDataStorage.open_log_directories.discard(previous_log_directory)
+            ConversationDataStorage.open_log_directories.add(os.path.abspath(self.log_directory))
+        with self.log_lock:
+            self.close_log_file()
+            self.conversation_log_file = os.path.join(self.log_directory, f"{self.conversation_identifier}.jsonl")
+            self.conversation_log_files[self.conversation_identifier] = self.conversation_log_file
 
     def record_language_model_configuration(self, selected_model, model_configuration):
         """Record the language model and its configuration parameters when changed."""
@@ -572,8 +1827,10 @@ class ConversationDataStorage:
         }
 
         self.append_to_log_file("conversation", interpreter_input_entry)
-        self.save_content_to_file(self.current_message_id, "int-input", diagram_code,
-                                 self.determine_file_extension(diagram_code))
+        # Deduplicated artifacts are kept once in the blob store instead of a file per render
+        if not self.deduplicate_artifacts:
+            self.save_content_to_file(self.current_message_id, "int-input", diagram_code,
+                                     self.determine_file_extension(diagram_code))
 
     def record_interpreter_output(self, diagram_output, execution_time_nanoseconds):
         """Store an interpreter's output diagram with execution timing information."""
@@ -586,8 +1843,9 @@ class ConversationDataStorage:
         }
 
         self.append_to_log_file("conversation", output_entry)
-        self.save_content_to_file(self.current_message_id, "int-output", diagram_output,
-                                 self.determine_file_extension(diagram_output))
+        if not self.deduplicate_artifacts:
+            self.save_content_to_file(self.current_message_id, "int-output", diagram_output,
+                                     self.determine_file_extension(diagram_output))
 
     def record_general_message(self, message_text):
         """Store a general system message in the conversation history."""
@@ -622,13 +1880,21 @@ class ConversationDataStorage:
     def save_content_to_file(self, message_id, content_type_prefix, content, file_extension):
         """Save message content to a separate file with appropriate naming convention."""
         filename = f"uml-gen-{self.generate_timestamp()}-{message_id}-{content_type_prefix}{file_extension}"
-        os.makedirs(self.log_directory, exist_ok=True)
-
-        try:
-            with open(os.path.join(self.log_directory, filename), 'w') as file:
-                file.write(content)
-        except Exception as error:
-            print(f"Error writing file: {error}")
+        file_path = os.path.join(self.log_directory, filename)
+        if self.background_writes:
+            get_conversation_writer().submit("file", self, (file_path, content))
+        else:
+            self.write_content_batch({file_path: content})
+
+    def write_content_batch(self, content_files):
+        """Write a mapping of file paths to contents."""
+        for file_path, content in content_files.items():
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            try:
+                with open(file_path, 'w') as file:
+                    file.write(content)
+            except Exception as error:
+                print(f"Error writing file: {error}")
 
     def reset_conversation_state(self, welcome_message):
         """Reset the conversation state for a new session."""
@@ -641,82 +1907,1298 @@ class ConversationDataStorage:
             self.previous_interpreter_config = ""
 
 
-class DiagramInterpreterEngine:
+class SQLiteConversationDataStorage(ConversationDataStorage):
     """
-    Executes diagram generation from code using supported interpreters like PlantUML and Graphviz.
-
-    Responsibilities:
-    - Parse and validate diagram syntax
-    - Execute the appropriate renderer for the diagram type
-    - Apply error corrections to common syntax mistakes
-    - Return the rendered diagram in the requested format
+    Conversation storage backed by one SQLite database instead of log files.
+
+    Conversations, messages, model and interpreter configurations and content
+    artifacts are rows in WAL-mode tables indexed by conversation, timestamp and
+    message id, so analytics and replay are queries instead of directory scans.
+    User prompts and diagram code are indexed with FTS5 when SQLite provides it.
+    With artifact deduplication, diagram code and rendered output are kept once
+    per distinct content in a compressed blobs table. The record_* methods are
+    inherited; only the log and content writes differ.
     """
 
-    def __init__(self):
-        print("Initializing Diagram Interpreter Engine...")
-        self.active_interpreter = None
-        self.interpreter_parameters = None
-        self.external_api_endpoint = None
-
-    def execute_diagram_generation(self, diagram_code, projection_name=None):
-        """Processes diagram code through the appropriate interpreter to generate a visual diagram."""
-        result = None
-
-        # Apply projection if specified
-        if projection_name and projection_name != "Full Diagram":
-            projection_manager = ProjectionManager()
-            diagram_code = projection_manager.apply_projection(diagram_code, projection_name)
+    MESSAGE_KINDS = ("user_prompt", "llm_response", "int_input", "int_output", "message", "init_message")
+    SEARCHABLE_MESSAGE_KINDS = ("user_prompt", "int_input")
+    SYNCHRONOUS_MODES = {"always": "FULL", "interval": "NORMAL", "never": "OFF"}
+
+    def __init__(self, database_path=CONVERSATION_DATABASE_PATH):
+        super().__init__()
+        print("Initializing SQLite Conversation Storage...")
+        self.database_path = database_path
+        self.synchronous_mode = None
+        self.full_text_search_available = True
+        os.makedirs(os.path.dirname(database_path) or ".", exist_ok=True)
+
+        self.database_connection = sqlite3.connect(database_path, check_same_thread=False, timeout=30)
+        with self.log_lock, self.database_connection:
+            self.database_connection.execute("PRAGMA journal_mode=WAL")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS conversations (
+                    conversation_id TEXT PRIMARY KEY,
+                    created_at INTEGER,
+                    welcome_message TEXT
+                )""")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    message_rowid INTEGER PRIMARY KEY,
+                    conversation_id TEXT NOT NULL,
+                    message_id INTEGER,
+                    timestamp INTEGER,
+                    kind TEXT,
+                    content TEXT,
+                    execution_duration_s REAL,
+                    blob_digest TEXT
+                )""")
+            # Databases created before blob deduplication lack the digest column
+            message_columns = {column_row[1] for column_row in self.database_connection.execute("PRAGMA table_info(messages)")}
+            if "blob_digest" not in message_columns:
+                self.database_connection.execute("ALTER TABLE messages ADD COLUMN blob_digest TEXT")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    encoding TEXT,
+                    size_bytes INTEGER,
+                    stored_size_bytes INTEGER,
+                    content BLOB
+                )""")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS configurations (
+                    configuration_rowid INTEGER PRIMARY KEY,
+                    conversation_id TEXT NOT NULL,
+                    message_id INTEGER,
+                    timestamp INTEGER,
+                    kind TEXT,
+                    name TEXT,
+                    configuration TEXT
+                )""")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    conversation_id TEXT NOT NULL,
+                    message_id INTEGER,
+                    content_type TEXT,
+                    file_extension TEXT,
+                    created_at INTEGER,
+                    size_bytes INTEGER,
+                    content TEXT,
+                    PRIMARY KEY (conversation_id, message_id, content_type)
+                )""")
+            for index_statement in (
+                    "CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation_id, message_id)",
+                    "CREATE INDEX IF NOT EXISTS messages_timestamp ON messages (timestamp)",
+                    "CREATE INDEX IF NOT EXISTS configurations_conversation ON configurations (conversation_id, message_id)",
+                    "CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at)",
+                    "CREATE INDEX IF NOT EXISTS conversations_created ON conversations (created_at)"):
+                self.database_connection.execute(index_statement)
+
+        # FTS5 is an optional SQLite extension; searches fall back to LIKE without it
+        try:
+            with self.log_lock, self.database_connection:
+                self.database_connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS message_search "
+                    "USING fts5(content, content='messages', content_rowid='message_rowid')")
+        except sqlite3.OperationalError as error:
+            print(f"SQLite FTS5 not available, searching without an index: {error}")
+            self.full_text_search_available = False
+
+    def apply_synchronous_mode(self):
+        """Map the fsync policy onto SQLite's synchronous setting when it changes."""
+        synchronous_mode = self.SYNCHRONOUS_MODES.get(self.fsync_policy, "NORMAL")
+        if synchronous_mode != self.synchronous_mode:
+            self.database_connection.execute(f"PRAGMA synchronous={synchronous_mode}")
+            self.synchronous_mode = synchronous_mode
+
+    def write_log_batch(self, log_records, conversation_id=None):
+        """Insert log records of one conversation as message and configuration rows in one transaction."""
+        conversation_id = conversation_id or self.conversation_identifier
+        with self.log_lock:
+            self.apply_synchronous_mode()
+            with self.database_connection:
+                self.database_connection.execute(
+                    "INSERT OR IGNORE INTO conversations (conversation_id, created_at, welcome_message) VALUES (?, ?, ?)",
+                    (conversation_id, int(time.time()), self.initial_welcome_message))
+                for log_record in log_records:
+                    self.insert_log_entry(conversation_id, log_record["section"], log_record["entry"])
+
+    def insert_log_entry(self, conversation_id, section_key, log_entry):
+        """Insert one entry of a log section into its table."""
+        if section_key == "conversation":
+            message_kind = next(kind for kind in self.MESSAGE_KINDS if kind in log_entry)
+            message_content, blob_digest = log_entry[message_kind], None
+            if self.deduplicate_artifacts and message_kind in ARTIFACT_DEDUPLICATED_FIELDS and isinstance(message_content, str):
+                blob_digest = self.insert_blob(message_content)
+                message_content = None
+            inserted_row = self.database_connection.execute(
+                "INSERT INTO messages (conversation_id, message_id, timestamp, kind, content, execution_duration_s, "
+                "blob_digest) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conversation_id, log_entry["message_id"], log_entry["timestamp"], message_kind,
+                 message_content, log_entry.get("execution_duration_s"), blob_digest))
+            if self.full_text_search_available and message_kind in self.SEARCHABLE_MESSAGE_KINDS:
+                self.database_connection.execute(
+                    "INSERT INTO message_search (rowid, content) VALUES (?, ?)",
+                    (inserted_row.lastrowid, log_entry[message_kind]))
+        else:
+            name_key, configuration_key = (("llm", "llm_configuration") if section_key == "llm_configurations"
+                                           else ("interpreter", "int_configuration"))
+            self.database_connection.execute(
+                "INSERT INTO configurations (conversation_id, message_id, timestamp, kind, name, configuration) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (conversation_id, log_entry["message_id"], log_entry["timestamp"], name_key,
+                 str(log_entry[name_key]), json.dumps(log_entry[configuration_key], default=str)))
+
+    def insert_blob(self, content):
+        """Insert a compressed blob unless identical content is stored already, and return its digest."""
+        content_digest = ContentAddressedBlobStore.compute_digest(content)
+        if not self.database_connection.execute("SELECT 1 FROM blobs WHERE digest = ?", (content_digest,)).fetchone():
+            encoding = "zstd" if ZSTANDARD_AVAILABLE else "gzip"
+            compressed_bytes = ContentAddressedBlobStore.compress_content(content, encoding)
+            self.database_connection.execute(
+                "INSERT INTO blobs (digest, encoding, size_bytes, stored_size_bytes, content) VALUES (?, ?, ?, ?, ?)",
+                (content_digest, encoding, len(content.encode("utf-8")), len(compressed_bytes), compressed_bytes))
+        return content_digest
 
-        if self.active_interpreter == INTERPRETER_PLANTWEB_PLANTUML and PLANTWEB_RENDERER_AVAILABLE:
-            formatted_code = self.format_plantuml_code(diagram_code)
-            result = self.execute_plantweb_renderer(formatted_code, "plantuml")
-        elif self.active_interpreter == INTERPRETER_PLANTWEB_GRAPHVIZ and PLANTWEB_RENDERER_AVAILABLE:
-            formatted_code = self.format_graphviz_code(diagram_code)
-            result = self.execute_plantweb_renderer(formatted_code, "graphviz")
+    def save_content_to_file(self, message_id, content_type_prefix, content, file_extension):
+        """Save message content as an artifact row keyed by conversation, message and content type."""
+        artifact_key = (self.conversation_identifier, message_id, content_type_prefix, file_extension)
+        if self.background_writes:
+            get_conversation_writer().submit("file", self, (artifact_key, content))
         else:
-            print(f"Interpreter {self.active_interpreter} is not available or not supported")
+            self.write_content_batch({artifact_key: content})
+
+    def write_content_batch(self, content_files):
+        """Insert a mapping of artifact keys to contents in one transaction."""
+        current_time = int(time.time())
+        with self.log_lock:
+            self.apply_synchronous_mode()
+            with self.database_connection:
+                self.database_connection.executemany(
+                    "INSERT OR REPLACE INTO artifacts (conversation_id, message_id, content_type, file_extension, "
+                    "created_at, size_bytes, content) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(conversation_id, message_id, content_type, file_extension, current_time,
+                      len(content.encode("utf-8")) if isinstance(content, str) else len(content), content)
+                     for (conversation_id, message_id, content_type, file_extension), content in content_files.items()])
+
+    def search_messages(self, search_text, since_timestamp=0, limit=50):
+        """Return the newest prompts and diagram code containing the search text, optionally since a timestamp."""
+        with self.log_lock:
+            # Rows written while diagram code was deduplicated keep their content in the blobs table
+            if self.full_text_search_available:
+                matching_rows = self.database_connection.execute(
+                    "SELECT messages.conversation_id, messages.message_id, messages.timestamp, messages.kind, "
+                    "messages.content, blobs.encoding, blobs.content FROM message_search "
+                    "JOIN messages ON messages.message_rowid = message_search.rowid "
+                    "LEFT JOIN blobs ON blobs.digest = messages.blob_digest "
+                    "WHERE message_search MATCH ? AND messages.timestamp >= ? "
+                    "ORDER BY messages.timestamp DESC LIMIT ?",
+                    ('"' + search_text.replace('"', '""') + '"', since_timestamp, limit)).fetchall()
+            else:
+                # LIKE cannot look inside compressed blobs, so those rows are decompressed and matched here
+                escaped_search_text = re.sub(r'([\\%_])', r'\\\1', search_text)
+                candidate_rows = self.database_connection.execute(
+                    "SELECT messages.conversation_id, messages.message_id, messages.timestamp, messages.kind, "
+                    "messages.content, blobs.encoding, blobs.content FROM messages "
+                    "LEFT JOIN blobs ON blobs.digest = messages.blob_digest "
+                    f"WHERE messages.kind IN ({', '.join('?' for _ in self.SEARCHABLE_MESSAGE_KINDS)}) "
+                    "AND (messages.content LIKE ? ESCAPE '\\' OR messages.content IS NULL) AND messages.timestamp >= ? "
+                    "ORDER BY messages.timestamp DESC",
+                    (*self.SEARCHABLE_MESSAGE_KINDS, f"%{escaped_search_text}%", since_timestamp))
+                folded_search_text = search_text.casefold()
+                matching_rows = []
+                for candidate_row in candidate_rows:
+                    if candidate_row[4] is None:
+                        if candidate_row[6] is None:
+                            continue
+                        blob_text = ContentAddressedBlobStore.decompress_content(candidate_row[6], candidate_row[5])
+                        if folded_search_text not in blob_text.casefold():
+                            continue
+                        candidate_row = candidate_row[:4] + (blob_text, None, None)
+                    matching_rows.append(candidate_row)
+                    if len(matching_rows) >= limit:
+                        break
+        return [
+            {"conversation_id": conversation_id, "message_id": message_id, "timestamp": timestamp, "kind": kind,
+             "content": ContentAddressedBlobStore.decompress_content(blob_content, blob_encoding)
+             if blob_content is not None else content}
+            for conversation_id, message_id, timestamp, kind, content, blob_encoding, blob_content in matching_rows
+        ]
+
+    def get_conversation_messages(self, conversation_id):
+        """Return the messages of a conversation in the order they were recorded, for replay."""
+        with self.log_lock:
+            message_rows = self.database_connection.execute(
+                "SELECT messages.message_id, messages.timestamp, messages.kind, messages.content, "
+                "messages.execution_duration_s, blobs.encoding, blobs.content FROM messages "
+                "LEFT JOIN blobs ON blobs.digest = messages.blob_digest "
+                "WHERE messages.conversation_id = ? ORDER BY messages.message_rowid", (conversation_id,)).fetchall()
+        return [
+            {"message_id": message_id, "timestamp": timestamp, "kind": kind,
+             "content": ContentAddressedBlobStore.decompress_content(blob_content, blob_encoding)
+             if blob_content is not None else content,
+             "execution_duration_s": execution_duration_s}
+            for message_id, timestamp, kind, content, execution_duration_s, blob_encoding, blob_content in message_rows
+        ]
+
+    def export_conversation(self, conversation_id, output_file_path):
+        """Write a conversation as the same three-section JSON document the log files export to."""
+        log_document = {section_key: [] for section_key in CONVERSATION_LOG_SECTIONS}
+        for message in self.get_conversation_messages(conversation_id):
+            message_entry = {"timestamp": message["timestamp"], "message_id": message["message_id"]}
+            if message["execution_duration_s"] is not None:
+                message_entry["execution_duration_s"] = message["execution_duration_s"]
+            message_entry[message["kind"]] = message["content"]
+            log_document["conversation"].append(message_entry)
+
+        with self.log_lock:
+            configuration_rows = self.database_connection.execute(
+                "SELECT timestamp, message_id, kind, name, configuration FROM configurations "
+                "WHERE conversation_id = ? ORDER BY configuration_rowid", (conversation_id,)).fetchall()
+        for timestamp, message_id, kind, name, configuration in configuration_rows:
+            section_key, configuration_key = (("llm_configurations", "llm_configuration") if kind == "llm"
+                                              else ("int_configurations", "int_configuration"))
+            log_document[section_key].append({"timestamp": timestamp, "message_id": message_id, kind: name,
+                                              configuration_key: json.loads(configuration)})
+
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            json.dump(log_document, output_file, indent=4, ensure_ascii=False)
+        return output_file_path
+
+    def get_statistics(self):
+        """Return row counts per table and whether full-text search is indexed."""
+        with self.log_lock:
+            table_counts = {
+                table_name: self.database_connection.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+                for table_name in ("conversations", "messages", "configurations", "artifacts", "blobs")
+            }
+            table_counts["blob_bytes"], table_counts["blob_stored_bytes"] = self.database_connection.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0), COALESCE(SUM(stored_size_bytes), 0) FROM blobs").fetchone()
+        return dict(table_counts, full_text_search=self.full_text_search_available)
 
-        if result and len(result) > 1:
-            if result[1].lower() == "svg" and isinstance(result[0], bytes):
-                # Convert SVG bytes to string for rendering
-                return (formatted_code, result[0].decode('utf-8'))
 
-        return (formatted_code, result[0] if result else None)
+def create_conversation_storage(storage_backend):
+    """Create the conversation storage for a backend name."""
+    if storage_backend == "sqlite":
+        return SQLiteConversationDataStorage()
+    return ConversationDataStorage()
 
-    def configure_interpreter(self, interpreter_type, configuration_parameters, api_key=None, api_endpoint=None):
-        """Sets up the interpreter with specific parameters for diagram generation."""
-        print(f"Configuring {interpreter_type} Interpreter...")
-        self.active_interpreter = interpreter_type
-        self.interpreter_parameters = configuration_parameters
 
-        if api_endpoint:
-            self.external_api_endpoint = api_endpoint
+def export_conversation_logs(log_path):
+    """Export one JSON Lines conversation log, or every log below a directory, to three-section JSON files."""
+    if os.path.isdir(log_path):
+        log_file_paths = [os.path.join(directory_path, file_name)
+                          for directory_path, _, file_names in os.walk(log_path)
+                          for file_name in sorted(file_names) if file_name.endswith(".jsonl")]
+    else:
+        log_file_paths = [log_path]
 
-    def execute_diagram_generation(self, diagram_code):
-        """Processes diagram code through the appropriate interpreter to generate a visual diagram."""
-        result = None
+    exported_file_paths = []
+    for log_file_path in log_file_paths:
+        exported_file_paths.append(ConversationDataStorage.export_conversation_log(log_file_path))
+        print(f"Exported {log_file_path} -> {exported_file_paths[-1]}")
+    return exported_file_paths
 
-        if self.active_interpreter == INTERPRETER_PLANTWEB_PLANTUML and PLANTWEB_RENDERER_AVAILABLE:
-            formatted_code = self.format_plantuml_code(diagram_code)
-            result = self.execute_plantweb_renderer(formatted_code, "plantuml")
-        elif self.active_interpreter == INTERPRETER_PLANTWEB_GRAPHVIZ and PLANTWEB_RENDERER_AVAILABLE:
-            formatted_code = self.format_graphviz_code(diagram_code)
-            result = self.execute_plantweb_renderer(formatted_code, "graphviz")
-        else:
-            print(f"Interpreter {self.active_interpreter} is not available or not supported")
 
-        if result and len(result) > 1:
-            if result[1].lower() == "svg" and isinstance(result[0], bytes):
-                # Convert SVG bytes to string for rendering
-                return (formatted_code, result[0].decode('utf-8'))
+class ConversationRetentionManager:
+    """
+    Keeps the conversation log directory within its age and size limits.
+
+    Each sweep deletes conversations that have not been written to for longer
+    than the maximum age. It trims conversations above the per-conversation cap
+    by removing their least recently modified content files, never the log
+    itself. While the directory is above the global cap it removes whole
+    conversations, least recently used first, counting with each conversation
+    the blobs only it references, and stops as soon as the directory fits.
+    Finally it deletes blobs that no remaining log references. Conversations
+    written to recently and those a storage is still writing are never removed.
+    Sweeps run on a background thread and count the bytes they reclaim.
+    """
 
-        return (formatted_code, result[0] if result else None)
+    BLOB_REFERENCE_PATTERN = re.compile(r'"(?:' + "|".join(ARTIFACT_BLOB_FIELDS) + r')_blob": "([0-9a-f]{64})"')
+
+    def __init__(self, log_root_directory=CONVERSATION_LOG_ROOT_DIRECTORY, blob_directory=ARTIFACT_BLOB_DIRECTORY,
+                 max_total_bytes=RETENTION_MAX_TOTAL_BYTES, max_conversation_bytes=RETENTION_MAX_CONVERSATION_BYTES,
+                 max_age_seconds=RETENTION_MAX_AGE_DAYS * 86400, sweep_interval_seconds=RETENTION_SWEEP_INTERVAL_S):
+        print("Initializing Conversation Retention Manager...")
+        self.log_root_directory = log_root_directory
+        self.blob_directory = blob_directory
+        self.max_total_bytes = max_total_bytes
+        self.max_conversation_bytes = max_conversation_bytes
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.sweep_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.sweeper_thread = None
+        self.statistics = {
+            "sweeps": 0,
+            "last_sweep_s": None,
+            "expired_conversations": 0,
+            "evicted_conversations": 0,
+            "evicted_artifacts": 0,
+            "deleted_blobs": 0,
+            "bytes_reclaimed": 0,
+            "last_bytes_reclaimed": 0,
+            "conversations": 0,
+            "managed_bytes": 0
+        }
 
-    def execute_plantweb_renderer(self, diagram_code, renderer_engine):
-        """Execute diagram rendering using the Plantweb library with specified engine."""
-        print(f"Executing {renderer_engine} on diagram code: {diagram_code[:20]}...")  # Log first 20 chars
-        if not PLANTWEB_RENDERER_AVAILABLE:
-            return None
+    def update_limits(self, max_total_bytes, max_conversation_bytes, max_age_seconds):
+        """Change the size caps and maximum age used by the following sweeps."""
+        self.max_total_bytes = max_total_bytes
+        self.max_conversation_bytes = max_conversation_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def start(self):
+        """Start the background sweeper, which sweeps once right away and then on every interval."""
+        if self.sweeper_thread is None:
+            self.sweeper_thread = threading.Thread(target=self.run_sweeper_loop, name="uml-log-retention", daemon=True)
+            self.sweeper_thread.start()
+
+    def run_sweeper_loop(self):
+        """Sweep until stopped."""
+        while True:
+            try:
+                self.sweep()
+            except Exception as error:
+                print(f"Log retention sweep error: {error}")
+            if self.stop_event.wait(self.sweep_interval_seconds):
+                return
+
+    def stop(self):
+        """Stop the background sweeper."""
+        self.stop_event.set()
+
+    def list_conversation_directories(self):
+        """Return the conversation directories of the day shards and of the older nested layout."""
+        conversation_directories = []
+        shard_root = os.path.join(self.log_root_directory, CONVERSATION_LOG_SHARD_DIRECTORY)
+        if os.path.isdir(shard_root):
+            for day_name in sorted(os.listdir(shard_root)):
+                day_directory = os.path.join(shard_root, day_name)
+                if os.path.isdir(day_directory):
+                    conversation_directories.extend(
+                        os.path.join(day_directory, conversation_name) for conversation_name in sorted(os.listdir(day_directory))
+                        if os.path.isdir(os.path.join(day_directory, conversation_name)))
+        # Conversations from before the sharded layout nest inside each other, so each tree is one unit
+        if os.path.isdir(self.log_root_directory):
+            conversation_directories.extend(
+                os.path.join(self.log_root_directory, entry_name) for entry_name in sorted(os.listdir(self.log_root_directory))
+                if entry_name.startswith("uml-gen-") and os.path.isdir(os.path.join(self.log_root_directory, entry_name)))
+        return conversation_directories
+
+    @staticmethod
+    def measure_directory(directory_path):
+        """Return the total size, the newest modification time and (mtime, size, path) of every file."""
+        directory_files = []
+        for walk_directory, _, file_names in os.walk(directory_path):
+            for file_name in file_names:
+                file_path = os.path.join(walk_directory, file_name)
+                try:
+                    file_status = os.stat(file_path)
+                except OSError:
+                    continue
+                directory_files.append((file_status.st_mtime, file_status.st_size, file_path))
+        newest_time = max((file_time for file_time, _, _ in directory_files), default=os.path.getmtime(directory_path))
+        return sum(file_size for _, file_size, _ in directory_files), newest_time, directory_files
+
+    @staticmethod
+    def is_open_conversation(directory_path, open_log_directories):
+        """Return whether a conversation directory holds, or for the nested layout contains, an open log."""
+        directory_path = os.path.abspath(directory_path)
+        return any(open_directory == directory_path or open_directory.startswith(directory_path + os.sep)
+                   for open_directory in open_log_directories)
+
+    def read_blob_references(self, directory_path):
+        """Return the digests of the blobs the logs of a conversation directory reference."""
+        referenced_digests = set()
+        for walk_directory, _, file_names in os.walk(directory_path):
+            for file_name in file_names:
+                if file_name.endswith(".jsonl"):
+                    with open(os.path.join(walk_directory, file_name), 'r', encoding='utf-8', errors='replace') as log_file:
+                        referenced_digests.update(self.BLOB_REFERENCE_PATTERN.findall(log_file.read()))
+        return referenced_digests
+
+    def remove_conversation(self, directory_path):
+        """Delete a conversation directory and its day shard once the shard is empty."""
+        shutil.rmtree(directory_path, ignore_errors=True)
+        day_directory = os.path.dirname(directory_path)
+        if os.path.dirname(day_directory) == os.path.join(self.log_root_directory, CONVERSATION_LOG_SHARD_DIRECTORY):
+            try:
+                os.rmdir(day_directory)
+            except OSError:
+                pass
+
+    def sweep(self):
+        """Apply age expiry, the per-conversation and global caps and blob collection; return the bytes reclaimed."""
+        with self.sweep_lock:
+            sweep_start_time = perf_counter_ns()
+            current_time = time.time()
+            sweep_counts = {"expired_conversations": 0, "evicted_conversations": 0, "evicted_artifacts": 0, "deleted_blobs": 0}
+            bytes_reclaimed = 0
+
+            open_log_directories = ConversationDataStorage.get_open_log_directories()
+            remaining_conversations = []
+            for directory_path in self.list_conversation_directories():
+                conversation_bytes, last_used_time, conversation_files = self.measure_directory(directory_path)
+                is_open = self.is_open_conversation(directory_path, open_log_directories)
+                if current_time - last_used_time > self.max_age_seconds and not is_open:
+                    self.remove_conversation(directory_path)
+                    sweep_counts["expired_conversations"] += 1
+                    bytes_reclaimed += conversation_bytes
+                    continue
+
+                # Least recently modified content files go first; the log is kept
+                for file_time, file_size, file_path in sorted(conversation_files):
+                    if conversation_bytes <= self.max_conversation_bytes:
+                        break
+                    if file_path.endswith((".jsonl", ".json")):
+                        continue
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        continue
+                    conversation_bytes -= file_size
+                    bytes_reclaimed += file_size
+                    sweep_counts["evicted_artifacts"] += 1
+                remaining_conversations.append((last_used_time, conversation_bytes, directory_path, is_open))
+
+            # Blob bytes are attributed by reference, so evicting a conversation frees the blobs only it references
+            conversation_references = {directory_path: self.read_blob_references(directory_path)
+                                       for _, _, directory_path, _ in remaining_conversations}
+            reference_counts = Counter(digest for referenced_digests in conversation_references.values()
+                                       for digest in referenced_digests)
+            collectable_blob_bytes = Counter()
+            blob_bytes = 0
+            if os.path.isdir(self.blob_directory):
+                for blob_time, blob_size, blob_path in self.measure_directory(self.blob_directory)[2]:
+                    blob_bytes += blob_size
+                    if current_time - blob_time >= RETENTION_BLOB_GRACE_S:
+                        collectable_blob_bytes[os.path.basename(blob_path).split(".")[0]] += blob_size
+            managed_bytes = sum(conversation_bytes for _, conversation_bytes, _, _ in remaining_conversations) + blob_bytes
+
+            for conversation in sorted(remaining_conversations):
+                last_used_time, conversation_bytes, directory_path, is_open = conversation
+                if managed_bytes <= self.max_total_bytes or current_time - last_used_time < RETENTION_ACTIVE_GRACE_S:
+                    break
+                if is_open:
+                    continue
+                self.remove_conversation(directory_path)
+                remaining_conversations.remove(conversation)
+                sweep_counts["evicted_conversations"] += 1
+                managed_bytes -= conversation_bytes
+                bytes_reclaimed += conversation_bytes
+                for digest in conversation_references.pop(directory_path):
+                    reference_counts[digest] -= 1
+                    if reference_counts[digest] == 0:
+                        # Counted here and deleted by the blob collection below
+                        managed_bytes -= collectable_blob_bytes[digest]
+
+            deleted_blobs, deleted_blob_bytes = self.delete_unreferenced_blobs(
+                set().union(*conversation_references.values()), current_time)
+            sweep_counts["deleted_blobs"] += deleted_blobs
+            bytes_reclaimed += deleted_blob_bytes
+            managed_bytes = sum(conversation_bytes for _, conversation_bytes, _, _ in remaining_conversations) + \
+                blob_bytes - deleted_blob_bytes
+
+            for counter_name, counter_value in sweep_counts.items():
+                self.statistics[counter_name] += counter_value
+            self.statistics["sweeps"] += 1
+            self.statistics["last_sweep_s"] = (perf_counter_ns() - sweep_start_time) / 1e+9
+            self.statistics["bytes_reclaimed"] += bytes_reclaimed
+            self.statistics["last_bytes_reclaimed"] = bytes_reclaimed
+            self.statistics["conversations"] = len(remaining_conversations)
+            self.statistics["managed_bytes"] = managed_bytes
+            return bytes_reclaimed
+
+    def delete_unreferenced_blobs(self, referenced_digests, current_time):
+        """Delete blobs outside the grace period that are not among the referenced digests; return their count and size."""
+        if not os.path.isdir(self.blob_directory):
+            return 0, 0
+        deleted_blobs = 0
+        deleted_blob_bytes = 0
+        for blob_time, blob_size, blob_path in self.measure_directory(self.blob_directory)[2]:
+            if os.path.basename(blob_path).split(".")[0] in referenced_digests or current_time - blob_time < RETENTION_BLOB_GRACE_S:
+                continue
+            try:
+                os.remove(blob_path)
+            except OSError:
+                continue
+            deleted_blobs += 1
+            deleted_blob_bytes += blob_size
+        return deleted_blobs, deleted_blob_bytes
+
+    def get_statistics(self):
+        """Return sweep counters, bytes reclaimed and the current managed size."""
+        return dict(self.statistics)
+
+
+@st.cache_resource
+def get_retention_manager():
+    """Return the process-wide retention manager with its background sweeper running."""
+    retention_manager = ConversationRetentionManager()
+    retention_manager.start()
+    atexit.register(retention_manager.stop)
+    return retention_manager
+
+
+class DiagramRenderCache:
+    """
+    Two-tier content-addressed cache for rendered diagrams.
+
+    Rendered output is keyed on a hash of the formatted diagram code, the renderer
+    engine and the output format. Recent renders are served from a bounded in-memory
+    LRU, and every render is also kept in an on-disk store that evicts the least
+    recently used files once it grows past its size limit.
+    """
+
+    def __init__(self, cache_directory=RENDER_CACHE_DIRECTORY, max_memory_entries=RENDER_CACHE_MAX_MEMORY_ENTRIES,
+                 max_disk_bytes=RENDER_CACHE_MAX_DISK_BYTES):
+        print("Initializing Diagram Render Cache...")
+        self.cache_directory = cache_directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_entries = OrderedDict()
+        self.disk_usage_bytes = None
+        self.cache_lock = threading.Lock()
+        self.statistics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+
+    def build_cache_key(self, diagram_code, renderer_engine, output_format):
+        """Build the content address for a formatted diagram, engine and output format."""
+        key_digest = hashlib.sha256()
+        for key_part in (renderer_engine, output_format, diagram_code):
+            key_digest.update(key_part.encode('utf-8'))
+            key_digest.update(b'\0')
+        return key_digest.hexdigest()
+
+    def lookup(self, cache_key, output_format):
+        """Return the cached rendering for a key, or None when it has not been rendered before."""
+        with self.cache_lock:
+            if cache_key in self.memory_entries:
+                self.memory_entries.move_to_end(cache_key)
+                self.statistics["memory_hits"] += 1
+                return self.memory_entries[cache_key]
+
+        cache_file = self.get_cache_file_path(cache_key, output_format)
+        try:
+            with open(cache_file, 'rb') as file:
+                rendered_output = file.read()
+            # Refresh the modification time so disk eviction follows recent use
+            os.utime(cache_file, None)
+        except OSError:
+            with self.cache_lock:
+                self.statistics["misses"] += 1
+            return None
+
+        with self.cache_lock:
+            self.statistics["disk_hits"] += 1
+            self.add_memory_entry(cache_key, rendered_output)
+        return rendered_output
+
+    def store(self, cache_key, output_format, rendered_output):
+        """Store a rendering in both cache tiers."""
+        if isinstance(rendered_output, str):
+            rendered_output = rendered_output.encode('utf-8')
+
+        with self.cache_lock:
+            self.statistics["stores"] += 1
+            self.add_memory_entry(cache_key, rendered_output)
+
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            cache_file = self.get_cache_file_path(cache_key, output_format)
+            temporary_file = f"{cache_file}.{uuid.uuid4().hex}.tmp"
+            with open(temporary_file, 'wb') as file:
+                file.write(rendered_output)
+            # Storing a key again replaces its file, whose bytes are already counted
+            try:
+                replaced_size = os.path.getsize(cache_file)
+            except OSError:
+                replaced_size = 0
+            os.replace(temporary_file, cache_file)
+        except OSError as error:
+            print(f"Error writing render cache file: {error}")
+            return
+
+        with self.cache_lock:
+            if self.disk_usage_bytes is None:
+                self.disk_usage_bytes = self.measure_disk_usage()
+            else:
+                self.disk_usage_bytes += len(rendered_output) - replaced_size
+            if self.disk_usage_bytes > self.max_disk_bytes:
+                self.evict_disk_entries()
+
+    def add_memory_entry(self, cache_key, rendered_output):
+        """Insert an entry into the in-memory LRU; the caller must hold the cache lock."""
+        self.memory_entries[cache_key] = rendered_output
+        self.memory_entries.move_to_end(cache_key)
+        while len(self.memory_entries) > self.max_memory_entries:
+            self.memory_entries.popitem(last=False)
+            self.statistics["memory_evictions"] += 1
+
+    def get_cache_file_path(self, cache_key, output_format):
+        """Return the on-disk location of a cache entry."""
+        return os.path.join(self.cache_directory, f"{cache_key}.{output_format}")
+
+    def list_disk_entries(self):
+        """List (modification time, size, path) for every file in the disk tier."""
+        disk_entries = []
+        try:
+            with os.scandir(self.cache_directory) as directory_entries:
+                for entry in directory_entries:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        entry_stat = entry.stat()
+                        disk_entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        except OSError:
+            pass
+        return disk_entries
+
+    def measure_disk_usage(self):
+        """Return the total size of the disk tier in bytes."""
+        return sum(size for _, size, _ in self.list_disk_entries())
+
+    def evict_disk_entries(self):
+        """Remove least recently used files until the disk tier fits its size limit; the caller must hold the cache lock."""
+        disk_entries = sorted(self.list_disk_entries())
+        self.disk_usage_bytes = sum(size for _, size, _ in disk_entries)
+        for _, size, path in disk_entries:
+            if self.disk_usage_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_usage_bytes -= size
+            self.statistics["disk_evictions"] += 1
+
+    def get_statistics(self):
+        """Return hit, miss and eviction counters together with the current tier sizes."""
+        with self.cache_lock:
+            cache_statistics = dict(self.statistics)
+            cache_statistics["memory_entries"] = len(self.memory_entries)
+            cache_statistics["disk_bytes"] = self.disk_usage_bytes
+        return cache_statistics
+
+    def clear(self):
+        """Drop every entry from both cache tiers."""
+        with self.cache_lock:
+            self.memory_entries.clear()
+        for _, _, path in self.list_disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self.cache_lock:
+            # Measured again on the next store, which also counts files stored while clearing
+            self.disk_usage_bytes = None
+
+
+@st.cache_resource
+def get_shared_render_cache():
+    """Return the process-wide render cache shared by all sessions and interpreters."""
+    return DiagramRenderCache()
+
+
+class PlantUMLRenderWorker:
+    """
+    A long-lived PlantUML JVM running in pipe mode.
+
+    Diagram source is written to the process's stdin and the rendered image is read
+    back from stdout up to the pipe delimiter, so the JVM start-up and class loading
+    cost is paid once per worker instead of once per render.
+    """
+
+    def __init__(self, java_executable, jar_path, output_format):
+        self.output_format = output_format
+        self.render_count = 0
+        self.output_buffer = b""
+        self.output_chunks = queue.Queue()
+        self.process = subprocess.Popen(
+            [java_executable, "-Djava.awt.headless=true", "-jar", jar_path,
+             "-pipe", f"-t{output_format}", "-charset", "UTF-8",
+             "-pipedelimitor", LOCAL_PLANTUML_PIPE_DELIMITER],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.reader_thread = threading.Thread(target=self.read_process_output, daemon=True)
+        self.reader_thread.start()
+
+    def read_process_output(self):
+        """Forward stdout chunks to the output queue until the process exits."""
+        while True:
+            output_chunk = self.process.stdout.read1(65536)
+            if not output_chunk:
+                self.output_chunks.put(None)
+                return
+            self.output_chunks.put(output_chunk)
+
+    def render(self, diagram_code, timeout_seconds):
+        """Render one diagram and return the raw image bytes."""
+        if not diagram_code.endswith("\n"):
+            diagram_code += "\n"
+        self.process.stdin.write(diagram_code.encode('utf-8'))
+        self.process.stdin.flush()
+
+        delimiter = LOCAL_PLANTUML_PIPE_DELIMITER.encode('utf-8')
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            delimiter_position = self.output_buffer.find(delimiter)
+            if delimiter_position >= 0:
+                rendered_output = self.output_buffer[:delimiter_position]
+                self.output_buffer = self.output_buffer[delimiter_position + len(delimiter):].lstrip(b"\r\n")
+                self.render_count += 1
+                return rendered_output
+
+            remaining_seconds = deadline - time.monotonic()
+            if remaining_seconds <= 0:
+                raise TimeoutError(f"PlantUML worker did not answer within {timeout_seconds}s")
+            try:
+                output_chunk = self.output_chunks.get(timeout=remaining_seconds)
+            except queue.Empty:
+                raise TimeoutError(f"PlantUML worker did not answer within {timeout_seconds}s")
+            if output_chunk is None:
+                raise RuntimeError("PlantUML worker process exited unexpectedly")
+            self.output_buffer += output_chunk
+
+    def is_alive(self):
+        """Return True while the JVM process is still running."""
+        return self.process.poll() is None
+
+    def stop(self):
+        """Terminate the JVM process."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+class PlantUMLRenderWorkerPool:
+    """
+    Bounded pool of warm PlantUML workers for offline rendering.
+
+    Each render borrows an idle worker, and workers are replaced after a timeout,
+    a crash, or a configurable number of renders so a leaking JVM never lives forever.
+    A worker that fails to start or warm up is respawned with exponential backoff,
+    so the pool returns to full size once Java and the jar work again.
+    """
+
+    def __init__(self, java_executable, jar_path, output_format, pool_size, request_timeout_seconds,
+                 recycle_after_renders):
+        print(f"Initializing Local PlantUML Worker Pool ({pool_size} x {output_format})...")
+        if shutil.which(java_executable) is None:
+            raise FileNotFoundError(f"Java executable '{java_executable}' not found")
+        if not os.path.isfile(jar_path):
+            raise FileNotFoundError(f"PlantUML jar '{jar_path}' not found")
+
+        self.java_executable = java_executable
+        self.jar_path = jar_path
+        self.output_format = output_format
+        self.pool_size = pool_size
+        self.request_timeout_seconds = request_timeout_seconds
+        self.recycle_after_renders = recycle_after_renders
+        self.idle_workers = queue.Queue()
+        # Every running worker, whether idle, rendering or warming up
+        self.spawned_workers = set()
+        self.pool_lock = threading.Lock()
+        self.consecutive_start_failures = 0
+        self.shutting_down = False
+        self.statistics = {
+            "renders": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "workers_started": 0,
+            "workers_recycled": 0,
+            "start_failures": 0,
+            "respawns_scheduled": 0
+        }
+
+        for _ in range(pool_size):
+            self.start_worker()
+
+    def start_worker(self):
+        """Start a worker and warm it up in the background before it takes requests."""
+        if self.shutting_down:
+            return
+        try:
+            worker = PlantUMLRenderWorker(self.java_executable, self.jar_path, self.output_format)
+        except Exception as error:
+            print(f"PlantUML worker start failed: {error}")
+            self.schedule_respawn()
+            return
+        with self.pool_lock:
+            self.statistics["workers_started"] += 1
+            self.spawned_workers.add(worker)
+            shutting_down = self.shutting_down
+        if shutting_down:
+            self.stop_worker(worker)
+            return
+        threading.Thread(target=self.warm_up_worker, args=(worker,), daemon=True).start()
+
+    def warm_up_worker(self, worker):
+        """Render a trivial diagram so the first real request does not pay for JIT warm-up."""
+        try:
+            worker.render(LOCAL_PLANTUML_WARM_UP_DIAGRAM, self.request_timeout_seconds * 4)
+        except Exception as error:
+            print(f"PlantUML worker warm-up failed: {error}")
+            self.stop_worker(worker)
+            self.schedule_respawn()
+            return
+        with self.pool_lock:
+            self.consecutive_start_failures = 0
+        worker.render_count = 0
+        self.idle_workers.put(worker)
+
+    def schedule_respawn(self):
+        """Start a replacement worker after a delay that doubles with every consecutive failure."""
+        with self.pool_lock:
+            self.statistics["start_failures"] += 1
+            self.statistics["respawns_scheduled"] += 1
+            respawn_delay = min(LOCAL_PLANTUML_RESPAWN_BACKOFF_S * 2 ** self.consecutive_start_failures,
+                                LOCAL_PLANTUML_RESPAWN_MAX_BACKOFF_S)
+            self.consecutive_start_failures += 1
+        respawn_timer = threading.Timer(respawn_delay, self.start_worker)
+        respawn_timer.daemon = True
+        respawn_timer.start()
+
+    def render(self, diagram_code):
+        """Render a diagram on the next idle worker and return the image bytes."""
+        try:
+            worker = self.idle_workers.get(timeout=self.request_timeout_seconds)
+        except queue.Empty:
+            with self.pool_lock:
+                self.statistics["timeouts"] += 1
+            raise TimeoutError("No PlantUML worker became available in time")
+
+        try:
+            rendered_output = worker.render(diagram_code, self.request_timeout_seconds)
+        except Exception as error:
+            with self.pool_lock:
+                self.statistics["failures"] += 1
+                if isinstance(error, TimeoutError):
+                    self.statistics["timeouts"] += 1
+            self.recycle_worker(worker)
+            raise
+
+        with self.pool_lock:
+            self.statistics["renders"] += 1
+        if worker.render_count >= self.recycle_after_renders or not worker.is_alive():
+            self.recycle_worker(worker)
+        else:
+            self.idle_workers.put(worker)
+        return rendered_output
+
+    def stop_worker(self, worker):
+        """Stop a worker and stop tracking it."""
+        worker.stop()
+        with self.pool_lock:
+            self.spawned_workers.discard(worker)
+
+    def recycle_worker(self, worker):
+        """Replace a worker with a fresh one."""
+        self.stop_worker(worker)
+        with self.pool_lock:
+            self.statistics["workers_recycled"] += 1
+        self.start_worker()
+
+    def get_statistics(self):
+        """Return render, failure and recycling counters."""
+        with self.pool_lock:
+            pool_statistics = dict(self.statistics)
+        pool_statistics["idle_workers"] = self.idle_workers.qsize()
+        return pool_statistics
+
+    def shutdown(self):
+        """Stop every worker, including those rendering or warming up, and any pending respawns."""
+        with self.pool_lock:
+            self.shutting_down = True
+            spawned_workers = list(self.spawned_workers)
+        for worker in spawned_workers:
+            self.stop_worker(worker)
+
+
+@st.cache_resource
+def get_local_plantuml_worker_pool(java_executable, jar_path, output_format, pool_size, request_timeout_seconds,
+                                   recycle_after_renders):
+    """Return the process-wide worker pool for a PlantUML jar and output format."""
+    worker_pool = PlantUMLRenderWorkerPool(java_executable, jar_path, output_format, pool_size,
+                                           request_timeout_seconds, recycle_after_renders)
+    atexit.register(worker_pool.shutdown)
+    return worker_pool
+
+
+class PlantUMLCorrectionRule:
+    """A named syntax correction rule with its own invocation, match and timing counters."""
+
+    __slots__ = ("name", "pattern", "rewrite_function", "description", "enabled",
+                 "invocations", "matches", "total_time_ns")
+
+    def __init__(self, name, pattern, rewrite_function, description="", enabled=True):
+        self.name = name
+        # Pattern rules rewrite each match; rules without a pattern rewrite the whole document
+        self.pattern = pattern
+        self.rewrite_function = rewrite_function
+        self.description = description
+        self.enabled = enabled
+        self.invocations = 0
+        self.matches = 0
+        self.total_time_ns = 0
+
+
+class PlantUMLSyntaxCorrector:
+    """
+    Corrects common PlantUML syntax errors produced by language models.
+
+    Correction rules live in an ordered registry and can be registered, moved
+    and disabled at runtime. The enabled pattern rules are compiled into a
+    single alternation, so every malformed construct is rewritten in one linear
+    scan; document rules such as brace balancing run after the scan. Each rule
+    records how often it is invoked, how often it matches and the time spent in it.
+    """
+
+    def __init__(self, disabled_rule_names=PLANTUML_DISABLED_CORRECTION_RULES):
+        print("Initializing PlantUML Syntax Corrector...")
+        self.correction_rules = []
+        self.registry_lock = threading.Lock()
+        self.scan_statistics = {"scans": 0, "scan_time_ns": 0}
+        self.compiled_rules = (None, {}, (), ())
+
+        # Pattern rules are tried in registry order at each position of the scan
+        self.register_rule("labeled_inheritance", r'class\s+(\w+)\s+<-\((\w+)\)\s*:\s*"([^"]+)"\s*{',
+                           self.correct_labeled_inheritance, "class Child <-(Parent) : \"label\" { → Child --|> Parent")
+        self.register_rule("inheritance", r'class\s+(\w+)\s+<-\((\w+)\)\s*{',
+                           self.correct_inheritance, "class Child <-(Parent) { → Child --|> Parent")
+        self.register_rule("upright_instance", r'(\w+)\s+(\w+)\s+:upright:\s+\"([^\"]+)\"\s+as\s+(\w+)',
+                           self.correct_upright_instance, "Class obj :upright: \"label\" as alias → Class \"label\" as alias")
+        self.register_rule("upright_arrow", r'(\w+)\s+o\d+\s+:upright\s+->\s+(\w+)\s+:is',
+                           self.correct_upright_arrow, "A oN :upright -> B :is → A --> B")
+        self.register_rule("upright_relationship", r'(\w+)\s+-upright:\s+(\w+)',
+                           self.correct_upright_relationship, "A -upright: B → A --> B")
+        self.register_rule("balance_braces", None, self.correct_unbalanced_braces,
+                           "Append missing closing braces before @enduml")
+
+        for rule_name in disabled_rule_names:
+            self.set_rule_enabled(rule_name, False)
+
+    def register_rule(self, name, pattern, rewrite_function, description="", position=None):
+        """Add a correction rule, or replace the rule with the same name, at the given position."""
+        correction_rule = PlantUMLCorrectionRule(name, pattern, rewrite_function, description)
+        with self.registry_lock:
+            rule_names = [rule.name for rule in self.correction_rules]
+            if name in rule_names:
+                existing_index = rule_names.index(name)
+                correction_rule.enabled = self.correction_rules[existing_index].enabled
+                del self.correction_rules[existing_index]
+                if position is None:
+                    position = existing_index
+            if position is None:
+                self.correction_rules.append(correction_rule)
+            else:
+                self.correction_rules.insert(position, correction_rule)
+            self.compile_rules()
+        return correction_rule
+
+    def unregister_rule(self, name):
+        """Remove a correction rule from the registry."""
+        with self.registry_lock:
+            self.correction_rules = [rule for rule in self.correction_rules if rule.name != name]
+            self.compile_rules()
+
+    def move_rule(self, name, position):
+        """Move a correction rule to a new position in the rule order."""
+        with self.registry_lock:
+            correction_rule = self.find_rule(name)
+            if not correction_rule:
+                print(f"Unknown correction rule: {name}")
+                return
+            self.correction_rules.remove(correction_rule)
+            self.correction_rules.insert(position, correction_rule)
+            self.compile_rules()
+
+    def set_rule_enabled(self, name, enabled):
+        """Enable or disable a correction rule without removing it from the registry."""
+        with self.registry_lock:
+            correction_rule = self.find_rule(name)
+            if not correction_rule:
+                print(f"Unknown correction rule: {name}")
+                return
+            correction_rule.enabled = enabled
+            self.compile_rules()
+
+    def find_rule(self, name):
+        """Return the registered rule with the given name, or None."""
+        for correction_rule in self.correction_rules:
+            if correction_rule.name == name:
+                return correction_rule
+        return None
+
+    def compile_rules(self):
+        """Compile the enabled pattern rules into one alternation; the caller holds the registry lock."""
+        combined_alternatives = []
+        rule_group_spans = {}
+        group_index = 0
+        pattern_rules = [rule for rule in self.correction_rules if rule.enabled and rule.pattern]
+        for rule_index, correction_rule in enumerate(pattern_rules):
+            # Map the outer group of each alternative to its rule and the span of its own groups
+            rule_group_count = re.compile(correction_rule.pattern).groups
+            group_index += 1
+            rule_group_spans[group_index] = (rule_index, group_index, group_index + rule_group_count)
+            combined_alternatives.append(f"({correction_rule.pattern})")
+            group_index += rule_group_count
+
+        combined_pattern = re.compile("|".join(combined_alternatives)) if combined_alternatives else None
+        document_rules = tuple(rule for rule in self.correction_rules if rule.enabled and not rule.pattern)
+        # Replaced as one tuple so running scans keep a consistent snapshot
+        self.compiled_rules = (combined_pattern, rule_group_spans, tuple(pattern_rules), document_rules)
+
+    def get_rule_statistics(self):
+        """Return the order, state and counters of every registered rule."""
+        with self.registry_lock:
+            return [
+                {
+                    "rule": correction_rule.name,
+                    "enabled": correction_rule.enabled,
+                    "invocations": correction_rule.invocations,
+                    "matches": correction_rule.matches,
+                    "total_time_ms": correction_rule.total_time_ns / 1e+6,
+                    "description": correction_rule.description
+                }
+                for correction_rule in self.correction_rules
+            ]
+
+    def reset_statistics(self):
+        """Reset the counters of every rule and of the shared scan."""
+        with self.registry_lock:
+            for correction_rule in self.correction_rules:
+                correction_rule.invocations = 0
+                correction_rule.matches = 0
+                correction_rule.total_time_ns = 0
+            self.scan_statistics = {"scans": 0, "scan_time_ns": 0}
+
+    def correct_labeled_inheritance(self, child, parent, label):
+        """Fix incorrect inheritance syntax with label: class Child <-(Parent) : "label" {"""
+        return (
+            f'class {child} {{',
+            f'{child} --|> {parent} : "{label}"',
+            f'Fixed labeled inheritance: \'class {child} <-({parent}) : "{label}"\' → \'class {child}\' with \'{child} --|> {parent} : "{label}"\''
+        )
+
+    def correct_inheritance(self, child, parent):
+        """Fix standard incorrect inheritance syntax: class Child <-(Parent) {"""
+        return (
+            f'class {child} {{',
+            f'{child} --|> {parent}',
+            f"Fixed inheritance syntax: 'class {child} <-({parent})' → 'class {child}' with '{child} --|> {parent}'"
+        )
+
+    def correct_upright_instance(self, class_name, obj_name, label, alias):
+        """Fix object/instance declarations with :upright: syntax"""
+        return (
+            f'{class_name} "{label}" as {alias}',
+            None,
+            f"Fixed instance declaration: '{class_name} {obj_name} :upright: \"{label}\" as {alias}' → '{class_name} \"{label}\" as {alias}'"
+        )
+
+    def correct_upright_arrow(self, src, dest):
+        """Fix relationship syntax errors like :upright ->"""
+        return (
+            f'{src} --> {dest}',
+            None,
+            f"Fixed relationship arrow: '{src} oN :upright -> {dest} :is' → '{src} --> {dest}'"
+        )
+
+    def correct_upright_relationship(self, src, dest):
+        """Fix other :upright relationships"""
+        return (
+            f'{src} --> {dest}',
+            None,
+            f"Fixed upright relationship: '{src} -upright: {dest}' → '{src} --> {dest}'"
+        )
+
+    def correct_unbalanced_braces(self, diagram_code):
+        """Check and fix unbalanced braces"""
+        open_braces = diagram_code.count('{')
+        close_braces = diagram_code.count('}')
+        if open_braces <= close_braces:
+            return diagram_code, None
+
+        missing_braces = open_braces - close_braces
+        if '@enduml' in diagram_code:
+            diagram_code = diagram_code.replace('@enduml', '}\n' * missing_braces + '@enduml')
+        else:
+            diagram_code += '}\n' * missing_braces
+        return diagram_code, f"Added {missing_braces} missing closing braces '}}'"
+
+    def format_plantuml_code(self, diagram_code):
+        """Format and correct PlantUML code to ensure proper syntax and rendering."""
+        combined_pattern, rule_group_spans, pattern_rules, document_rules = self.compiled_rules
+
+        # Remove language identifiers added by code formatters
+        if diagram_code.startswith("plantuml"):
+            diagram_code = diagram_code[8:]
+        diagram_code = diagram_code.lstrip("\n")
+
+        # Corrections, appended relationships and counters are grouped by rule, in rule order
+        rule_corrections = [[] for _ in pattern_rules]
+        rule_relationships = [[] for _ in pattern_rules]
+        rule_time_ns = [0] * len(pattern_rules)
+
+        def apply_correction_rule(match):
+            rewrite_start_time = perf_counter_ns()
+            # match.groups() is zero-based, so the outer group index is where the rule's own groups start
+            rule_index, first_group, last_group = rule_group_spans[match.lastindex]
+            replacement, appended_relationship, correction_message = pattern_rules[rule_index].rewrite_function(
+                *match.groups()[first_group:last_group])
+            if appended_relationship:
+                rule_relationships[rule_index].append(appended_relationship)
+            rule_corrections[rule_index].append(correction_message)
+            rule_time_ns[rule_index] += perf_counter_ns() - rewrite_start_time
+            return replacement
+
+        scan_start_time = perf_counter_ns()
+        if combined_pattern:
+            diagram_code = combined_pattern.sub(apply_correction_rule, diagram_code)
+        scan_time_ns = perf_counter_ns() - scan_start_time
+        syntax_corrections = [message for messages in rule_corrections for message in messages]
+
+        # Add proper inheritance relationships at the end
+        appended_relationships = "".join(
+            f"\n{relationship}\n" for relationships in rule_relationships for relationship in relationships)
+        if appended_relationships:
+            if '@enduml' in diagram_code:
+                diagram_code = diagram_code.replace('@enduml', appended_relationships + '@enduml')
+            else:
+                diagram_code += appended_relationships
+
+        document_rule_results = []
+        for correction_rule in document_rules:
+            rewrite_start_time = perf_counter_ns()
+            diagram_code, correction_message = correction_rule.rewrite_function(diagram_code)
+            document_rule_results.append((correction_message, perf_counter_ns() - rewrite_start_time))
+            if correction_message:
+                syntax_corrections.append(correction_message)
+
+        with self.registry_lock:
+            self.scan_statistics["scans"] += 1
+            self.scan_statistics["scan_time_ns"] += scan_time_ns
+            for correction_rule, corrections, time_ns in zip(pattern_rules, rule_corrections, rule_time_ns):
+                correction_rule.invocations += 1
+                correction_rule.matches += len(corrections)
+                correction_rule.total_time_ns += time_ns
+            for correction_rule, (correction_message, time_ns) in zip(document_rules, document_rule_results):
+                correction_rule.invocations += 1
+                correction_rule.matches += 1 if correction_message else 0
+                correction_rule.total_time_ns += time_ns
+
+        # Add start and end directives if not present
+        if not '@startuml' in diagram_code:
+            diagram_code = '@startuml\n' + diagram_code
+            syntax_corrections.append("Added missing @startuml directive")
+        if not '@enduml' in diagram_code:
+            diagram_code = diagram_code + '\n@enduml'
+            syntax_corrections.append("Added missing @enduml directive")
+
+        # If errors were fixed, add a comment at the top of the diagram
+        if syntax_corrections and '@startuml' in diagram_code:
+            comment_header = '\n'.join([f"' {msg}" for msg in syntax_corrections])
+            diagram_code = diagram_code.replace('@startuml', f'@startuml\n\n{comment_header}\n')
+
+        return diagram_code
+
+
+@st.cache_resource
+def get_shared_plantuml_syntax_corrector():
+    """Return the process-wide PlantUML syntax corrector with its compiled rules."""
+    return PlantUMLSyntaxCorrector()
+
+
+class DiagramInterpreterEngine:
+    """
+    Executes diagram generation from code using supported interpreters like PlantUML and Graphviz.
+
+    Responsibilities:
+    - Parse and validate diagram syntax
+    - Execute the appropriate renderer for the diagram type
+    - Apply error corrections to common syntax mistakes
+    - Return the rendered diagram in the requested format
+    """
+
+    def __init__(self):
+        print("Initializing Diagram Interpreter Engine...")
+        self.active_interpreter = None
+        self.interpreter_parameters = None
+        self.external_api_endpoint = None
+
+    def execute_diagram_generation(self, diagram_code, projection_name=None):
+        """Processes diagram code through the appropriate interpreter to generate a visual diagram."""
+        result = None
+
+        # Apply projection if specified
+        if projection_name and projection_name != "Full Diagram":
+            projection_manager = ProjectionManager()
+            diagram_code = projection_manager.apply_projection(diagram_code, projection_name)
+
+        if self.active_interpreter == INTERPRETER_PLANTWEB_PLANTUML and PLANTWEB_RENDERER_AVAILABLE:
+            formatted_code = self.format_plantuml_code(diagram_code)
+            result = self.execute_plantweb_renderer(formatted_code, "plantuml")
+        elif self.active_interpreter == INTERPRETER_PLANTWEB_GRAPHVIZ and PLANTWEB_RENDERER_AVAILABLE:
+            formatted_code = self.format_graphviz_code(diagram_code)
+            result = self.execute_plantweb_renderer(formatted_code, "graphviz")
+        else:
+            print(f"Interpreter {self.active_interpreter} is not available or not supported")
+
+        if result and len(result) > 1:
+            if result[1].lower() == "svg" and isinstance(result[0], bytes):
+                # Convert SVG bytes to string for rendering
+                return (formatted_code, result[0].decode('utf-8'))
+
+        return (formatted_code, result[0] if result else None)
+
+    def configure_interpreter(self, interpreter_type, configuration_parameters, api_key=None, api_endpoint=None):
+        """Sets up the interpreter with specific parameters for diagram generation."""
+        print(f"Configuring {interpreter_type} Interpreter...")
+        self.active_interpreter = interpreter_type
+        self.interpreter_parameters = configuration_parameters
+
+        if api_endpoint:
+            self.external_api_endpoint = api_endpoint
+
+    def execute_diagram_generation(self, diagram_code):
+        """Processes diagram code through the appropriate interpreter to generate a visual diagram."""
+        result = None
+
+        if self.active_interpreter == INTERPRETER_PLANTWEB_PLANTUML and PLANTWEB_RENDERER_AVAILABLE:
+            formatted_code = self.format_plantuml_code(diagram_code)
+            result = self.execute_plantweb_renderer(formatted_code, "plantuml")
+        elif self.active_interpreter == INTERPRETER_PLANTWEB_GRAPHVIZ and PLANTWEB_RENDERER_AVAILABLE:
+            formatted_code = self.format_graphviz_code(diagram_code)
+            result = self.execute_plantweb_renderer(formatted_code, "graphviz")
+        else:
+            print(f"Interpreter {self.active_interpreter} is not available or not supported")
+
+        if result and len(result) > 1:
+            if result[1].lower() == "svg" and isinstance(result[0], bytes):
+                # Convert SVG bytes to string for rendering
+                return (formatted_code, result[0].decode('utf-8'))
+
+        return (formatted_code, result[0] if result else None)
+
+    def execute_plantweb_renderer(self, diagram_code, renderer_engine):
+        """Execute diagram rendering using the Plantweb library with specified engine."""
+        print(f"Executing {renderer_engine} on diagram code: {diagram_code[:20]}...")  # Log first 20 chars
+        if not PLANTWEB_RENDERER_AVAILABLE:
+            return None
 
         try:
             output_format = self.interpreter_parameters.get('Output format', 'SVG').lower()
@@ -859,6 +3341,774 @@ class DiagramInterpreterEngine:
         return diagram_code
 
 
+class PooledHttpSession:
+    """
+    Keep-alive HTTP session for one language model provider and base URL.
+
+    The session is shared by every Streamlit session, so DNS, TCP and TLS setup
+    is paid once per pooled connection instead of once per prompt. Requests get
+    connect/read timeouts, and 429/5xx answers and failed connects are retried
+    with exponential backoff before any response body is streamed.
+    """
+
+    def __init__(self, provider, base_url, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                 connect_timeout_seconds=HTTP_CONNECT_TIMEOUT_S, read_timeout_seconds=HTTP_READ_TIMEOUT_S):
+        print(f"Initializing pooled HTTP session for {provider} at {base_url}...")
+        self.provider = provider
+        self.base_url = base_url
+        self.request_timeout = (connect_timeout_seconds, read_timeout_seconds)
+
+        # Read retries stay off: a prompt whose response already started streaming must not be sent twice
+        retry_policy = Retry(
+            total=HTTP_RETRY_TOTAL,
+            connect=HTTP_RETRY_TOTAL,
+            read=0,
+            status=HTTP_RETRY_TOTAL,
+            backoff_factor=HTTP_RETRY_BACKOFF_FACTOR,
+            status_forcelist=HTTP_RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.http_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                        max_retries=retry_policy)
+        self.session = requests.Session()
+        self.session.mount("http://", self.http_adapter)
+        self.session.mount("https://", self.http_adapter)
+
+        self.statistics_lock = threading.Lock()
+        self.statistics = {"requests": 0, "retries": 0, "failures": 0}
+
+    def post(self, url, **request_arguments):
+        """Send a POST request through the pooled session and record its retries."""
+        request_arguments.setdefault("timeout", self.request_timeout)
+        try:
+            response = self.session.post(url, **request_arguments)
+        except Exception:
+            with self.statistics_lock:
+                self.statistics["requests"] += 1
+                self.statistics["failures"] += 1
+            raise
+
+        retry_state = getattr(response.raw, "retries", None)
+        with self.statistics_lock:
+            self.statistics["requests"] += 1
+            self.statistics["retries"] += len(retry_state.history) if retry_state else 0
+        return response
+
+    def get_statistics(self):
+        """Return request, retry and connection reuse counts for this session."""
+        opened_connections = 0
+        reused_connections = 0
+        connection_pools = self.http_adapter.poolmanager.pools
+        with connection_pools.lock:
+            pool_keys = list(connection_pools.keys())
+        for pool_key in pool_keys:
+            connection_pool = connection_pools.get(pool_key)
+            if connection_pool is None:
+                continue
+            # Every request either opened a new connection or reused a pooled one
+            opened_connections += connection_pool.num_connections
+            reused_connections += max(0, connection_pool.num_requests - connection_pool.num_connections)
+
+        with self.statistics_lock:
+            session_statistics = dict(self.statistics)
+        session_statistics["opened_connections"] = opened_connections
+        session_statistics["reused_connections"] = reused_connections
+        return session_statistics
+
+
+@st.cache_resource
+def get_pooled_http_session(provider, base_url):
+    """Return the process-wide pooled HTTP session for a provider and base URL."""
+    pooled_session = PooledHttpSession(provider, base_url)
+    atexit.register(pooled_session.session.close)
+    return pooled_session
+
+
+class AsyncLanguageModelApiClient:
+    """
+    Asyncio client that streams from BigModel, Ollama and OpenAI-compatible endpoints.
+
+    All requests run on one event loop in a background thread and share one
+    httpx.AsyncClient, so many prompts can stream at the same time. A semaphore
+    per provider bounds how many requests each provider sees at once. The sync
+    adapters let the Streamlit script thread consume a stream as a plain
+    generator, or wait for a batch of prompts completed concurrently.
+    """
+
+    def __init__(self, provider_concurrency=ASYNC_LLM_MAX_CONCURRENCY):
+        print("Initializing Async Language Model API Client...")
+        self.provider_concurrency = provider_concurrency
+        self.provider_semaphores = {}
+        self.http_client = None
+        self.event_loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.event_loop.run_forever, name="uml-async-llm", daemon=True)
+        self.loop_thread.start()
+        self.statistics_lock = threading.Lock()
+        self.statistics = {"requests": 0, "active_requests": 0, "peak_active_requests": 0, "failures": 0}
+
+    @staticmethod
+    def format_chat_messages(conversation_context):
+        """Convert conversation messages into chat completion messages"""
+        formatted_conversation = []
+        for message in conversation_context:
+            if "format" in message and "role" in message:
+                if message["role"] == MESSAGE_ROLE_USER:
+                    formatted_conversation.append({"role": "user", "content": message["message"]})
+                elif message["role"] == MESSAGE_ROLE_ASSISTANT:
+                    formatted_conversation.append({"role": "assistant", "content": message["message"]})
+        return formatted_conversation
+
+    def get_provider_semaphore(self, provider):
+        """Return the semaphore bounding concurrent requests to a provider; runs on the event loop."""
+        if provider not in self.provider_semaphores:
+            self.provider_semaphores[provider] = asyncio.Semaphore(self.provider_concurrency.get(provider, 1))
+        return self.provider_semaphores[provider]
+
+    def get_http_client(self):
+        """Return the shared async HTTP client, created on the event loop on first use."""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(HTTP_READ_TIMEOUT_S, connect=HTTP_CONNECT_TIMEOUT_S),
+                limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE)
+            )
+        return self.http_client
+
+    def update_request_statistics(self, active_change, failed=False):
+        """Track started, active and failed requests."""
+        with self.statistics_lock:
+            if active_change > 0:
+                self.statistics["requests"] += 1
+            self.statistics["active_requests"] += active_change
+            self.statistics["peak_active_requests"] = max(
+                self.statistics["peak_active_requests"], self.statistics["active_requests"])
+            if failed:
+                self.statistics["failures"] += 1
+
+    async def stream_prompt(self, provider, model_name, conversation_context=None, user_prompt=None,
+                            model_parameters=None, base_url=None, api_key=None, ollama_context=None,
+                            context_callback=None, formatted_messages=None, keep_alive=None, metrics_callback=None):
+        """Stream the text fragments of one prompt as an async iterator"""
+        async with self.get_provider_semaphore(provider):
+            self.update_request_statistics(1)
+            request_failed = False
+            try:
+                if provider == API_PROVIDER_OLLAMA:
+                    response_fragments = self.stream_ollama_generate(
+                        base_url, model_name, user_prompt, model_parameters, ollama_context, context_callback,
+                        keep_alive, metrics_callback)
+                else:
+                    response_fragments = self.stream_chat_completion(
+                        base_url, api_key, model_name,
+                        formatted_messages if formatted_messages is not None
+                        else self.format_chat_messages(conversation_context or []),
+                        model_parameters)
+                async for text_fragment in response_fragments:
+                    yield text_fragment
+            except Exception:
+                request_failed = True
+                raise
+            finally:
+                self.update_request_statistics(-1, request_failed)
+
+    async def stream_chat_completion(self, base_url, api_key, model_name, messages, model_parameters):
+        """Stream a chat completion from a BigModel or OpenAI-compatible endpoint over server-sent events"""
+        request_headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+        request_data = {
+            "model": model_name,
+            "messages": messages,
+            "stream": True,
+            **(model_parameters or {})
+        }
+
+        async with self.get_http_client().stream(
+                "POST", f"{base_url}chat/completions", headers=request_headers, json=request_data) as response:
+            response.raise_for_status()
+            async for response_line in response.aiter_lines():
+                if not response_line.startswith("data: "):
+                    continue
+                event_data = response_line[6:].strip()
+                if event_data == "[DONE]":
+                    return
+                try:
+                    response_data = json.loads(event_data)
+                except json.JSONDecodeError:
+                    continue
+                text_fragment = (response_data.get("choices") or [{}])[0].get("delta", {}).get("content")
+                if text_fragment:
+                    yield text_fragment
+
+    async def stream_ollama_generate(self, endpoint, model_name, user_prompt, model_parameters, ollama_context,
+                                     context_callback, keep_alive=None, metrics_callback=None):
+        """Stream a generation from the Ollama API, which sends one JSON object per line"""
+        request_data = {
+            'model': model_name,
+            'prompt': user_prompt,
+            'stream': True,
+            'options': dict(model_parameters or {})
+        }
+        if ollama_context:
+            request_data['context'] = ollama_context
+        if keep_alive:
+            request_data['keep_alive'] = keep_alive
+
+        async with self.get_http_client().stream("POST", endpoint, json=request_data) as response:
+            response.raise_for_status()
+            async for response_line in response.aiter_lines():
+                if not response_line.strip():
+                    continue
+                try:
+                    response_data = json.loads(response_line)
+                except json.JSONDecodeError:
+                    continue
+                if 'context' in response_data and context_callback:
+                    context_callback(response_data['context'])
+                if response_data.get('done') and metrics_callback:
+                    metrics_callback(response_data)
+                if response_data.get('response'):
+                    yield response_data['response']
+
+    async def complete_prompt(self, **prompt_request):
+        """Return the full text of one prompt"""
+        response_fragments = []
+        async for text_fragment in self.stream_prompt(**prompt_request):
+            response_fragments.append(text_fragment)
+        return "".join(response_fragments)
+
+    async def complete_many(self, prompt_requests):
+        """Complete many prompts concurrently; failed prompts return their exception"""
+        return await asyncio.gather(
+            *(self.complete_prompt(**prompt_request) for prompt_request in prompt_requests),
+            return_exceptions=True
+        )
+
+    def stream_prompt_sync(self, **prompt_request):
+        """Sync adapter: stream one prompt from the event loop thread as a plain generator"""
+        fragment_queue = queue.Queue()
+        stream_finished = object()
+
+        async def pump_fragments():
+            try:
+                async for text_fragment in self.stream_prompt(**prompt_request):
+                    fragment_queue.put(text_fragment)
+            except Exception as error:
+                fragment_queue.put(error)
+            finally:
+                fragment_queue.put(stream_finished)
+
+        pump_future = asyncio.run_coroutine_threadsafe(pump_fragments(), self.event_loop)
+        try:
+            while True:
+                queued_item = fragment_queue.get()
+                if queued_item is stream_finished:
+                    return
+                if isinstance(queued_item, Exception):
+                    raise queued_item
+                yield queued_item
+        finally:
+            # Stop the request if the consumer stops reading early
+            pump_future.cancel()
+
+    def complete_many_sync(self, prompt_requests):
+        """Sync adapter: complete many prompts concurrently and return the texts in input order"""
+        return asyncio.run_coroutine_threadsafe(self.complete_many(prompt_requests), self.event_loop).result()
+
+    def get_statistics(self):
+        """Return request counters, including the peak number of concurrent requests."""
+        with self.statistics_lock:
+            return dict(self.statistics)
+
+    def shutdown(self):
+        """Close the HTTP client, finalize suspended response streams and stop the event loop."""
+        if self.http_client is not None:
+            asyncio.run_coroutine_threadsafe(self.http_client.aclose(), self.event_loop).result(timeout=5)
+        asyncio.run_coroutine_threadsafe(self.event_loop.shutdown_asyncgens(), self.event_loop).result(timeout=5)
+        self.event_loop.call_soon_threadsafe(self.event_loop.stop)
+
+
+@st.cache_resource
+def get_async_language_model_client():
+    """Return the process-wide async language model client, or None when httpx is not installed."""
+    if not HTTPX_AVAILABLE:
+        return None
+    async_client = AsyncLanguageModelApiClient()
+    atexit.register(async_client.shutdown)
+    return async_client
+
+
+class OllamaSessionManager:
+    """
+    Keeps an Ollama model loaded and its system prompt prefixes evaluated.
+
+    One manager is shared per server and model. Every request asks the server
+    to keep the model resident for the keep_alive period, and a warm-up request
+    loads the model before the first prompt. The context tokens of each system
+    prompt are computed once. New conversations start from that prefix, so the
+    server reuses its KV cache and evaluates only the new prompt. Timings of
+    finished generations are aggregated for comparison.
+    """
+
+    def __init__(self, base_url, model_name, keep_alive):
+        print(f"Initializing Ollama session for {model_name} at {base_url}...")
+        self.generate_endpoint = f"{base_url.rstrip('/')}/api/generate"
+        self.model_name = model_name
+        self.keep_alive = keep_alive
+        self.http_session = get_pooled_http_session(API_PROVIDER_OLLAMA, self.generate_endpoint)
+        # Futures of prefix contexts, so each prefix is evaluated once without holding a lock during the request
+        self.prefix_contexts = {}
+        self.prefix_lock = threading.Lock()
+        self.statistics_lock = threading.Lock()
+        self.statistics = {
+            "warm_ups": 0,
+            "warm_up_failures": 0,
+            "last_warm_up_s": None,
+            "prefix_hits": 0,
+            "prefix_misses": 0,
+            "generations": 0,
+            "prompt_eval_count": 0,
+            "prompt_eval_s": 0.0,
+            "eval_count": 0,
+            "eval_s": 0.0,
+            "load_s": 0.0,
+            "last_generation": None
+        }
+
+    def warm_up(self):
+        """Load the model on the server; an empty prompt loads it without generating."""
+        warm_up_start_time = perf_counter_ns()
+        try:
+            response = self.http_session.post(self.generate_endpoint, json={
+                "model": self.model_name, "prompt": "", "stream": False, "keep_alive": self.keep_alive})
+            response.raise_for_status()
+        except Exception as error:
+            print(f"Ollama warm-up error: {error}")
+            with self.statistics_lock:
+                self.statistics["warm_up_failures"] += 1
+            return False
+        with self.statistics_lock:
+            self.statistics["warm_ups"] += 1
+            self.statistics["last_warm_up_s"] = (perf_counter_ns() - warm_up_start_time) / 1e+9
+        return True
+
+    def start_warm_up(self):
+        """Warm the model up in the background so model selection does not block."""
+        threading.Thread(target=self.warm_up, name="uml-ollama-warm-up", daemon=True).start()
+
+    def get_prefix_context(self, system_prompt, model_parameters):
+        """Return the context tokens of a system prompt, evaluating it on the server only the first time."""
+        prefix_key = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        with self.prefix_lock:
+            prefix_future = self.prefix_contexts.get(prefix_key)
+            evaluates_prefix = prefix_future is None
+            if evaluates_prefix:
+                prefix_future = Future()
+                self.prefix_contexts[prefix_key] = prefix_future
+        with self.statistics_lock:
+            self.statistics["prefix_misses" if evaluates_prefix else "prefix_hits"] += 1
+
+        # Concurrent sessions with the same system prompt wait for the one evaluation in flight
+        if not evaluates_prefix:
+            prefix_context = prefix_future.result()
+            return list(prefix_context) if prefix_context else None
+
+        prefix_context = self.evaluate_prefix(system_prompt, model_parameters)
+        if not prefix_context:
+            # Forget the failed evaluation so a later conversation retries it
+            with self.prefix_lock:
+                del self.prefix_contexts[prefix_key]
+        prefix_future.set_result(prefix_context)
+        return list(prefix_context) if prefix_context else None
+
+    def evaluate_prefix(self, system_prompt, model_parameters):
+        """Evaluate a system prompt on the server and return its context tokens without generated tokens."""
+        try:
+            # The system field applies the model's system template; a single token is the smallest
+            # limit, since Ollama treats num_predict=0 as unlimited
+            response = self.http_session.post(self.generate_endpoint, json={
+                "model": self.model_name,
+                "system": system_prompt,
+                "prompt": OLLAMA_PREFIX_PROMPT,
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": dict(model_parameters or {}, num_predict=1)
+            })
+            response.raise_for_status()
+            response_data = response.json()
+        except Exception as error:
+            print(f"Ollama prefix evaluation error: {error}")
+            return None
+
+        self.record_generation_metrics(response_data)
+        prefix_context = response_data.get("context") or []
+        # The context ends with the generated tokens, which are not part of the prefix
+        generated_count = response_data.get("eval_count", 0)
+        if generated_count:
+            prefix_context = prefix_context[:-generated_count]
+        return prefix_context or None
+
+    def record_generation_metrics(self, response_data):
+        """Aggregate the token counts and timings Ollama reports on the final chunk of a generation."""
+        if not response_data.get("done"):
+            return
+        generation_metrics = {
+            "prompt_eval_count": response_data.get("prompt_eval_count", 0),
+            "prompt_eval_s": response_data.get("prompt_eval_duration", 0) / 1e+9,
+            "eval_count": response_data.get("eval_count", 0),
+            "eval_s": response_data.get("eval_duration", 0) / 1e+9,
+            "load_s": response_data.get("load_duration", 0) / 1e+9
+        }
+        with self.statistics_lock:
+            self.statistics["generations"] += 1
+            for metric_name, metric_value in generation_metrics.items():
+                self.statistics[metric_name] += metric_value
+            self.statistics["last_generation"] = generation_metrics
+
+    def get_statistics(self):
+        """Return warm-up, prefix cache and generation timing counters."""
+        with self.statistics_lock:
+            cached_prefixes = sum(1 for prefix_future in self.prefix_contexts.values() if prefix_future.done())
+            return dict(self.statistics, cached_prefixes=cached_prefixes)
+
+
+@st.cache_resource
+def get_ollama_session_manager(base_url, model_name, keep_alive):
+    """Return the process-wide Ollama session manager for a server, model and keep-alive period."""
+    return OllamaSessionManager(base_url, model_name, keep_alive)
+
+
+class LlamaCppGenerationWorker:
+    """
+    In-process llama.cpp model served by a single generation thread.
+
+    The GGUF model is loaded once and shared by every Streamlit session. A
+    llama.cpp context is not thread-safe, so requests are queued and generated
+    one at a time on the worker thread. Each caller consumes its own chunk queue
+    as a plain generator, and closing that generator cancels the request
+    between tokens.
+    """
+
+    def __init__(self, model_path, n_threads, n_ctx, use_mmap, use_mlock):
+        print("Initializing llama.cpp Generation Worker...")
+        load_start_time = perf_counter_ns()
+        self.model = Llama(model_path=model_path, n_threads=n_threads, n_ctx=n_ctx,
+                           use_mmap=use_mmap, use_mlock=use_mlock, verbose=False)
+        self.request_queue = queue.Queue()
+        self.statistics_lock = threading.Lock()
+        self.statistics = {
+            "model_path": model_path,
+            "load_time_s": (perf_counter_ns() - load_start_time) / 1e+9,
+            "requests": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "failures": 0,
+            "generated_chunks": 0,
+            "queue_wait_s": 0.0,
+            "generation_time_s": 0.0
+        }
+        self.worker_thread = threading.Thread(target=self.run_generation_loop, name="uml-llama-cpp", daemon=True)
+        self.worker_thread.start()
+
+    def run_generation_loop(self):
+        """Generate queued requests one after another until shutdown."""
+        while True:
+            generation_request = self.request_queue.get()
+            if generation_request is None:
+                return
+            messages, generation_parameters, chunk_queue, cancel_event, enqueue_time = generation_request
+            generation_start_time = perf_counter_ns()
+            outcome = "completed"
+            generated_chunks = 0
+            try:
+                if cancel_event.is_set():
+                    outcome = "cancelled"
+                else:
+                    for response_chunk in self.model.create_chat_completion(
+                            messages=messages, stream=True, **generation_parameters):
+                        if cancel_event.is_set():
+                            outcome = "cancelled"
+                            break
+                        chunk_queue.put(response_chunk)
+                        generated_chunks += 1
+            except Exception as error:
+                print(f"llama.cpp generation error: {error}")
+                outcome = "failures"
+            finally:
+                chunk_queue.put(None)
+                with self.statistics_lock:
+                    self.statistics[outcome] += 1
+                    self.statistics["generated_chunks"] += generated_chunks
+                    self.statistics["queue_wait_s"] += (generation_start_time - enqueue_time) / 1e+9
+                    self.statistics["generation_time_s"] += (perf_counter_ns() - generation_start_time) / 1e+9
+
+    def stream_chat_completion(self, messages, generation_parameters):
+        """Queue a chat completion and yield its chunks as the worker generates them."""
+        chunk_queue = queue.Queue()
+        cancel_event = threading.Event()
+        with self.statistics_lock:
+            self.statistics["requests"] += 1
+        self.request_queue.put((messages, generation_parameters, chunk_queue, cancel_event, perf_counter_ns()))
+        try:
+            while True:
+                response_chunk = chunk_queue.get()
+                if response_chunk is None:
+                    return
+                yield response_chunk
+        finally:
+            cancel_event.set()
+
+    def get_statistics(self):
+        """Return load time, request outcomes and the number of queued requests."""
+        with self.statistics_lock:
+            return dict(self.statistics, queue_depth=self.request_queue.qsize())
+
+    def shutdown(self):
+        """Stop the worker thread once the queued requests are done."""
+        self.request_queue.put(None)
+
+
+@st.cache_resource
+def get_llama_cpp_worker(model_path, n_threads, n_ctx, use_mmap, use_mlock):
+    """Return the process-wide llama.cpp worker for a model file and its load settings."""
+    if not LLAMA_CPP_MODEL_AVAILABLE:
+        raise RuntimeError("llama-cpp-python library not available")
+    # Load failures raise, so they are not cached and a corrected model file is picked up
+    generation_worker = LlamaCppGenerationWorker(model_path, n_threads, n_ctx, use_mmap, use_mlock)
+    atexit.register(generation_worker.shutdown)
+    return generation_worker
+
+
+class LanguageModelResponseCache:
+    """
+    SQLite cache of complete language model responses for deterministic prompts.
+
+    Entries are keyed on a hash of the provider, model, parameters and the
+    normalized conversation. Hits are replayed as a stream of small chunks, so
+    callers consume them exactly like a live response. Entries expire after a
+    TTL, and the least recently used entries are evicted above a size budget.
+    """
+
+    def __init__(self, database_path=LLM_RESPONSE_CACHE_PATH, ttl_seconds=LLM_RESPONSE_CACHE_TTL_S,
+                 max_bytes=LLM_RESPONSE_CACHE_MAX_BYTES):
+        print("Initializing LLM Response Cache...")
+        self.database_path = database_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.database_lock = threading.Lock()
+        self.statistics = {"hits": 0, "misses": 0, "stores": 0, "expirations": 0, "evictions": 0}
+
+        self.database_connection = sqlite3.connect(database_path, check_same_thread=False, timeout=10)
+        with self.database_lock, self.database_connection:
+            self.database_connection.execute("PRAGMA journal_mode=WAL")
+            self.database_connection.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model_name TEXT,
+                    response_text TEXT,
+                    provider_state TEXT,
+                    created_at REAL,
+                    last_accessed_at REAL,
+                    hit_count INTEGER DEFAULT 0,
+                    size_bytes INTEGER
+                )""")
+            self.database_connection.execute(
+                "CREATE INDEX IF NOT EXISTS llm_responses_last_accessed ON llm_responses (last_accessed_at)")
+
+    @staticmethod
+    def build_cache_key(provider, model_name, model_parameters, normalized_conversation):
+        """Hash everything that determines a deterministic response."""
+        key_material = json.dumps({
+            "provider": provider,
+            "model": model_name,
+            "parameters": model_parameters or {},
+            "conversation": normalized_conversation
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def lookup(self, cache_key):
+        """Return (response_text, provider_state) for a live entry, or None."""
+        current_time = time.time()
+        with self.database_lock, self.database_connection:
+            cached_row = self.database_connection.execute(
+                "SELECT response_text, provider_state, created_at FROM llm_responses WHERE cache_key = ?",
+                (cache_key,)).fetchone()
+            if cached_row and current_time - cached_row[2] > self.ttl_seconds:
+                self.database_connection.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+                self.statistics["expirations"] += 1
+                cached_row = None
+            if not cached_row:
+                self.statistics["misses"] += 1
+                return None
+
+            self.database_connection.execute(
+                "UPDATE llm_responses SET last_accessed_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                (current_time, cache_key))
+            self.statistics["hits"] += 1
+        return cached_row[0], json.loads(cached_row[1]) if cached_row[1] else None
+
+    def store(self, cache_key, provider, model_name, response_text, provider_state=None):
+        """Insert a response, then drop expired entries and evict the least recently used above the size budget."""
+        current_time = time.time()
+        size_bytes = len(response_text.encode("utf-8"))
+        try:
+            with self.database_lock, self.database_connection:
+                self.database_connection.execute(
+                    "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                    (cache_key, provider, model_name, response_text,
+                     json.dumps(provider_state) if provider_state is not None else None,
+                     current_time, current_time, size_bytes))
+                self.statistics["stores"] += 1
+
+                expired_entries = self.database_connection.execute(
+                    "DELETE FROM llm_responses WHERE created_at < ?", (current_time - self.ttl_seconds,)).rowcount
+                self.statistics["expirations"] += expired_entries
+
+                total_bytes = self.database_connection.execute(
+                    "SELECT COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()[0]
+                if total_bytes > self.max_bytes:
+                    evicted_keys = []
+                    for entry_key, entry_size in self.database_connection.execute(
+                            "SELECT cache_key, size_bytes FROM llm_responses ORDER BY last_accessed_at"):
+                        if total_bytes <= self.max_bytes:
+                            break
+                        evicted_keys.append((entry_key,))
+                        total_bytes -= entry_size
+                    self.database_connection.executemany("DELETE FROM llm_responses WHERE cache_key = ?", evicted_keys)
+                    self.statistics["evictions"] += len(evicted_keys)
+        except sqlite3.Error as error:
+            print(f"Error storing LLM response in cache: {error}")
+
+    @staticmethod
+    def replay_response(response_text, chunk_chars=LLM_RESPONSE_CACHE_REPLAY_CHUNK_CHARS):
+        """Yield a cached response in small chunks, like a live stream."""
+        for chunk_start in range(0, len(response_text), chunk_chars):
+            yield response_text[chunk_start:chunk_start + chunk_chars]
+
+    def get_statistics(self):
+        """Return hit, miss and eviction counts, the hit rate and the current size of the cache."""
+        with self.database_lock:
+            entry_count, total_bytes = self.database_connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses").fetchone()
+            cache_statistics = dict(self.statistics)
+        lookups = cache_statistics["hits"] + cache_statistics["misses"]
+        cache_statistics["hit_rate"] = cache_statistics["hits"] / lookups if lookups else 0.0
+        cache_statistics["entries"] = entry_count
+        cache_statistics["total_bytes"] = total_bytes
+        return cache_statistics
+
+    def clear(self):
+        """Remove every cached response."""
+        with self.database_lock, self.database_connection:
+            self.database_connection.execute("DELETE FROM llm_responses")
+
+
+@st.cache_resource
+def get_shared_llm_response_cache():
+    """Return the process-wide LLM response cache."""
+    return LanguageModelResponseCache()
+
+
+class ProviderMessageListBuilder:
+    """
+    Incrementally maintained wire-format view of a conversation.
+
+    Each conversation message is converted to the provider format once and kept
+    under its identity, its role and content, rather than its position. When
+    compaction shortens or drops older turns, or a message is edited, only the
+    new or changed messages are converted; the others are reused wherever they
+    now sit in the list. The chat message JSON and the Replicate prompt are
+    built from per-message fragments that are also kept with each message.
+    """
+
+    def __init__(self):
+        self.statistics = {"appended_messages": 0, "invalidated_messages": 0, "resets": 0}
+        self.reset()
+
+    def reset(self):
+        """Forget every converted message, for example after a provider change."""
+        self.message_entries = []
+        self.entries_by_key = {}
+        self.formatted_messages = []
+        self.messages_json = None
+        self.replicate_prompt = None
+        self.statistics["resets"] += 1
+
+    @staticmethod
+    def get_message_key(message):
+        """Return the identity of a conversation message."""
+        return message.get(ROLE), MSG_FORMAT in message, message.get(MSG)
+
+    @staticmethod
+    def convert_message(message):
+        """Return the chat message a provider receives for a conversation message, or None."""
+        if MSG_FORMAT in message and ROLE in message:
+            if message[ROLE] == ROLE_US:
+                return {"role": "user", "content": message[MSG]}
+            elif message[ROLE] == ROLE_AS:
+                return {"role": "assistant", "content": message[MSG]}
+        return None
+
+    def update(self, conversation_context):
+        """Bring the converted list in line with the conversation and return the chat messages."""
+        message_entries = []
+        entries_by_key = {}
+        for message in conversation_context:
+            message_key = self.get_message_key(message)
+            message_entry = entries_by_key.get(message_key) or self.entries_by_key.get(message_key)
+            if message_entry is None:
+                # The JSON fragment and the Replicate line are built on first use
+                message_entry = {"formatted": self.convert_message(message), "json": None, "replicate_line": None}
+                self.statistics["appended_messages"] += 1
+            entries_by_key[message_key] = message_entry
+            message_entries.append(message_entry)
+
+        if len(message_entries) != len(self.message_entries) or any(
+                message_entry is not previous_entry
+                for message_entry, previous_entry in zip(message_entries, self.message_entries)):
+            self.statistics["invalidated_messages"] += len(self.entries_by_key.keys() - entries_by_key.keys())
+            self.message_entries = message_entries
+            self.formatted_messages = [message_entry["formatted"] for message_entry in message_entries
+                                       if message_entry["formatted"] is not None]
+            self.messages_json = None
+            self.replicate_prompt = None
+        self.entries_by_key = entries_by_key
+        return self.formatted_messages
+
+    def get_messages_json(self, conversation_context):
+        """Return the chat messages as a JSON array, serializing only messages not serialized before."""
+        self.update(conversation_context)
+        if self.messages_json is None:
+            json_fragments = []
+            for message_entry in self.message_entries:
+                if message_entry["formatted"] is None:
+                    continue
+                if message_entry["json"] is None:
+                    message_entry["json"] = json.dumps(message_entry["formatted"])
+                json_fragments.append(message_entry["json"])
+            self.messages_json = "[" + ", ".join(json_fragments) + "]"
+        return self.messages_json
+
+    def get_replicate_prompt(self, conversation_context):
+        """Return the Replicate prompt, formatting only messages not formatted before."""
+        self.update(conversation_context)
+        if self.replicate_prompt is None:
+            replicate_lines = []
+            for message_entry in self.message_entries:
+                formatted_message = message_entry["formatted"]
+                if formatted_message is None:
+                    continue
+                if message_entry["replicate_line"] is None:
+                    message_entry["replicate_line"] = f"{formatted_message['role']}: {formatted_message['content']}\n"
+                replicate_lines.append(message_entry["replicate_line"])
+            self.replicate_prompt = ("You are a helpful assistant. You do not respond as 'user' or pretend to be 'user'. "
+                                     "You only respond once as 'assistant'.\n\n" + "".join(replicate_lines))
+        return self.replicate_prompt
+
+
 class LanguageModelApiClient:
     """Client for interacting with various language model APIs to generate UML diagrams and explanations"""
 
@@ -871,14 +4121,29 @@ class LanguageModelApiClient:
         self.api_endpoint = None
         self.api_base_url = None
         self.model_name_identifier = None
+        self.http_session = None
+        self.llama_cpp_settings = None
+        self.llama_cpp_worker = None
+        self.ollama_settings = None
+        self.ollama_session = None
+        self.use_async_client = False
+        self.use_response_cache = False
+        self.message_list_builder = ProviderMessageListBuilder()
+        self.race_contenders = []
+        self.race_hedge_delay_seconds = RACE_HEDGE_DELAY_MS / 1000
+        self.streaming_response = None
+        self.race_statistics = {"races": 0, "wins": {}, "ttft_history": {}, "last_race": None}
         self.model_response_history = []
         self.model_generation_in_progress = False
         self.model_response_accumulator = []
 
     def initialize_language_model(self, selected_model, model_api_identifier, model_configuration_parameters,
-                                 api_key=None, api_endpoint=None, base_url=None, model_name=None):
+                                 api_key=None, api_endpoint=None, base_url=None, model_name=None, use_async_client=False,
+                                 use_response_cache=False, llama_cpp_settings=None, ollama_settings=None):
         """Configures the language model with specified parameters and API credentials"""
         print(f"Initializing {selected_model} Language Model...")
+        self.use_async_client = use_async_client
+        self.use_response_cache = use_response_cache
 
         self.active_model = selected_model
         self.active_model_api_identifier = model_api_identifier
@@ -887,38 +4152,280 @@ class LanguageModelApiClient:
         self.api_base_url = base_url or DEFAULT_API_CONFIGURATION["base_url"]["value"]
         self.model_name_identifier = model_name or DEFAULT_API_CONFIGURATION["model_name"]["value"]
 
+        self.ollama_settings = ollama_settings or {"base_url": OLLAMA_BASE_URL, "keep_alive": OLLAMA_KEEP_ALIVE}
+
         # Configure appropriate API endpoints based on model provider
         if api_endpoint:
             self.api_endpoint = api_endpoint
         elif selected_model.startswith(API_PROVIDER_OLLAMA):
-            self.api_endpoint = "http://127.0.0.1:11434/api/generate"
+            self.api_endpoint = f"{self.ollama_settings['base_url'].rstrip('/')}/api/generate"
         elif selected_model.startswith(API_PROVIDER_BIGMODEL):
             self.api_endpoint = self.api_base_url
 
+        # Messages converted for the previous provider may not match the new wire format
+        self.message_list_builder.reset()
+
+        # Reuse keep-alive connections to the HTTP providers across prompts and sessions
+        self.http_session = None
+        if selected_model.startswith(API_PROVIDER_OLLAMA):
+            self.http_session = get_pooled_http_session(API_PROVIDER_OLLAMA, self.api_endpoint)
+        elif selected_model.startswith(API_PROVIDER_BIGMODEL):
+            self.http_session = get_pooled_http_session(API_PROVIDER_BIGMODEL, self.api_base_url)
+
+        # Load the Ollama model ahead of the first prompt and keep it resident between turns
+        self.ollama_session = None
+        if selected_model.startswith(API_PROVIDER_OLLAMA):
+            self.ollama_session = get_ollama_session_manager(
+                self.ollama_settings["base_url"], self.active_model_api_identifier, self.ollama_settings["keep_alive"])
+            self.ollama_session.start_warm_up()
+
+        # Preload the shared llama.cpp model so the first prompt does not wait for it
+        self.llama_cpp_settings = llama_cpp_settings or {
+            "model_path": LLAMA_CPP_MODEL_PATH, "n_threads": LLAMA_CPP_N_THREADS, "n_ctx": LLAMA_CPP_N_CTX,
+            "use_mmap": LLAMA_CPP_USE_MMAP, "use_mlock": LLAMA_CPP_USE_MLOCK
+        }
+        self.llama_cpp_worker = None
+        if selected_model.startswith(API_PROVIDER_LLAMA_CPP):
+            self.load_llama_cpp_worker()
+
         # Reset conversation context
         self.clear_conversation_history()
 
     def process_user_prompt(self, conversation_context, user_prompt):
-        """Processes user prompt through the appropriate language model API"""
+        """Processes user prompt through the appropriate language model API, replaying cached responses when enabled"""
+        # Only deterministic generations can be replayed
+        if not self.use_response_cache or (self.model_parameters or {}).get("temperature") != 0:
+            return self.dispatch_user_prompt(conversation_context, user_prompt)
+
+        response_cache = get_shared_llm_response_cache()
+        cache_key = response_cache.build_cache_key(
+            "|".join([self.active_model] + [model_id for model_id, _ in self.race_contenders]),
+            self.model_name_identifier,
+            self.model_parameters,
+            self.normalize_conversation(conversation_context, user_prompt)
+        )
+        cached_response = response_cache.lookup(cache_key)
+        if cached_response:
+            response_text, provider_state = cached_response
+            if provider_state is not None:
+                self.conversation_context = provider_state
+            return response_cache.replay_response(response_text), lambda text_fragment: text_fragment
+
+        response_stream, response_parser = self.dispatch_user_prompt(conversation_context, user_prompt)
+        # Failed requests come back as an empty stream and are not cached
+        if not response_stream:
+            return response_stream, response_parser
+        return self.record_response_stream(response_cache, cache_key, response_stream, response_parser), \
+            lambda text_fragment: text_fragment
+
+    def normalize_conversation(self, conversation_context, user_prompt):
+        """Reduce the conversation to the roles and trimmed contents the model sees"""
+        normalized_conversation = [
+            {"role": message["role"], "content": message["content"].replace("\r\n", "\n").strip()}
+            for message in AsyncLanguageModelApiClient.format_chat_messages(conversation_context)
+        ]
+        if self.active_model.startswith(API_PROVIDER_OLLAMA):
+            # Ollama answers the prompt within the token context of earlier turns
+            normalized_conversation.append({"prompt": user_prompt.strip(), "context": self.conversation_context})
+        return normalized_conversation
+
+    def record_response_stream(self, response_cache, cache_key, response_stream, response_parser):
+        """Yield parsed fragments while collecting them, and cache the response once the stream completes"""
+        response_fragments = []
+        for response_chunk in response_stream:
+            text_fragment = response_parser(response_chunk)
+            if text_fragment:
+                response_fragments.append(text_fragment)
+                yield text_fragment
+
+        response_text = "".join(response_fragments)
+        if response_text:
+            provider_state = self.conversation_context if self.active_model.startswith(API_PROVIDER_OLLAMA) else None
+            response_cache.store(cache_key, self.active_model, self.model_name_identifier, response_text, provider_state)
+
+    def dispatch_user_prompt(self, conversation_context, user_prompt):
+        """Sends the prompt to the active model provider, racing the configured contenders if there are any"""
+        if self.race_contenders:
+            return self.send_prompt_as_race(conversation_context, user_prompt)
+        return self.send_prompt_to_active_provider(conversation_context, user_prompt)
+
+    def configure_race(self, contender_clients, hedge_delay_seconds=RACE_HEDGE_DELAY_MS / 1000):
+        """Sets the (model id, client) pairs that race the active model, started one hedging delay apart"""
+        self.race_contenders = contender_clients
+        self.race_hedge_delay_seconds = hedge_delay_seconds
+
+    def send_prompt_as_race(self, conversation_context, user_prompt):
+        """Streams from whichever provider produces a first token first, and cancels the others"""
+        contenders = [(self.active_model, self)] + self.race_contenders
+        race_events = queue.Queue()
+        cancel_events = [threading.Event() for _ in contenders]
+        race_start_time = perf_counter_ns()
+        first_token_times = {}
+        # HTTP responses of the contenders, closed on cancel to unblock their reads and stop generation
+        contender_responses = {}
+
+        def run_contender(contender_index, contender_client):
+            response_stream = None
+            try:
+                if contender_client is not self:
+                    # Contenders keep their own provider settings and only follow the shared sampling settings
+                    contender_client.model_parameters = dict(contender_client.model_parameters or {}, **{
+                        parameter_name: self.model_parameters[parameter_name]
+                        for parameter_name in RACE_SHARED_MODEL_PARAMETERS
+                        if parameter_name in (self.model_parameters or {})
+                    })
+                contender_client.streaming_response = None
+                response_stream, response_parser = contender_client.send_prompt_to_active_provider(
+                    conversation_context, user_prompt)
+                contender_responses[contender_index] = contender_client.streaming_response
+                if cancel_events[contender_index].is_set():
+                    return
+                for response_chunk in response_stream or []:
+                    if cancel_events[contender_index].is_set():
+                        break
+                    text_fragment = response_parser(response_chunk)
+                    if text_fragment:
+                        race_events.put((contender_index, text_fragment))
+            except Exception as error:
+                # A read interrupted by closing the response of a cancelled contender is expected
+                if not cancel_events[contender_index].is_set():
+                    print(f"Race contender {contenders[contender_index][0]} failed: {error}")
+            finally:
+                if hasattr(response_stream, "close"):
+                    response_stream.close()
+                if contender_responses.get(contender_index) is not None:
+                    contender_responses[contender_index].close()
+                race_events.put((contender_index, None))
+
+        def cancel_contender(contender_index):
+            cancel_events[contender_index].set()
+            streaming_response = contender_responses.get(contender_index)
+            if streaming_response is not None:
+                streaming_response.close()
+
+        def start_contender(contender_index):
+            threading.Thread(target=run_contender, args=(contender_index, contenders[contender_index][1]),
+                             name=f"uml-race-{contender_index}", daemon=True).start()
+
+        def race_response_stream():
+            started_count = 1
+            finished_indexes = set()
+            winner_index = None
+            start_contender(0)
+            next_hedge_time = time.monotonic() + self.race_hedge_delay_seconds
+            try:
+                while True:
+                    waiting_for_hedge = winner_index is None and started_count < len(contenders)
+                    try:
+                        contender_index, text_fragment = race_events.get(
+                            timeout=max(0.0, next_hedge_time - time.monotonic()) if waiting_for_hedge else None)
+                    except queue.Empty:
+                        # No first token within the hedging delay: start the next provider
+                        start_contender(started_count)
+                        started_count += 1
+                        next_hedge_time = time.monotonic() + self.race_hedge_delay_seconds
+                        continue
+
+                    if text_fragment is None:
+                        finished_indexes.add(contender_index)
+                        if contender_index == winner_index:
+                            return
+                        if winner_index is None and len(finished_indexes) == started_count:
+                            if started_count == len(contenders):
+                                return
+                            # Every started provider failed, so hedge right away
+                            next_hedge_time = time.monotonic()
+                        continue
+
+                    if contender_index not in first_token_times:
+                        first_token_times[contender_index] = (perf_counter_ns() - race_start_time) / 1e+9
+                    if winner_index is None:
+                        winner_index = contender_index
+                        for cancel_index in range(len(contenders)):
+                            if cancel_index != winner_index:
+                                cancel_contender(cancel_index)
+                    if contender_index == winner_index:
+                        yield text_fragment
+            finally:
+                for cancel_index in range(len(contenders)):
+                    cancel_contender(cancel_index)
+                self.record_race_result(contenders, winner_index, first_token_times, started_count)
+
+        return race_response_stream(), lambda text_fragment: text_fragment
+
+    def record_race_result(self, contenders, winner_index, first_token_times, started_count):
+        """Records the winning provider and the time to first token of every started provider"""
+        race_result = {
+            "winner": contenders[winner_index][0] if winner_index is not None else None,
+            "ttft_s": {
+                contenders[contender_index][0]: first_token_times.get(contender_index)
+                for contender_index in range(started_count)
+            }
+        }
+        self.race_statistics["races"] += 1
+        self.race_statistics["last_race"] = race_result
+        if race_result["winner"]:
+            self.race_statistics["wins"][race_result["winner"]] = self.race_statistics["wins"].get(race_result["winner"], 0) + 1
+        for model_id, first_token_time in race_result["ttft_s"].items():
+            if first_token_time is not None:
+                ttft_history = self.race_statistics["ttft_history"].setdefault(model_id, [])
+                ttft_history.append(first_token_time)
+                del ttft_history[:-RACE_TTFT_HISTORY_SIZE]
+        print(f"Provider race won by {race_result['winner']}: {race_result['ttft_s']}")
+
+    def send_prompt_to_active_provider(self, conversation_context, user_prompt):
+        """Sends the prompt to the API of the active model provider"""
+        if self.use_async_client:
+            prompt_request = self.build_async_prompt_request(conversation_context, user_prompt)
+            if prompt_request:
+                return self.send_prompt_through_async_client(prompt_request)
         if self.active_model.startswith(API_PROVIDER_REPLICATE):
             return self.send_prompt_to_replicate_model(conversation_context)
         elif self.active_model.startswith(API_PROVIDER_OPENAI):
             return self.send_prompt_to_openai_model(conversation_context)
         elif self.active_model.startswith(API_PROVIDER_OLLAMA):
-            return self.send_prompt_to_ollama_model(user_prompt)
+            return self.send_prompt_to_ollama_model(conversation_context, user_prompt)
         elif self.active_model.startswith(API_PROVIDER_BIGMODEL):
             return self.send_prompt_to_bigmodel(conversation_context)
+        elif self.active_model.startswith(API_PROVIDER_LLAMA_CPP):
+            return self.send_prompt_to_llama_cpp_model(conversation_context)
         return None, None
 
+    def build_async_prompt_request(self, conversation_context, user_prompt):
+        """Builds the async client request for the active model, or None if the provider has no async path"""
+        if not HTTPX_AVAILABLE:
+            return None
+        if self.active_model.startswith(API_PROVIDER_BIGMODEL):
+            return {"provider": API_PROVIDER_BIGMODEL, "model_name": self.model_name_identifier,
+                    "formatted_messages": list(self.message_list_builder.update(conversation_context)),
+                    "model_parameters": self.model_parameters,
+                    "base_url": self.api_base_url, "api_key": self.api_authentication_key}
+        elif self.active_model.startswith(API_PROVIDER_OPENAI):
+            return {"provider": API_PROVIDER_OPENAI, "model_name": self.active_model_api_identifier,
+                    "formatted_messages": list(self.message_list_builder.update(conversation_context)),
+                    "model_parameters": self.model_parameters,
+                    "base_url": OPENAI_COMPATIBLE_BASE_URL, "api_key": os.environ.get("OPENAI_API_KEY")}
+        elif self.active_model.startswith(API_PROVIDER_OLLAMA):
+            return {"provider": API_PROVIDER_OLLAMA, "model_name": self.active_model_api_identifier,
+                    "user_prompt": user_prompt, "model_parameters": self.model_parameters,
+                    "base_url": self.api_endpoint, "ollama_context": self.get_ollama_turn_context(conversation_context),
+                    "context_callback": self.update_ollama_context, "keep_alive": self.ollama_settings["keep_alive"],
+                    "metrics_callback": self.ollama_session.record_generation_metrics if self.ollama_session else None}
+        return None
+
+    def send_prompt_through_async_client(self, prompt_request):
+        """Streams the prompt through the shared async client, consumed here as a plain generator"""
+        async_client = get_async_language_model_client()
+        # Fragments arrive already parsed, so the parser passes them through
+        return async_client.stream_prompt_sync(**prompt_request), lambda text_fragment: text_fragment
+
+    def update_ollama_context(self, ollama_context):
+        """Keeps the Ollama context returned at the end of a streamed generation"""
+        self.conversation_context = ollama_context
+
     def send_prompt_to_openai_model(self, conversation_context):
         """Sends prompt to OpenAI API with streaming response"""
-        formatted_conversation = []
-        for message in conversation_context:
-            if "format" in message and "role" in message:
-                if message["role"] == MESSAGE_ROLE_USER:
-                    formatted_conversation.append({"role": "user", "content": message["message"]})
-                elif message["role"] == MESSAGE_ROLE_ASSISTANT:
-                    formatted_conversation.append({"role": "assistant", "content": message["message"]})
+        formatted_conversation = list(self.message_list_builder.update(conversation_context))
 
         if not openai:
             return [], lambda response: "OpenAI library not available"
@@ -936,18 +4443,40 @@ class LanguageModelApiClient:
             print(f"OpenAI API error: {error}")
             return [], lambda response: f"Error: {str(error)}"
 
+    def load_llama_cpp_worker(self):
+        """Gets the shared llama.cpp worker for the configured model, loading the model on first use"""
+        try:
+            self.llama_cpp_worker = get_llama_cpp_worker(**self.llama_cpp_settings)
+        except Exception as error:
+            print(f"llama.cpp model load error: {error}")
+            self.llama_cpp_worker = None
+        return self.llama_cpp_worker
+
+    def send_prompt_to_llama_cpp_model(self, conversation_context):
+        """Sends prompt to the in-process llama.cpp model with streaming response"""
+        if not LLAMA_CPP_MODEL_AVAILABLE:
+            return [], lambda response: "llama-cpp-python library not available"
+
+        generation_worker = self.llama_cpp_worker or self.load_llama_cpp_worker()
+        if not generation_worker:
+            return [], lambda response: f"Error: could not load {self.llama_cpp_settings['model_path']}"
+
+        generation_parameters = {"max_tokens": LLAMA_CPP_MAX_TOKENS}
+        generation_parameters.update({
+            parameter_name: parameter_value for parameter_name, parameter_value in self.model_parameters.items()
+            if parameter_name in LLAMA_CPP_GENERATION_PARAMETERS
+        })
+        response_stream = generation_worker.stream_chat_completion(
+            list(self.message_list_builder.update(conversation_context)), generation_parameters)
+        response_parser = lambda item: item["choices"][0]["delta"].get("content", "")
+        return response_stream, response_parser
+
     def send_prompt_to_replicate_model(self, conversation_context):
         """Sends prompt to Replicate API with streaming response"""
         if not REPLICATE_LIBRARY_AVAILABLE:
             return [], lambda response: "Replicate library not available"
 
-        formatted_conversation = "You are a helpful assistant. You do not respond as 'user' or pretend to be 'user'. You only respond once as 'assistant'.\n\n"
-        for message in conversation_context:
-            if "format" in message and "role" in message:
-                if message["role"] == MESSAGE_ROLE_USER:
-                    formatted_conversation += f"user: {message['message']}\n"
-                elif message["role"] == MESSAGE_ROLE_ASSISTANT:
-                    formatted_conversation += f"assistant: {message['message']}\n"
+        formatted_conversation = self.message_list_builder.get_replicate_prompt(conversation_context)
 
         try:
             api_parameters = {
@@ -961,23 +4490,37 @@ class LanguageModelApiClient:
             print(f"Replicate API error: {error}")
             return [], lambda response: f"Error: {str(error)}"
 
-    def send_prompt_to_ollama_model(self, user_prompt):
+    def get_ollama_turn_context(self, conversation_context):
+        """Returns the context tokens of this session, starting new conversations from the cached system prompt"""
+        if self.conversation_context or not self.ollama_session:
+            return self.conversation_context
+        system_prompt = next((message[MSG] for message in conversation_context
+                              if message.get(MSG_FORMAT) == MSG_FORMAT_INIT), None)
+        if not system_prompt:
+            return self.conversation_context
+        return self.ollama_session.get_prefix_context(system_prompt, self.model_parameters) or []
+
+    def send_prompt_to_ollama_model(self, conversation_context, user_prompt):
         """Sends prompt to local Ollama API with streaming response"""
         api_parameters = {
             'model': self.active_model_api_identifier,
             'prompt': user_prompt,
             'stream': True,
+            'keep_alive': self.ollama_settings["keep_alive"],
             'options': self.model_parameters.copy()
         }
 
-        if self.conversation_context:
-            api_parameters['context'] = self.conversation_context
+        ollama_context = self.get_ollama_turn_context(conversation_context)
+        if ollama_context:
+            api_parameters['context'] = ollama_context
 
         try:
-            response = requests.post(self.api_endpoint, json=api_parameters, stream=True)
+            response = self.http_session.post(self.api_endpoint, json=api_parameters, stream=True)
+            self.streaming_response = response
             response.raise_for_status()
             response_parser = lambda item: self.parse_ollama_api_response(item)
-            return response, response_parser
+            # One JSON object per line; the final one carries the context and can exceed any fixed chunk size
+            return response.iter_lines(chunk_size=8192), response_parser
         except Exception as error:
             print(f"Ollama API error: {error}")
             return [], lambda response: f"Error: {str(error)}"
@@ -989,20 +4532,14 @@ class LanguageModelApiClient:
             response_data = json.loads(response_text)
             if 'context' in response_data:
                 self.conversation_context = response_data['context']
+            if response_data.get('done') and self.ollama_session:
+                self.ollama_session.record_generation_metrics(response_data)
             return response_data.get('response', '')
         except Exception:
             return ''
 
     def send_prompt_to_bigmodel(self, conversation_context):
         """Sends prompt to BigModel API (GLM-4) with streaming response"""
-        formatted_conversation = []
-        for message in conversation_context:
-            if "format" in message and "role" in message:
-                if message["role"] == MESSAGE_ROLE_USER:
-                    formatted_conversation.append({"role": "user", "content": message["message"]})
-                elif message["role"] == MESSAGE_ROLE_ASSISTANT:
-                    formatted_conversation.append({"role": "assistant", "content": message["message"]})
-
         request_headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_authentication_key}"
@@ -1010,18 +4547,21 @@ class LanguageModelApiClient:
 
         request_data = {
             "model": self.model_name_identifier,
-            "messages": formatted_conversation,
             "stream": True,
             **self.model_parameters
         }
+        # Splice in the messages array, which is serialized incrementally across turns
+        request_body = (json.dumps(request_data)[:-1] + ', "messages": '
+                        + self.message_list_builder.get_messages_json(conversation_context) + "}")
 
         try:
-            response = requests.post(
+            response = self.http_session.post(
                 f"{self.api_base_url}chat/completions",
                 headers=request_headers,
-                json=request_data,
+                data=request_body.encode("utf-8"),
                 stream=True
             )
+            self.streaming_response = response
             response.raise_for_status()
 
             def parse_bigmodel_response(chunk):
@@ -1057,19 +4597,24 @@ class DiagramInterpreter:
         self.active_interpreter = None
         self.interpreter_parameters = None
         self.service_endpoint = None
+        self.diagram_model_cache = None
+        self.render_cache = None
+        self.syntax_corrector = None
+        self.worker_pool = None
 
 
-    def execute_diagram_generation(self, diagram_code, projection_name=None):
-        """Processes diagram code through the appropriate interpreter with optional projection."""
+    def execute_diagram_generation(self, diagram_code, projection_name=None, projection_options=None, raise_errors=False):
+        """Processes diagram code through the appropriate interpreter with optional projection.
+        With raise_errors the render failure is raised instead of being reported as a None result."""
         result = None
 
         # Apply projection if specified
         if projection_name and projection_name != "Full Diagram":
-            projection_manager = ProjectionManager()
-            diagram_code = projection_manager.apply_projection(diagram_code, projection_name)
+            projection_manager = ProjectionManager(self.diagram_model_cache)
+            diagram_code = projection_manager.apply_projection(diagram_code, projection_name, projection_options)
 
         # Process using the existing method
-        processed_code, rendering_result = self.process_diagram_code(diagram_code)
+        processed_code, rendering_result = self.process_diagram_code(diagram_code, raise_errors)
 
         return processed_code, rendering_result
 
@@ -1079,22 +4624,52 @@ class DiagramInterpreter:
         print(f"Initializing {selected_interpreter} Interpreter...")
         self.active_interpreter = selected_interpreter
         self.interpreter_parameters = interpreter_parameters
+        self.resolve_render_resources()
 
         if api_endpoint:
             self.service_endpoint = api_endpoint
 
-    def process_diagram_code(self, diagram_code):
+    def resolve_render_resources(self):
+        """Resolves the shared caches and worker pool on the script thread so background renders never call cached factories"""
+        self.diagram_model_cache = get_shared_diagram_model_cache()
+        self.render_cache = get_shared_render_cache()
+        self.syntax_corrector = get_shared_plantuml_syntax_corrector()
+        self.worker_pool = None
+        self.acquire_worker_pool()
+
+    def acquire_worker_pool(self):
+        """Returns the local PlantUML worker pool, trying again to start it if an earlier attempt failed"""
+        if self.worker_pool is None and self.active_interpreter == INTERPRETER_LOCAL_PLANTUML:
+            try:
+                self.worker_pool = get_local_plantuml_worker_pool(
+                    LOCAL_PLANTUML_JAVA_EXECUTABLE,
+                    self.interpreter_parameters.get('PlantUML jar', LOCAL_PLANTUML_JAR_PATH),
+                    self.interpreter_parameters.get('Output format', 'SVG').lower(),
+                    self.interpreter_parameters.get('Pool size', LOCAL_PLANTUML_POOL_SIZE),
+                    self.interpreter_parameters.get('Request timeout (s)', LOCAL_PLANTUML_REQUEST_TIMEOUT_S),
+                    self.interpreter_parameters.get('Recycle after renders', LOCAL_PLANTUML_RECYCLE_AFTER_RENDERS)
+                )
+            except Exception as error:
+                print(f"Error starting local PlantUML workers: {error}")
+        return self.worker_pool
+
+    def process_diagram_code(self, diagram_code, raise_errors=False):
         """Processes diagram code through the appropriate interpreter"""
         result = None
 
         if self.active_interpreter == INTERPRETER_PLANTWEB_PLANTUML and PLANTWEB_AVAILABLE:
             processed_diagram_code = self.format_plantuml_code(diagram_code)
-            result = self.execute_plantweb_renderer(processed_diagram_code, "plantuml")
+            result = self.execute_plantweb_renderer(processed_diagram_code, "plantuml", raise_errors)
         elif self.active_interpreter == INTERPRETER_PLANTWEB_GRAPHVIZ and PLANTWEB_AVAILABLE:
             processed_diagram_code = self.format_graphviz_code(diagram_code)
-            result = self.execute_plantweb_renderer(processed_diagram_code, "graphviz")
+            result = self.execute_plantweb_renderer(processed_diagram_code, "graphviz", raise_errors)
+        elif self.active_interpreter == INTERPRETER_LOCAL_PLANTUML:
+            processed_diagram_code = self.format_plantuml_code(diagram_code)
+            result = self.execute_local_plantuml_renderer(processed_diagram_code, raise_errors)
         else:
             print(f"Interpreter {self.active_interpreter} not available")
+            if raise_errors:
+                raise RuntimeError(f"Interpreter {self.active_interpreter} not available")
 
         if result and len(result) > 1:
             if result[1].lower() == "svg" and isinstance(result[0], bytes):
@@ -1103,7 +4678,7 @@ class DiagramInterpreter:
 
         return (diagram_code, result[0] if result else None)
 
-    def execute_plantweb_renderer(self, diagram_code, engine_type):
+    def execute_plantweb_renderer(self, diagram_code, engine_type, raise_errors=False):
         """Executes PlantWeb renderer with the specified engine"""
         print(f"Running {engine_type} on input: {diagram_code[:20]}...")
         if not PLANTWEB_AVAILABLE:
@@ -1111,127 +4686,66 @@ class DiagramInterpreter:
 
         try:
             output_format = self.interpreter_parameters.get('Output format', 'SVG').lower()
-            use_cache = self.interpreter_parameters.get('Use cache', False)
-
-            result = render(
-                diagram_code,
-                engine=engine_type,
-                format=output_format,
-                cacheopts={'use_cache': use_cache}
-            )
-            return result
-        except Exception as error:
-            print(f"Error executing Plantweb: {error}")
-            return None
-
-    def format_plantuml_code(self, diagram_code):
-        """Formats PlantUML code with error correction and syntax improvements"""
-        original_code = diagram_code
-        error_corrections = []
-
-        # Remove syntax formatting instruction added by LLM
-        if diagram_code.startswith("plantuml"):
-            diagram_code = diagram_code[8:]
-        while diagram_code.startswith("\n"):
-            diagram_code = diagram_code[1:]
-
-        # Fix common syntax errors
-
-        # 1. Fix incorrect inheritance syntax with label: class Child <-(Parent) : "label" {
-        inheritance_with_label_pattern = r'class\s+(\w+)\s+<-\((\w+)\)\s*:\s*"([^"]+)"\s*{'
-        if re.search(inheritance_with_label_pattern, diagram_code):
-            matches = re.findall(inheritance_with_label_pattern, diagram_code)
-            for child_class, parent_class, relationship_label in matches:
-                diagram_code = re.sub(
-                    r'class\s+' + child_class + r'\s+<-\(' + parent_class + r'\)\s*:\s*"' + relationship_label + r'"\s*{',
-                    f'class {child_class} {{',
-                    diagram_code
-                )
-                # Add proper inheritance relationship with label at the end
-                if '@enduml' in diagram_code:
-                    diagram_code = diagram_code.replace('@enduml', f'\n{child_class} --|> {parent_class} : "{relationship_label}"\n@enduml')
-                else:
-                    diagram_code += f'\n{child_class} --|> {parent_class} : "{relationship_label}"\n'
-                error_corrections.append(f'Fixed labeled inheritance: \'class {child_class} <-({parent_class}) : "{relationship_label}"\' → \'class {child_class}\' with \'{child_class} --|> {parent_class} : "{relationship_label}"\'')
-
-        # 2. Fix standard incorrect inheritance syntax
-        inheritance_pattern = r'class\s+(\w+)\s+<-\((\w+)\)\s*{'
-        if re.search(inheritance_pattern, diagram_code):
-            matches = re.findall(inheritance_pattern, diagram_code)
-            for child_class, parent_class in matches:
-                diagram_code = re.sub(
-                    r'class\s+' + child_class + r'\s+<-\(' + parent_class + r'\)\s*{',
-                    f'class {child_class} {{',
-                    diagram_code
-                )
-                # Add proper inheritance relationship at the end of the diagram
-                if '@enduml' in diagram_code:
-                    diagram_code = diagram_code.replace('@enduml', f'\n{child_class} --|> {parent_class}\n@enduml')
-                else:
-                    diagram_code += f'\n{child_class} --|> {parent_class}\n'
-                error_corrections.append(f"Fixed inheritance syntax: 'class {child_class} <-({parent_class})' → 'class {child_class}' with '{child_class} --|> {parent_class}'")
-
-        # 3. Fix object/instance declarations with :upright: syntax
-        upright_instance_pattern = r'(\w+)\s+(\w+)\s+:upright:\s+\"([^\"]+)\"\s+as\s+(\w+)'
-        if re.search(upright_instance_pattern, diagram_code):
-            matches = re.findall(upright_instance_pattern, diagram_code)
-            for class_name, object_name, label_text, alias_name in matches:
-                diagram_code = re.sub(
-                    r'' + class_name + r'\s+' + object_name + r'\s+:upright:\s+\"' + label_text + r'\"\s+as\s+' + alias_name,
-                    f'{class_name} "{label_text}" as {alias_name}',
-                    diagram_code
-                )
-                error_corrections.append(f"Fixed instance declaration: '{class_name} {object_name} :upright: \"{label_text}\" as {alias_name}' → '{class_name} \"{label_text}\" as {alias_name}'")
+            use_cache = self.interpreter_parameters.get('Use cache', False)
 
-        # 4. Fix relationship syntax errors (like :upright ->)
-        upright_arrow_pattern = r'(\w+)\s+o\d+\s+:upright\s+->\s+(\w+)\s+:is'
-        if re.search(upright_arrow_pattern, diagram_code):
-            matches = re.findall(upright_arrow_pattern, diagram_code)
-            for source_entity, target_entity in matches:
-                diagram_code = re.sub(
-                    r'' + source_entity + r'\s+o\d+\s+:upright\s+->\s+' + target_entity + r'\s+:is',
-                    f'{source_entity} --> {target_entity}',
-                    diagram_code
-                )
-                error_corrections.append(f"Fixed relationship arrow: '{source_entity} oN :upright -> {target_entity} :is' → '{source_entity} --> {target_entity}'")
+            # Serve byte-identical renders from the shared render cache
+            if use_cache:
+                render_cache = self.render_cache
+                cache_key = render_cache.build_cache_key(diagram_code, engine_type, output_format)
+                cached_output = render_cache.lookup(cache_key, output_format)
+                if cached_output is not None:
+                    return (cached_output, output_format, engine_type, cache_key)
 
-        # 5. Fix other :upright relationships
-        other_upright_pattern = r'(\w+)\s+-upright:\s+(\w+)'
-        if re.search(other_upright_pattern, diagram_code):
-            matches = re.findall(other_upright_pattern, diagram_code)
-            for source_entity, target_entity in matches:
-                diagram_code = re.sub(
-                    r'' + source_entity + r'\s+-upright:\s+' + target_entity,
-                    f'{source_entity} --> {target_entity}',
-                    diagram_code
-                )
-                error_corrections.append(f"Fixed upright relationship: '{source_entity} -upright: {target_entity}' → '{source_entity} --> {target_entity}'")
+            result = render(
+                diagram_code,
+                engine=engine_type,
+                format=output_format,
+                cacheopts={'use_cache': False}
+            )
 
-        # 6. Check and fix unbalanced braces
-        open_braces = diagram_code.count('{')
-        close_braces = diagram_code.count('}')
-        if open_braces > close_braces:
-            missing_braces = open_braces - close_braces
-            if '@enduml' in diagram_code:
-                diagram_code = diagram_code.replace('@enduml', '}\n' * missing_braces + '@enduml')
-            else:
-                diagram_code += '}\n' * missing_braces
-            error_corrections.append(f"Added {missing_braces} missing closing braces '}}'")
+            if use_cache and result:
+                render_cache.store(cache_key, output_format, result[0])
+            return result
+        except Exception as error:
+            print(f"Error executing Plantweb: {error}")
+            if raise_errors:
+                raise
+            return None
 
-        # Add start and end directives if not present
-        if not '@startuml' in diagram_code:
-            diagram_code = '@startuml\n' + diagram_code
-            error_corrections.append("Added missing @startuml directive")
-        if not '@enduml' in diagram_code:
-            diagram_code = diagram_code + '\n@enduml'
-            error_corrections.append("Added missing @enduml directive")
+    def execute_local_plantuml_renderer(self, diagram_code, raise_errors=False):
+        """Executes the local PlantUML worker pool on the diagram code"""
+        print(f"Running local plantuml on input: {diagram_code[:20]}...")
 
-        # If errors were fixed, add a comment at the top of the diagram
-        if error_corrections and '@startuml' in diagram_code:
-            correction_comments = '\n'.join([f"' {correction}" for correction in error_corrections])
-            diagram_code = diagram_code.replace('@startuml', f'@startuml\n\n{correction_comments}\n')
+        try:
+            output_format = self.interpreter_parameters.get('Output format', 'SVG').lower()
+            use_cache = self.interpreter_parameters.get('Use cache', False)
 
-        return diagram_code
+            # Serve byte-identical renders from the shared render cache
+            if use_cache:
+                render_cache = self.render_cache
+                cache_key = render_cache.build_cache_key(diagram_code, "plantuml", output_format)
+                cached_output = render_cache.lookup(cache_key, output_format)
+                if cached_output is not None:
+                    return (cached_output, output_format, "plantuml", cache_key)
+
+            # Java or the jar may have become available since the pool last failed to start
+            worker_pool = self.acquire_worker_pool()
+            if not worker_pool:
+                raise RuntimeError("Local PlantUML workers are not available")
+            result = worker_pool.render(diagram_code)
+
+            if use_cache:
+                render_cache.store(cache_key, output_format, result)
+            return (result, output_format, "plantuml", None)
+        except Exception as error:
+            print(f"Error executing local PlantUML: {error}")
+            if raise_errors:
+                raise
+            return None
+
+    def format_plantuml_code(self, diagram_code):
+        """Formats PlantUML code with error correction and syntax improvements"""
+        return self.syntax_corrector.format_plantuml_code(diagram_code)
 
     def format_graphviz_code(self, diagram_code):
         """Formats Graphviz code for proper interpretation"""
@@ -1250,6 +4764,281 @@ class DiagramInterpreter:
         return diagram_code
 
 
+class SpeculativeProjectionRenderer:
+    """
+    Renders the remaining projections of a diagram in the background.
+
+    Results are keyed by a hash of the diagram code and the render context (the
+    interpreter and its output settings), so switching projections on unchanged
+    code is served instantly, and all pending work is cancelled as soon as the
+    code or the interpreter settings change.
+    """
+
+    def __init__(self):
+        self.render_key = None
+        self.projection_renders = {}
+        self.renderer_lock = threading.Lock()
+
+    @staticmethod
+    def build_render_key(diagram_code, render_context):
+        """Return the key under which renders of this diagram code in this render context are kept."""
+        key_digest = hashlib.sha256(render_context.encode('utf-8'))
+        key_digest.update(b'\0')
+        key_digest.update(diagram_code.encode('utf-8'))
+        return key_digest.hexdigest()
+
+    def discard_stale(self, diagram_code, render_context):
+        """Cancel pending work and drop results when the diagram code or render context has changed."""
+        render_key = self.build_render_key(diagram_code, render_context)
+        with self.renderer_lock:
+            if render_key != self.render_key:
+                self.reset(render_key)
+        return render_key
+
+    def reset(self, render_key=None):
+        """Cancel pending renders and start tracking a new render key; the caller must hold the lock."""
+        for projection_render in self.projection_renders.values():
+            projection_render.cancel()
+        self.projection_renders = {}
+        self.render_key = render_key
+
+    def record_completed_render(self, diagram_code, render_context, projection_name, render_result):
+        """Keep a render that was produced in the foreground."""
+        completed_render = Future()
+        completed_render.set_result(render_result)
+        render_key = self.build_render_key(diagram_code, render_context)
+        with self.renderer_lock:
+            if render_key != self.render_key:
+                self.reset(render_key)
+            self.projection_renders[projection_name] = completed_render
+
+    def schedule(self, diagram_code, render_context, projection_names, render_function):
+        """Queue background renders for every projection not already rendered or pending."""
+        render_executor = get_speculative_render_executor()
+        render_key = self.build_render_key(diagram_code, render_context)
+        with self.renderer_lock:
+            if render_key != self.render_key:
+                self.reset(render_key)
+            for projection_name in projection_names:
+                if projection_name not in self.projection_renders:
+                    self.projection_renders[projection_name] = render_executor.submit(
+                        render_function, diagram_code, projection_name)
+
+    def get_completed_render(self, diagram_code, render_context, projection_name):
+        """Return a finished, successful render for the code, render context and projection, or None."""
+        render_key = self.build_render_key(diagram_code, render_context)
+        with self.renderer_lock:
+            if render_key != self.render_key:
+                return None
+            projection_render = self.projection_renders.get(projection_name)
+
+        if not projection_render or not projection_render.done() or projection_render.cancelled():
+            return None
+        try:
+            render_result = projection_render.result()
+        except Exception as error:
+            print(f"Speculative render of {projection_name} failed: {error}")
+            return None
+        return render_result if render_result[1] else None
+
+
+@st.cache_resource
+def get_speculative_render_executor():
+    """Return the process-wide executor that caps concurrent speculative renders."""
+    return ThreadPoolExecutor(max_workers=SPECULATIVE_RENDER_MAX_WORKERS, thread_name_prefix="uml-speculative")
+
+
+class StreamingDiagramDetector:
+    """
+    Incremental scanner for PlantUML blocks in a streamed language model response.
+
+    Each text fragment is fed as it arrives. A two-state machine looks for
+    @startuml outside a block and @enduml inside one, so markers split across
+    fragments are still found and every character is scanned once. Only the
+    unfinished block is buffered. While a block is still open, a throttled
+    progressive preview auto-closes the complete lines received so far.
+    """
+
+    def __init__(self, preview_interval_seconds=STREAMING_PREVIEW_INTERVAL_S, preview_min_lines=STREAMING_PREVIEW_MIN_LINES):
+        self.preview_interval_seconds = preview_interval_seconds
+        self.preview_min_lines = preview_min_lines
+        self.inside_diagram = False
+        self.pending_text = ""
+        self.search_position = 0
+        self.completed_blocks = []
+        self.last_preview_time = 0.0
+        self.last_preview_code = None
+
+    def feed(self, text_fragment):
+        """Scan a new fragment and return the diagram blocks it completed."""
+        self.pending_text += text_fragment
+        newly_completed_blocks = []
+
+        while True:
+            if not self.inside_diagram:
+                start_index = self.pending_text.find("@startuml", self.search_position)
+                if start_index < 0:
+                    # Keep only a tail long enough to hold a marker split across fragments
+                    self.pending_text = self.pending_text[-(len("@startuml") - 1):]
+                    self.search_position = 0
+                    return newly_completed_blocks
+                self.pending_text = self.pending_text[start_index:]
+                self.search_position = len("@startuml")
+                self.inside_diagram = True
+                self.last_preview_code = None
+            else:
+                end_index = self.pending_text.find("@enduml", self.search_position)
+                if end_index < 0:
+                    self.search_position = max(len("@startuml"), len(self.pending_text) - len("@enduml") + 1)
+                    return newly_completed_blocks
+                end_index += len("@enduml")
+                diagram_code = self.pending_text[:end_index].strip()
+                self.completed_blocks.append(diagram_code)
+                newly_completed_blocks.append(diagram_code)
+                self.pending_text = self.pending_text[end_index:]
+                self.search_position = 0
+                self.inside_diagram = False
+
+    def get_progressive_preview(self):
+        """Return the open block auto-closed with @enduml, at most once per preview interval, or None."""
+        if not self.inside_diagram:
+            return None
+        current_time = time.monotonic()
+        if current_time - self.last_preview_time < self.preview_interval_seconds:
+            return None
+
+        # Only complete lines are previewed; a half-written line rarely parses
+        partial_code = self.pending_text[:self.pending_text.rfind("\n")].rstrip()
+        if partial_code.count("\n") + 1 < self.preview_min_lines or partial_code == self.last_preview_code:
+            return None
+
+        self.last_preview_time = current_time
+        self.last_preview_code = partial_code
+        return partial_code + "\n@enduml"
+
+
+@st.cache_resource
+def get_streaming_render_executor():
+    """Return the process-wide executor for renders started while a response is still streaming."""
+    return ThreadPoolExecutor(max_workers=STREAMING_RENDER_MAX_WORKERS, thread_name_prefix="uml-streaming")
+
+
+class ConversationContextCompactor:
+    """
+    Keeps the conversation sent to the language model within a token budget.
+
+    Only messages the providers receive, user and assistant messages including
+    the system message, are estimated and compacted; interpreter output is left
+    as it is. The system message, the most recent user/assistant turns and the
+    latest message with a PlantUML diagram are always kept verbatim. When the
+    estimated size is over budget, older messages are replaced with short
+    stubs, oldest first, and whole turns are dropped if stubs alone are still
+    too large. The token estimator is pluggable and defaults to four
+    characters per token.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, recent_turns=CONTEXT_RECENT_TURNS, token_estimator=None):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.token_estimator = token_estimator or self.estimate_tokens_by_characters
+        self.statistics = {"requests": 0, "compacted_requests": 0, "tokens_saved": 0}
+
+    @staticmethod
+    def estimate_tokens_by_characters(text):
+        """Estimate tokens as one per four characters."""
+        return (len(text) + 3) // 4
+
+    def estimate_message_tokens(self, message):
+        """Estimate the tokens of one message, counting a small overhead for its role."""
+        return self.token_estimator(message.get(MSG, "")) + 4
+
+    def create_message_stub(self, message):
+        """Return a copy of the message with its content reduced to a short summary."""
+        message_content = message.get(MSG, "")
+        diagram_count = len(re.findall(r'@startuml[\s\S]*?@enduml', message_content))
+        summary_text = re.sub(r'```(?:plantuml|uml)?[\s\S]*?```|@startuml[\s\S]*?@enduml', ' ', message_content)
+        summary_text = " ".join(summary_text.split())
+        if len(summary_text) > CONTEXT_STUB_PREVIEW_CHARS:
+            summary_text = summary_text[:CONTEXT_STUB_PREVIEW_CHARS].rstrip() + "..."
+
+        stub_content = f"[Earlier message, shortened] {summary_text}"
+        if diagram_count:
+            stub_content += f" [{diagram_count} earlier PlantUML diagram(s) omitted]"
+        message_stub = dict(message)
+        message_stub[MSG] = stub_content
+        return message_stub
+
+    @staticmethod
+    def is_provider_visible(message):
+        """Return whether the message is sent to the language model providers."""
+        return MSG_FORMAT in message and message.get(ROLE) in (ROLE_US, ROLE_AS)
+
+    def compact(self, conversation_context):
+        """Return the conversation fitted to the token budget, and the estimated tokens before and after."""
+        visible_indexes = [message_index for message_index, message in enumerate(conversation_context)
+                           if self.is_provider_visible(message)]
+        message_tokens = {message_index: self.estimate_message_tokens(conversation_context[message_index])
+                          for message_index in visible_indexes}
+        original_tokens = sum(message_tokens.values())
+        self.statistics["requests"] += 1
+        if original_tokens <= self.token_budget:
+            return conversation_context, original_tokens, original_tokens
+
+        # Messages that are always sent verbatim
+        protected_indexes = {
+            message_index for message_index in visible_indexes
+            if conversation_context[message_index].get(MSG_FORMAT) == MSG_FORMAT_INIT
+        }
+        # A turn is a user message and the assistant replies that follow it
+        turn_count = 0
+        for message_index in reversed(visible_indexes):
+            if turn_count >= self.recent_turns:
+                break
+            if message_index in protected_indexes:
+                continue
+            protected_indexes.add(message_index)
+            if conversation_context[message_index].get(ROLE) == ROLE_US:
+                turn_count += 1
+        for message_index in reversed(visible_indexes):
+            if '@startuml' in conversation_context[message_index].get(MSG, ""):
+                protected_indexes.add(message_index)
+                break
+
+        compacted_context = list(conversation_context)
+        compacted_tokens = original_tokens
+        candidate_indexes = [index for index in visible_indexes if index not in protected_indexes]
+        for message_index in candidate_indexes:
+            if compacted_tokens <= self.token_budget:
+                break
+            message_stub = self.create_message_stub(conversation_context[message_index])
+            stub_tokens = self.estimate_message_tokens(message_stub)
+            if stub_tokens < message_tokens[message_index]:
+                compacted_context[message_index] = message_stub
+                compacted_tokens += stub_tokens - message_tokens[message_index]
+                message_tokens[message_index] = stub_tokens
+
+        # Drop the oldest turns if shortening alone was not enough; whole turns keep the roles alternating
+        conversation_turns = []
+        for message_index in visible_indexes:
+            if conversation_context[message_index].get(ROLE) == ROLE_US or not conversation_turns:
+                conversation_turns.append([])
+            conversation_turns[-1].append(message_index)
+        dropped_indexes = set()
+        for turn_indexes in conversation_turns:
+            if compacted_tokens <= self.token_budget:
+                break
+            if protected_indexes.intersection(turn_indexes):
+                continue
+            dropped_indexes.update(turn_indexes)
+            compacted_tokens -= sum(message_tokens[message_index] for message_index in turn_indexes)
+        compacted_context = [message for message_index, message in enumerate(compacted_context)
+                             if message_index not in dropped_indexes]
+
+        self.statistics["compacted_requests"] += 1
+        self.statistics["tokens_saved"] += original_tokens - compacted_tokens
+        return compacted_context, original_tokens, compacted_tokens
+
+
 class UMLDiagramGenerationApp:
     """Main application class that coordinates language models, interpreters, and user interface"""
 
@@ -1258,6 +5047,9 @@ class UMLDiagramGenerationApp:
         self.conversation_store = ConversationDataStorage()
         self.language_model_client = LanguageModelApiClient()
         self.diagram_interpreter = DiagramInterpreter()
+        self.speculative_renderer = SpeculativeProjectionRenderer()
+        self.diagram_model_parser = IncrementalPlantUMLParser()
+        self.context_compactor = ConversationContextCompactor()
         self.active_language_model = MODEL_SELECTION_PLACEHOLDER
         self.active_interpreter = INTERPRETER_SELECTION_PLACEHOLDER
         self.model_parameters = {}
@@ -1270,6 +5062,36 @@ class UMLDiagramGenerationApp:
             self.application_configuration = st.session_state[SESSION_KEY_APPLICATION_CONFIG]
         else:
             st.session_state[SESSION_KEY_APPLICATION_CONFIG] = self.application_configuration
+        self.apply_storage_configuration()
+
+    def apply_storage_configuration(self):
+        """Applies the configured storage backend, fsync policy and background writes to the conversation store"""
+        storage_backend = self.application_configuration.get(
+            "conversation_storage_backend", DEFAULT_API_CONFIGURATION["conversation_storage_backend"])["value"]
+        if isinstance(self.conversation_store, SQLiteConversationDataStorage) != (storage_backend == "sqlite"):
+            # A new backend starts a new conversation; queued writes finish in the previous store first
+            previous_store = self.conversation_store
+            previous_store.set_background_writes(False)
+            previous_store.close_log_file()
+            self.conversation_store = create_conversation_storage(storage_backend)
+            if previous_store.conversation_identifier:
+                self.conversation_store.create_new_conversation(previous_store.initial_welcome_message)
+
+        get_retention_manager().update_limits(
+            self.application_configuration.get(
+                "retention_max_total_mb", DEFAULT_API_CONFIGURATION["retention_max_total_mb"])["value"] * 1024 * 1024,
+            self.application_configuration.get(
+                "retention_max_conversation_mb", DEFAULT_API_CONFIGURATION["retention_max_conversation_mb"])["value"] * 1024 * 1024,
+            self.application_configuration.get(
+                "retention_max_age_days", DEFAULT_API_CONFIGURATION["retention_max_age_days"])["value"] * 86400
+        )
+
+        self.conversation_store.fsync_policy = self.application_configuration.get(
+            "log_fsync_policy", DEFAULT_API_CONFIGURATION["log_fsync_policy"])["value"]
+        self.conversation_store.deduplicate_artifacts = self.application_configuration.get(
+            "deduplicate_artifacts", DEFAULT_API_CONFIGURATION["deduplicate_artifacts"])["value"]
+        self.conversation_store.set_background_writes(self.application_configuration.get(
+            "background_log_writes", DEFAULT_API_CONFIGURATION["background_log_writes"])["value"])
 
     def save_user_configuration(self):
         """Saves configuration to session state for persistence"""
@@ -1279,21 +5101,35 @@ class UMLDiagramGenerationApp:
         """Selects a language model and initializes appropriate parameters"""
         if self.active_language_model != model_id:
             self.active_language_model = model_id
-            if model_id.startswith(API_PROVIDER_OPENAI):
-                self.model_parameters = INTERPRETER_DEFAULT_PARAMETERS[API_PROVIDER_OPENAI].copy()
-            elif model_id.startswith(API_PROVIDER_REPLICATE):
-                self.model_parameters = INTERPRETER_DEFAULT_PARAMETERS[API_PROVIDER_REPLICATE].copy()
-            elif model_id.startswith(API_PROVIDER_OLLAMA):
-                self.model_parameters = INTERPRETER_DEFAULT_PARAMETERS[API_PROVIDER_OLLAMA].copy()
-            elif model_id.startswith(API_PROVIDER_BIGMODEL):
-                self.model_parameters = {
-                    "temperature": 0.2,
-                    "top_p": 0.9
-                }
+            model_parameters = self.get_default_model_parameters(model_id)
+            if model_parameters is not None:
+                self.model_parameters = model_parameters
             self.initialize_language_model()
             return True
         return False
 
+    @staticmethod
+    def get_default_model_parameters(model_id):
+        """Returns a fresh copy of the default generation parameters of the model's provider"""
+        if model_id.startswith(API_PROVIDER_OPENAI):
+            return INTERPRETER_DEFAULT_PARAMETERS.get(API_PROVIDER_OPENAI, {}).copy()
+        elif model_id.startswith(API_PROVIDER_REPLICATE):
+            return INTERPRETER_DEFAULT_PARAMETERS.get(API_PROVIDER_REPLICATE, {}).copy()
+        elif model_id.startswith(API_PROVIDER_OLLAMA):
+            return INTERPRETER_DEFAULT_PARAMETERS.get(API_PROVIDER_OLLAMA, {}).copy()
+        elif model_id.startswith(API_PROVIDER_BIGMODEL):
+            return {
+                "temperature": 0.2,
+                "top_p": 0.9
+            }
+        elif model_id.startswith(API_PROVIDER_LLAMA_CPP):
+            return {
+                "temperature": 0.2,
+                "top_p": 0.9,
+                "max_tokens": LLAMA_CPP_MAX_TOKENS
+            }
+        return None
+
     def select_diagram_interpreter(self, interpreter_id):
         """Selects a diagram interpreter and initializes appropriate parameters"""
         if self.active_interpreter != interpreter_id:
@@ -1301,12 +5137,21 @@ class UMLDiagramGenerationApp:
             if interpreter_id == INTERPRETER_PLANTWEB_PLANTUML:
                 self.interpreter_parameters = {
                     "Output format": "SVG",
-                    "Use cache": False
+                    "Use cache": True
                 }
             elif interpreter_id == INTERPRETER_PLANTWEB_GRAPHVIZ:
                 self.interpreter_parameters = {
                     "Output format": "SVG",
-                    "Use cache": False
+                    "Use cache": True
+                }
+            elif interpreter_id == INTERPRETER_LOCAL_PLANTUML:
+                self.interpreter_parameters = {
+                    "Output format": "SVG",
+                    "Use cache": True,
+                    "PlantUML jar": LOCAL_PLANTUML_JAR_PATH,
+                    "Pool size": LOCAL_PLANTUML_POOL_SIZE,
+                    "Request timeout (s)": LOCAL_PLANTUML_REQUEST_TIMEOUT_S,
+                    "Recycle after renders": LOCAL_PLANTUML_RECYCLE_AFTER_RENDERS
                 }
             self.initialize_interpreter()
             return True
@@ -1325,9 +5170,63 @@ class UMLDiagramGenerationApp:
                 self.model_parameters,
                 api_key=api_key,
                 base_url=base_url,
-                model_name=model_name
+                model_name=model_name,
+                use_async_client=self.application_configuration.get(
+                    "use_async_client", DEFAULT_API_CONFIGURATION["use_async_client"])["value"],
+                use_response_cache=self.application_configuration.get(
+                    "use_response_cache", DEFAULT_API_CONFIGURATION["use_response_cache"])["value"],
+                llama_cpp_settings=self.get_llama_cpp_settings(),
+                ollama_settings=self.get_ollama_settings()
             )
 
+    def get_ollama_settings(self):
+        """Collects the Ollama server address and keep-alive period from the configuration"""
+        return {
+            setting_name: self.application_configuration.get(
+                f"ollama_{setting_name}", DEFAULT_API_CONFIGURATION[f"ollama_{setting_name}"])["value"]
+            for setting_name in ("base_url", "keep_alive")
+        }
+
+    def get_llama_cpp_settings(self):
+        """Collects the llama.cpp model file and load settings from the configuration"""
+        return {
+            setting_name: self.application_configuration.get(
+                f"llama_cpp_{setting_name}", DEFAULT_API_CONFIGURATION[f"llama_cpp_{setting_name}"])["value"]
+            for setting_name in ("model_path", "n_threads", "n_ctx", "use_mmap", "use_mlock")
+        }
+
+    def configure_race_mode(self, race_models, hedge_delay_ms):
+        """Creates a client for every racing model and hands them to the active language model client"""
+        race_models = [model_id for model_id in race_models
+                       if model_id not in (self.active_language_model, MODEL_SELECTION_PLACEHOLDER)]
+        self.application_configuration["race_models"] = {
+            "value": list(race_models),
+            "description": DEFAULT_API_CONFIGURATION["race_models"]["description"]
+        }
+        self.application_configuration["race_hedge_delay_ms"] = {
+            "value": hedge_delay_ms,
+            "description": DEFAULT_API_CONFIGURATION["race_hedge_delay_ms"]["description"]
+        }
+
+        existing_clients = dict(self.language_model_client.race_contenders)
+        contender_clients = []
+        for model_id in race_models:
+            contender_client = existing_clients.get(model_id)
+            if not contender_client:
+                contender_client = LanguageModelApiClient()
+                contender_client.initialize_language_model(
+                    model_id,
+                    self.application_configuration["model_name"]["value"],
+                    self.get_default_model_parameters(model_id) or {},
+                    api_key=self.application_configuration["api_key"]["value"],
+                    base_url=self.application_configuration["base_url"]["value"],
+                    model_name=self.application_configuration["model_name"]["value"],
+                    llama_cpp_settings=self.get_llama_cpp_settings(),
+                    ollama_settings=self.get_ollama_settings()
+                )
+            contender_clients.append((model_id, contender_client))
+        self.language_model_client.configure_race(contender_clients, hedge_delay_ms / 1000)
+
     def initialize_interpreter(self):
         """Initializes the selected diagram interpreter with current parameters"""
         if self.active_interpreter != INTERPRETER_SELECTION_PLACEHOLDER:
@@ -1344,11 +5243,51 @@ class UMLDiagramGenerationApp:
         self.conversation_store.record_user_prompt(user_prompt)
         processing_start_time = perf_counter_ns()
 
+        # Replace older turns with stubs so the prompt stays within the token budget
+        self.context_compactor.token_budget = self.application_configuration.get(
+            "context_token_budget", DEFAULT_API_CONFIGURATION["context_token_budget"])["value"]
+        self.context_compactor.recent_turns = self.application_configuration.get(
+            "context_recent_turns", DEFAULT_API_CONFIGURATION["context_recent_turns"])["value"]
+        conversation_context, original_tokens, compacted_tokens = self.context_compactor.compact(conversation_context)
+        if compacted_tokens < original_tokens:
+            print(f"Context compaction saved {original_tokens - compacted_tokens} of {original_tokens} estimated prompt tokens")
+
         response_stream, response_parser = self.language_model_client.process_user_prompt(conversation_context, user_prompt)
 
         return response_stream, response_parser, processing_start_time
 
 
+    def process_user_prompts_concurrently(self, conversation_context, user_prompts):
+        """Sends several prompts at once through the async client and returns the responses in input order"""
+        if self.active_language_model == MODEL_SELECTION_PLACEHOLDER or not HTTPX_AVAILABLE:
+            return [None] * len(user_prompts)
+
+        prompt_requests = []
+        for user_prompt in user_prompts:
+            prompt_context = conversation_context + [{ROLE: ROLE_US, MSG: user_prompt, MSG_FORMAT: MSG_FORMAT_PROMPT}]
+            prompt_request = self.language_model_client.build_async_prompt_request(prompt_context, user_prompt)
+            if not prompt_request:
+                return [None] * len(user_prompts)
+            # Concurrent Ollama prompts must not overwrite each other's context
+            prompt_request.pop("context_callback", None)
+            prompt_requests.append(prompt_request)
+
+        processing_start_time = perf_counter_ns()
+        model_responses = get_async_language_model_client().complete_many_sync(prompt_requests)
+        execution_duration = perf_counter_ns() - processing_start_time
+
+        # Conversation logging is not thread-safe, so record results here in input order
+        processed_responses = []
+        for user_prompt, model_response in zip(user_prompts, model_responses):
+            if isinstance(model_response, Exception):
+                print(f"Error processing prompt concurrently: {model_response}")
+                processed_responses.append(None)
+                continue
+            self.conversation_store.record_user_prompt(user_prompt)
+            self.conversation_store.record_llm_response(model_response, execution_duration)
+            processed_responses.append(model_response)
+        return processed_responses
+
     def record_llm_response(self, response, execution_duration_ns):
         """Record an LLM response for logging"""
         # Delegate message handling to conversation_store instead of managing message ID directly
@@ -1386,24 +5325,111 @@ class UMLDiagramGenerationApp:
 
 
 
-    def render_diagram(self, diagram_code, projection_name=None):
+    def render_diagram(self, diagram_code, projection_name=None, projection_options=None):
         """Renders diagram using the selected interpreter with optional projection"""
         if not self.active_interpreter or self.active_interpreter == INTERPRETER_SELECTION_PLACEHOLDER:
             return None, None
 
+        # Use a finished speculative render of this projection when there is one
+        prerendered_result = None
+        if not projection_options:
+            prerendered_result = self.speculative_renderer.get_completed_render(
+                diagram_code, self.get_render_context(), projection_name or "Full Diagram")
+        if prerendered_result:
+            processed_code, rendering_output, execution_duration = prerendered_result
+        else:
+            processed_code, rendering_output, execution_duration = self.execute_timed_render(
+                diagram_code, projection_name, projection_options
+            )
+
+        if rendering_output:
+            self.conversation_store.record_interpreter_input(processed_code)
+            self.conversation_store.record_interpreter_output(rendering_output, execution_duration)
+
+        return processed_code, rendering_output
+
+    def execute_timed_render(self, diagram_code, projection_name=None, projection_options=None, raise_errors=False):
+        """Renders diagram without logging and returns the processed code, output and duration in nanoseconds"""
         processing_start_time = perf_counter_ns()
         processed_code, rendering_output = self.diagram_interpreter.execute_diagram_generation(
-            diagram_code, projection_name
+            diagram_code, projection_name, projection_options, raise_errors
         )
         processing_end_time = perf_counter_ns()
 
-        execution_duration = processing_end_time - processing_start_time
+        return processed_code, rendering_output, processing_end_time - processing_start_time
+
+    def prerender_projections(self, diagram_code, processed_code, rendering_output):
+        """Renders every other projection in the background after a successful full render"""
+        # Re-serving the full render later costs no rendering time, so it is kept with a zero duration
+        render_context = self.get_render_context()
+        self.speculative_renderer.record_completed_render(
+            diagram_code, render_context, "Full Diagram", (processed_code, rendering_output, 0))
+        # Projections that need options such as a focus class cannot be guessed ahead of time
+        projection_manager = ProjectionManager()
+        remaining_projections = [
+            projection_name for projection_name in projection_manager.get_available_projections()
+            if projection_name != "Full Diagram" and projection_name not in projection_manager.parameterized_projections
+        ]
+        self.speculative_renderer.schedule(diagram_code, render_context, remaining_projections, self.execute_timed_render)
+
+    def get_render_context(self):
+        """Returns the interpreter and its parameters, which together with the code determine a render"""
+        return json.dumps([self.active_interpreter, self.interpreter_parameters], sort_keys=True, default=str)
+
+    def submit_background_render(self, diagram_code):
+        """Starts an unlogged render on the streaming executor and returns its future"""
+        return get_streaming_render_executor().submit(self.execute_timed_render, diagram_code)
+
+    def render_many(self, diagram_codes, projection=None, max_workers=BATCH_RENDER_MAX_WORKERS, projection_options=None):
+        """Renders many diagrams concurrently on a bounded thread pool and returns results in input order"""
+        batch_results = [
+            {
+                "index": item_index,
+                "diagram_code": diagram_code,
+                "processed_code": None,
+                "output": None,
+                "error": None,
+                "execution_duration_ns": 0,
+                "execution_duration_s": 0.0
+            }
+            for item_index, diagram_code in enumerate(diagram_codes)
+        ]
 
-        if rendering_output:
-            self.conversation_store.record_interpreter_input(processed_code)
-            self.conversation_store.record_interpreter_output(rendering_output, execution_duration)
+        if not self.active_interpreter or self.active_interpreter == INTERPRETER_SELECTION_PLACEHOLDER:
+            for batch_result in batch_results:
+                batch_result["error"] = "No diagram interpreter selected"
+            return batch_results
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="uml-render") as executor:
+            pending_renders = {
+                executor.submit(
+                    self.execute_timed_render, batch_result["diagram_code"], projection, projection_options, True
+                ): batch_result
+                for batch_result in batch_results
+            }
+            for completed_render in as_completed(pending_renders):
+                batch_result = pending_renders[completed_render]
+                try:
+                    processed_code, rendering_output, execution_duration = completed_render.result()
+                except Exception as error:
+                    batch_result["error"] = str(error) or type(error).__name__
+                    continue
 
-        return processed_code, rendering_output
+                batch_result["processed_code"] = processed_code
+                batch_result["output"] = rendering_output
+                batch_result["execution_duration_ns"] = execution_duration
+                batch_result["execution_duration_s"] = execution_duration / 1e+9
+                if not rendering_output:
+                    batch_result["error"] = "Failed to generate diagram."
+
+        # Conversation logging is not thread-safe, so record results here in input order
+        for batch_result in batch_results:
+            if batch_result["output"]:
+                self.conversation_store.record_interpreter_input(batch_result["processed_code"])
+                self.conversation_store.record_interpreter_output(
+                    batch_result["output"], batch_result["execution_duration_ns"])
+
+        return batch_results
 
 
 
@@ -1460,6 +5486,51 @@ class SessionStateManager:
         return message_object
 
 
+class BufferedStreamRenderer:
+    """
+    Coalesces streamed response fragments into throttled placeholder updates.
+
+    Fragments are collected in a list instead of being concatenated, and the
+    placeholder is redrawn only when the flush interval has passed or enough
+    characters are waiting, so a long answer is not re-sent once per chunk.
+    """
+
+    def __init__(self, placeholder_element, flush_interval_seconds=STREAM_FLUSH_INTERVAL_MS / 1000,
+                 flush_size_chars=STREAM_FLUSH_SIZE_CHARS):
+        self.placeholder_element = placeholder_element
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_size_chars = flush_size_chars
+        self.response_fragments = []
+        self.unflushed_chars = 0
+        self.last_flush_time = time.monotonic()
+        self.flush_count = 0
+
+    def append(self, text_fragment):
+        """Buffer a fragment and redraw the placeholder if the time or size budget is used up."""
+        self.response_fragments.append(text_fragment)
+        self.unflushed_chars += len(text_fragment)
+        if (self.unflushed_chars >= self.flush_size_chars
+                or time.monotonic() - self.last_flush_time >= self.flush_interval_seconds):
+            self.flush()
+            return True
+        return False
+
+    def get_text(self):
+        """Return the full response received so far."""
+        if len(self.response_fragments) > 1:
+            self.response_fragments = ["".join(self.response_fragments)]
+        return self.response_fragments[0] if self.response_fragments else ""
+
+    def flush(self):
+        """Redraw the placeholder with everything buffered so far."""
+        if self.unflushed_chars == 0 and self.flush_count:
+            return
+        self.placeholder_element.markdown(self.get_text())
+        self.unflushed_chars = 0
+        self.last_flush_time = time.monotonic()
+        self.flush_count += 1
+
+
 class LanguageModelProcessor:
     """Processes user prompts through language models and manages response handling"""
 
@@ -1504,18 +5575,63 @@ class LanguageModelProcessor:
             return False
 
         # Process streaming response from language model
-        complete_model_response = ""
         response_placeholder = st.empty()
+        diagram_placeholder = st.empty()
         message_object = SessionStateManager.add_message_to_conversation(
             ROLE_AS, "", MSG_FORMAT_RESPONSE_LLM)
+        stream_configuration = application_instance.application_configuration
+        stream_renderer = BufferedStreamRenderer(
+            response_placeholder,
+            flush_interval_seconds=stream_configuration.get(
+                "stream_flush_interval_ms", DEFAULT_API_CONFIGURATION["stream_flush_interval_ms"])["value"] / 1000,
+            flush_size_chars=stream_configuration.get(
+                "stream_flush_size_chars", DEFAULT_API_CONFIGURATION["stream_flush_size_chars"])["value"]
+        )
+
+        # Render diagrams while the model is still streaming its explanation
+        streaming_detector = StreamingDiagramDetector()
+        block_renders = []
+        preview_render = None
+        displayed_render = None
 
         # Accumulate response chunks
         for response_chunk in response_stream:
             text_fragment = response_parser(response_chunk)
             if text_fragment:
-                complete_model_response += text_fragment
-                message_object[MSG] = complete_model_response
-                response_placeholder.markdown(complete_model_response)
+                if stream_renderer.append(text_fragment):
+                    message_object[MSG] = stream_renderer.get_text()
+
+                completed_blocks = streaming_detector.feed(text_fragment)
+                if completed_blocks and LanguageModelProcessor.prepare_streaming_interpreter(application_instance):
+                    for diagram_code in completed_blocks:
+                        block_renders.append((diagram_code, application_instance.submit_background_render(diagram_code)))
+                    # A finished block supersedes any preview of it
+                    if preview_render:
+                        preview_render.cancel()
+                        preview_render = None
+
+                if not preview_render or preview_render.done():
+                    preview_code = streaming_detector.get_progressive_preview()
+                    if preview_code and LanguageModelProcessor.prepare_streaming_interpreter(application_instance):
+                        preview_render = application_instance.submit_background_render(preview_code)
+
+                # Show the newest finished render
+                finished_renders = [render_future for _, render_future in block_renders if render_future.done()]
+                # A live preview always belongs to the block that is still open, so it is the newest
+                if preview_render and preview_render.done() and not preview_render.cancelled():
+                    finished_renders.append(preview_render)
+                if finished_renders and finished_renders[-1] is not displayed_render:
+                    displayed_render = finished_renders[-1]
+                    LanguageModelProcessor.display_streaming_render(diagram_placeholder, displayed_render)
+
+        if preview_render:
+            preview_render.cancel()
+
+        # Show whatever is still buffered
+        stream_renderer.flush()
+        complete_model_response = stream_renderer.get_text()
+        message_object[MSG] = complete_model_response
+        print(f"Streamed {len(complete_model_response)} characters in {stream_renderer.flush_count} view updates")
 
         # Record the final response timing
         if processing_start_time:
@@ -1523,36 +5639,99 @@ class LanguageModelProcessor:
             execution_duration = processing_end_time - processing_start_time
             application_instance.record_llm_response(complete_model_response, execution_duration)
 
+        # Log the completed blocks in order; most renders already finished during generation
+        # The last block is the one shown and handed to the editor, so earlier renders still running are stale
+        final_diagram_code = streaming_detector.completed_blocks[-1] if streaming_detector.completed_blocks else None
+        final_render = block_renders[-1][1] if block_renders else None
+        for diagram_code, render_future in block_renders:
+            if render_future is not final_render and not render_future.done():
+                render_future.cancel()
+                continue
+            try:
+                processed_code, rendering_output, render_duration = render_future.result()
+            except Exception as error:
+                print(f"Error rendering streamed diagram: {error}")
+                continue
+            if rendering_output:
+                application_instance.conversation_store.record_interpreter_input(processed_code)
+                application_instance.conversation_store.record_interpreter_output(rendering_output, render_duration)
+                st.session_state["current_diagram"] = rendering_output
+                st.session_state["last_processed_code"] = processed_code
+                st.session_state["last_successful_code"] = diagram_code
+        if final_render:
+            if final_render is not displayed_render:
+                LanguageModelProcessor.display_streaming_render(diagram_placeholder, final_render)
+            LanguageModelProcessor.save_streaming_render(final_render)
+
         # Extract diagram code and handle diagram generation
         LanguageModelProcessor.handle_diagram_code_detection(
             complete_model_response,
             response_placeholder,
-            application_instance
+            application_instance,
+            final_diagram_code
         )
 
         return True
 
     @staticmethod
-    def handle_diagram_code_detection(model_response, placeholder_element, application_instance):
+    def prepare_streaming_interpreter(application_instance):
+        """Selects the default interpreter for streamed diagrams and reports whether rendering is possible"""
+        if application_instance.active_interpreter == INTERPRETER_SELECTION_PLACEHOLDER and "previous_page" not in st.session_state:
+            application_instance.select_diagram_interpreter(INT_PLANTWEB_PLANTUML)
+        return application_instance.active_interpreter not in (None, INTERPRETER_SELECTION_PLACEHOLDER)
+
+    @staticmethod
+    def display_streaming_render(placeholder_element, render_future):
+        """Shows a finished background render in the diagram placeholder"""
+        try:
+            _, rendering_output, _ = render_future.result()
+        except Exception as error:
+            print(f"Error rendering streamed diagram: {error}")
+            return
+        if not rendering_output:
+            return
+
+        with placeholder_element.container():
+            if isinstance(rendering_output, str) and rendering_output.startswith("<?xml") and "<svg" in rendering_output:
+                st.components.v1.html(rendering_output, height=500)
+            else:
+                st.code(str(rendering_output))
+
+    @staticmethod
+    def save_streaming_render(render_future):
+        """Adds the final streamed render to the conversation so it is shown again after the next rerun"""
+        try:
+            _, rendering_output, _ = render_future.result()
+        except Exception:
+            return
+        if not rendering_output:
+            return
+
+        if isinstance(rendering_output, str) and rendering_output.startswith("<?xml") and "<svg" in rendering_output:
+            SessionStateManager.add_message_to_conversation(ROLE_IN, rendering_output, MSG_FORMAT_RESPONSE_INT_IMG)
+        else:
+            SessionStateManager.add_message_to_conversation(ROLE_IN, str(rendering_output), MSG_FORMAT_RESPONSE_INT_TXT)
+
+    @staticmethod
+    def handle_diagram_code_detection(model_response, placeholder_element, application_instance, detected_diagram_code=None):
         """Detects and processes PlantUML diagram code in model responses"""
         # Look for PlantUML code patterns
         plantuml_pattern = r'@startuml[\s\S]*?@enduml'
         code_block_pattern = r'```(?:plantuml|uml)?([\s\S]*?)```'
 
-        # First try code blocks with explicit markup
-        code_blocks = re.findall(code_block_pattern, model_response)
-        detected_diagram_code = None
-
-        for block in code_blocks:
-            if '@startuml' in block and '@enduml' in block:
-                detected_diagram_code = block.strip()
-                break
+        # Without a block from the stream, use the last diagram, as the streamed renders do
+        if not detected_diagram_code:
+            code_blocks = re.findall(code_block_pattern, model_response)
+            for block in reversed(code_blocks):
+                if '@startuml' in block and '@enduml' in block:
+                    detected_diagram_code = block.strip()
+                    break
 
         # If not found in code blocks, try direct pattern
         if not detected_diagram_code:
             direct_matches = re.findall(plantuml_pattern, model_response)
             if direct_matches:
-                detected_diagram_code = direct_matches[0].strip()
+                detected_diagram_code = direct_matches[-1].strip()
 
         # Handle the detected diagram code
         if detected_diagram_code and "previous_page" not in st.session_state:
@@ -1560,8 +5739,9 @@ class LanguageModelProcessor:
             with placeholder_element.container():
                 st.success("PlantUML code detected! You can open it in the Diagram Editor.")
 
-                # Configure the interpreter automatically
-                application_instance.select_diagram_interpreter(INT_PLANTWEB_PLANTUML)
+                # Configure the interpreter automatically unless one was already chosen
+                if application_instance.active_interpreter == INTERPRETER_SELECTION_PLACEHOLDER:
+                    application_instance.select_diagram_interpreter(INT_PLANTWEB_PLANTUML)
 
                 # Save diagram code for the editor
                 st.session_state["editor_code"] = detected_diagram_code
@@ -1586,7 +5766,7 @@ class DiagramInterpreterProcessor:
             ROLE_IN, "", MSG_FORMAT_RESPONSE_INT)
 
         # Preprocess PlantUML code before sending to interpreter
-        if application_instance.active_interpreter == INT_PLANTWEB_PLANTUML:
+        if application_instance.active_interpreter in (INT_PLANTWEB_PLANTUML, INTERPRETER_LOCAL_PLANTUML):
             # Ensure code has proper start/end tags
             if not diagram_code.strip().startswith("@startuml"):
                 diagram_code = "@startuml\n" + diagram_code
@@ -1678,12 +5858,236 @@ class ApplicationPages:
                 help=application_instance.application_configuration["model_name"]["description"]
             )
 
+            stream_flush_interval = st.number_input(
+                "Stream Flush Interval (ms)",
+                min_value=0,
+                max_value=2000,
+                value=application_instance.application_configuration.get(
+                    "stream_flush_interval_ms", DEFAULT_API_CONFIGURATION["stream_flush_interval_ms"])["value"],
+                step=10,
+                help=DEFAULT_API_CONFIGURATION["stream_flush_interval_ms"]["description"]
+            )
+
+            stream_flush_size = st.number_input(
+                "Stream Flush Size (characters)",
+                min_value=1,
+                max_value=65536,
+                value=application_instance.application_configuration.get(
+                    "stream_flush_size_chars", DEFAULT_API_CONFIGURATION["stream_flush_size_chars"])["value"],
+                step=64,
+                help=DEFAULT_API_CONFIGURATION["stream_flush_size_chars"]["description"]
+            )
+
+            context_token_budget = st.number_input(
+                "Context Token Budget",
+                min_value=500,
+                max_value=200000,
+                value=application_instance.application_configuration.get(
+                    "context_token_budget", DEFAULT_API_CONFIGURATION["context_token_budget"])["value"],
+                step=500,
+                help=DEFAULT_API_CONFIGURATION["context_token_budget"]["description"]
+            )
+
+            context_recent_turns = st.number_input(
+                "Recent Turns Kept Verbatim",
+                min_value=0,
+                max_value=50,
+                value=application_instance.application_configuration.get(
+                    "context_recent_turns", DEFAULT_API_CONFIGURATION["context_recent_turns"])["value"],
+                step=1,
+                help=DEFAULT_API_CONFIGURATION["context_recent_turns"]["description"]
+            )
+
+            use_async_client = st.checkbox(
+                "Use Async Client",
+                value=application_instance.application_configuration.get(
+                    "use_async_client", DEFAULT_API_CONFIGURATION["use_async_client"])["value"],
+                help=DEFAULT_API_CONFIGURATION["use_async_client"]["description"],
+                disabled=not HTTPX_AVAILABLE
+            )
+
+            use_response_cache = st.checkbox(
+                "Use Response Cache",
+                value=application_instance.application_configuration.get(
+                    "use_response_cache", DEFAULT_API_CONFIGURATION["use_response_cache"])["value"],
+                help=DEFAULT_API_CONFIGURATION["use_response_cache"]["description"]
+            )
+
+            conversation_storage_backend = st.selectbox(
+                "Conversation Storage",
+                options=CONVERSATION_STORAGE_BACKENDS,
+                index=CONVERSATION_STORAGE_BACKENDS.index(application_instance.application_configuration.get(
+                    "conversation_storage_backend", DEFAULT_API_CONFIGURATION["conversation_storage_backend"])["value"]),
+                help=DEFAULT_API_CONFIGURATION["conversation_storage_backend"]["description"]
+            )
+
+            deduplicate_artifacts = st.checkbox(
+                "Deduplicate Diagram Artifacts",
+                value=application_instance.application_configuration.get(
+                    "deduplicate_artifacts", DEFAULT_API_CONFIGURATION["deduplicate_artifacts"])["value"],
+                help=DEFAULT_API_CONFIGURATION["deduplicate_artifacts"]["description"]
+            )
+
+            background_log_writes = st.checkbox(
+                "Background Log Writes",
+                value=application_instance.application_configuration.get(
+                    "background_log_writes", DEFAULT_API_CONFIGURATION["background_log_writes"])["value"],
+                help=DEFAULT_API_CONFIGURATION["background_log_writes"]["description"]
+            )
+
+            log_fsync_policy = st.selectbox(
+                "Log Fsync Policy",
+                options=CONVERSATION_LOG_FSYNC_POLICIES,
+                index=CONVERSATION_LOG_FSYNC_POLICIES.index(application_instance.application_configuration.get(
+                    "log_fsync_policy", DEFAULT_API_CONFIGURATION["log_fsync_policy"])["value"]),
+                help=DEFAULT_API_CONFIGURATION["log_fsync_policy"]["description"]
+            )
+
+            st.subheader("Log Retention")
+
+            retention_max_total_mb = st.number_input(
+                "Log Directory Size Cap (MB)",
+                min_value=16,
+                max_value=1024 * 1024,
+                value=application_instance.application_configuration.get(
+                    "retention_max_total_mb", DEFAULT_API_CONFIGURATION["retention_max_total_mb"])["value"],
+                step=256,
+                help=DEFAULT_API_CONFIGURATION["retention_max_total_mb"]["description"]
+            )
+
+            retention_max_conversation_mb = st.number_input(
+                "Conversation Size Cap (MB)",
+                min_value=1,
+                max_value=1024 * 1024,
+                value=application_instance.application_configuration.get(
+                    "retention_max_conversation_mb", DEFAULT_API_CONFIGURATION["retention_max_conversation_mb"])["value"],
+                step=16,
+                help=DEFAULT_API_CONFIGURATION["retention_max_conversation_mb"]["description"]
+            )
+
+            retention_max_age_days = st.number_input(
+                "Delete Conversations After (days)",
+                min_value=1,
+                max_value=3650,
+                value=application_instance.application_configuration.get(
+                    "retention_max_age_days", DEFAULT_API_CONFIGURATION["retention_max_age_days"])["value"],
+                step=1,
+                help=DEFAULT_API_CONFIGURATION["retention_max_age_days"]["description"]
+            )
+
+            st.subheader("Ollama Settings")
+
+            ollama_base_url = st.text_input(
+                "Ollama Server URL",
+                value=application_instance.application_configuration.get(
+                    "ollama_base_url", DEFAULT_API_CONFIGURATION["ollama_base_url"])["value"],
+                help=DEFAULT_API_CONFIGURATION["ollama_base_url"]["description"]
+            )
+
+            ollama_keep_alive = st.text_input(
+                "Keep Model Loaded For",
+                value=application_instance.application_configuration.get(
+                    "ollama_keep_alive", DEFAULT_API_CONFIGURATION["ollama_keep_alive"])["value"],
+                help=DEFAULT_API_CONFIGURATION["ollama_keep_alive"]["description"]
+            )
+
+            st.subheader("llama.cpp Settings")
+
+            llama_cpp_model_path = st.text_input(
+                "GGUF Model Path",
+                value=application_instance.application_configuration.get(
+                    "llama_cpp_model_path", DEFAULT_API_CONFIGURATION["llama_cpp_model_path"])["value"],
+                help=DEFAULT_API_CONFIGURATION["llama_cpp_model_path"]["description"],
+                disabled=not LLAMA_CPP_MODEL_AVAILABLE
+            )
+
+            llama_cpp_n_threads = st.number_input(
+                "Threads",
+                min_value=1,
+                max_value=256,
+                value=application_instance.application_configuration.get(
+                    "llama_cpp_n_threads", DEFAULT_API_CONFIGURATION["llama_cpp_n_threads"])["value"],
+                step=1,
+                help=DEFAULT_API_CONFIGURATION["llama_cpp_n_threads"]["description"],
+                disabled=not LLAMA_CPP_MODEL_AVAILABLE
+            )
+
+            llama_cpp_n_ctx = st.number_input(
+                "Context Size (tokens)",
+                min_value=512,
+                max_value=131072,
+                value=application_instance.application_configuration.get(
+                    "llama_cpp_n_ctx", DEFAULT_API_CONFIGURATION["llama_cpp_n_ctx"])["value"],
+                step=512,
+                help=DEFAULT_API_CONFIGURATION["llama_cpp_n_ctx"]["description"],
+                disabled=not LLAMA_CPP_MODEL_AVAILABLE
+            )
+
+            llama_cpp_use_mmap = st.checkbox(
+                "Memory-Map Model",
+                value=application_instance.application_configuration.get(
+                    "llama_cpp_use_mmap", DEFAULT_API_CONFIGURATION["llama_cpp_use_mmap"])["value"],
+                help=DEFAULT_API_CONFIGURATION["llama_cpp_use_mmap"]["description"],
+                disabled=not LLAMA_CPP_MODEL_AVAILABLE
+            )
+
+            llama_cpp_use_mlock = st.checkbox(
+                "Lock Model in RAM",
+                value=application_instance.application_configuration.get(
+                    "llama_cpp_use_mlock", DEFAULT_API_CONFIGURATION["llama_cpp_use_mlock"])["value"],
+                help=DEFAULT_API_CONFIGURATION["llama_cpp_use_mlock"]["description"],
+                disabled=not LLAMA_CPP_MODEL_AVAILABLE
+            )
+
             submit_button = st.form_submit_button("Save Configuration")
             if submit_button:
                 application_instance.application_configuration["api_key"]["value"] = api_key
                 application_instance.application_configuration["base_url"]["value"] = base_url
                 application_instance.application_configuration["model_name"]["value"] = model_name
+                application_instance.application_configuration["stream_flush_interval_ms"] = {
+                    "value": int(stream_flush_interval),
+                    "description": DEFAULT_API_CONFIGURATION["stream_flush_interval_ms"]["description"]
+                }
+                application_instance.application_configuration["context_token_budget"] = {
+                    "value": int(context_token_budget),
+                    "description": DEFAULT_API_CONFIGURATION["context_token_budget"]["description"]
+                }
+                application_instance.application_configuration["context_recent_turns"] = {
+                    "value": int(context_recent_turns),
+                    "description": DEFAULT_API_CONFIGURATION["context_recent_turns"]["description"]
+                }
+                application_instance.application_configuration["use_async_client"] = {
+                    "value": bool(use_async_client),
+                    "description": DEFAULT_API_CONFIGURATION["use_async_client"]["description"]
+                }
+                application_instance.application_configuration["use_response_cache"] = {
+                    "value": bool(use_response_cache),
+                    "description": DEFAULT_API_CONFIGURATION["use_response_cache"]["description"]
+                }
+                application_instance.application_configuration["stream_flush_size_chars"] = {
+                    "value": int(stream_flush_size),
+                    "description": DEFAULT_API_CONFIGURATION["stream_flush_size_chars"]["description"]
+                }
+                for setting_key, setting_value in (("retention_max_total_mb", int(retention_max_total_mb)),
+                                                   ("retention_max_conversation_mb", int(retention_max_conversation_mb)),
+                                                   ("retention_max_age_days", int(retention_max_age_days)),
+                                                   ("conversation_storage_backend", conversation_storage_backend),
+                                                   ("deduplicate_artifacts", bool(deduplicate_artifacts)),
+                                                   ("background_log_writes", bool(background_log_writes)),
+                                                   ("log_fsync_policy", log_fsync_policy),
+                                                   ("ollama_base_url", ollama_base_url),
+                                                   ("ollama_keep_alive", ollama_keep_alive),
+                                                   ("llama_cpp_model_path", llama_cpp_model_path),
+                                                   ("llama_cpp_n_threads", int(llama_cpp_n_threads)),
+                                                   ("llama_cpp_n_ctx", int(llama_cpp_n_ctx)),
+                                                   ("llama_cpp_use_mmap", bool(llama_cpp_use_mmap)),
+                                                   ("llama_cpp_use_mlock", bool(llama_cpp_use_mlock))):
+                    application_instance.application_configuration[setting_key] = {
+                        "value": setting_value,
+                        "description": DEFAULT_API_CONFIGURATION[setting_key]["description"]
+                    }
                 application_instance.save_user_configuration()
+                application_instance.apply_storage_configuration()
 
                 # Re-initialize if a model is already selected
                 if application_instance.active_language_model != MODEL_SELECTION_PLACEHOLDER:
@@ -1691,6 +6095,69 @@ class ApplicationPages:
 
                 st.success("Configuration saved!")
 
+        if application_instance.language_model_client.http_session:
+            with st.expander("Connection Statistics"):
+                st.json(application_instance.language_model_client.http_session.get_statistics())
+
+        if isinstance(application_instance.conversation_store, SQLiteConversationDataStorage):
+            with st.expander("Conversation Database"):
+                st.json(application_instance.conversation_store.get_statistics())
+                conversation_search_text = st.text_input("Search prompts and diagram code")
+                if conversation_search_text:
+                    st.dataframe(application_instance.conversation_store.search_messages(conversation_search_text))
+
+        if application_instance.conversation_store.deduplicate_artifacts and not isinstance(
+                application_instance.conversation_store, SQLiteConversationDataStorage):
+            with st.expander("Artifact Blob Store Statistics"):
+                st.json(get_artifact_blob_store().get_statistics())
+
+        with st.expander("Log Retention Statistics"):
+            st.json(get_retention_manager().get_statistics())
+            if st.button("Sweep Now"):
+                get_retention_manager().sweep()
+                st.rerun()
+
+        if application_instance.conversation_store.background_writes:
+            with st.expander("Log Writer Statistics"):
+                st.json(get_conversation_writer().get_statistics())
+
+        if application_instance.language_model_client.ollama_session:
+            with st.expander("Ollama Statistics"):
+                st.json(application_instance.language_model_client.ollama_session.get_statistics())
+
+        if application_instance.language_model_client.llama_cpp_worker:
+            with st.expander("llama.cpp Statistics"):
+                st.json(application_instance.language_model_client.llama_cpp_worker.get_statistics())
+
+        if application_instance.language_model_client.use_response_cache:
+            with st.expander("Response Cache Statistics"):
+                st.json(get_shared_llm_response_cache().get_statistics())
+                if st.button("Clear Response Cache"):
+                    get_shared_llm_response_cache().clear()
+                    st.rerun()
+
+        st.divider()
+        st.subheader("Syntax Correction Rules")
+        syntax_corrector = get_shared_plantuml_syntax_corrector()
+        rule_statistics = syntax_corrector.get_rule_statistics()
+        for rule_statistic in rule_statistics:
+            rule_enabled = st.checkbox(
+                rule_statistic["rule"],
+                value=rule_statistic["enabled"],
+                help=rule_statistic["description"],
+                key=f"correction_rule_{rule_statistic['rule']}"
+            )
+            if rule_enabled != rule_statistic["enabled"]:
+                syntax_corrector.set_rule_enabled(rule_statistic["rule"], rule_enabled)
+                rule_statistic["enabled"] = rule_enabled
+
+        st.dataframe(rule_statistics, use_container_width=True)
+        st.caption(f"Shared scan: {syntax_corrector.scan_statistics['scans']} runs, "
+                   f"{syntax_corrector.scan_statistics['scan_time_ns'] / 1e+6:.2f} ms total")
+        if st.button("Reset Rule Statistics"):
+            syntax_corrector.reset_statistics()
+            st.rerun()
+
         st.divider()
         with st.expander("Default Configuration"):
             st.json(DEFAULT_API_CONFIGURATION)
@@ -1742,19 +6209,58 @@ class ApplicationPages:
             st.header("Model Selection")
 
             # Language model selection with default value
+            language_model_options = [MODEL_SELECTION_PLACEHOLDER,
+                                      f"{API_PROVIDER_BIGMODEL}/glm-4-plus",
+                                      f"{API_PROVIDER_OPENAI}/gpt-4",
+                                      f"{API_PROVIDER_REPLICATE}/llama3-70B-Chat",
+                                      f"{API_PROVIDER_OLLAMA}/llama3",
+                                      f"{API_PROVIDER_LLAMA_CPP}/local-gguf"]
             selected_model = st.selectbox(
                 "Select Language Model",
-                options=[MODEL_SELECTION_PLACEHOLDER,
-                         f"{API_PROVIDER_BIGMODEL}/glm-4-plus",
-                         f"{API_PROVIDER_OPENAI}/gpt-4",
-                         f"{API_PROVIDER_REPLICATE}/llama3-70B-Chat",
-                         f"{API_PROVIDER_OLLAMA}/llama3"],
+                options=language_model_options,
                 index=1  # Default to BigModel option
             )
 
             if application_instance.select_language_model(selected_model):
                 st.success(f"Selected model: {selected_model}")
 
+            # Race the selected model against other providers to cut tail latency
+            if application_instance.active_language_model != MODEL_SELECTION_PLACEHOLDER:
+                race_configuration = application_instance.application_configuration
+                race_enabled = st.checkbox(
+                    "Race Providers",
+                    value=bool(application_instance.language_model_client.race_contenders),
+                    help=DEFAULT_API_CONFIGURATION["race_models"]["description"]
+                )
+                race_models = []
+                hedge_delay_ms = race_configuration.get(
+                    "race_hedge_delay_ms", DEFAULT_API_CONFIGURATION["race_hedge_delay_ms"])["value"]
+                if race_enabled:
+                    race_model_options = [model_id for model_id in language_model_options[1:]
+                                          if model_id != application_instance.active_language_model]
+                    race_models = st.multiselect(
+                        "Racing Models",
+                        options=race_model_options,
+                        default=[model_id for model_id in race_configuration.get(
+                            "race_models", DEFAULT_API_CONFIGURATION["race_models"])["value"]
+                                 if model_id in race_model_options]
+                    )
+                    hedge_delay_ms = st.slider(
+                        "Hedging Delay (ms)",
+                        min_value=0,
+                        max_value=10000,
+                        value=hedge_delay_ms,
+                        step=250,
+                        help=DEFAULT_API_CONFIGURATION["race_hedge_delay_ms"]["description"]
+                    )
+                if ([model_id for model_id, _ in application_instance.language_model_client.race_contenders] != race_models
+                        or application_instance.language_model_client.race_hedge_delay_seconds != hedge_delay_ms / 1000):
+                    application_instance.configure_race_mode(race_models, hedge_delay_ms)
+
+                last_race = application_instance.language_model_client.race_statistics["last_race"]
+                if race_enabled and last_race:
+                    st.caption(f"Last answer from {last_race['winner']}")
+
             # Model parameters
             if application_instance.active_language_model != MODEL_SELECTION_PLACEHOLDER:
                 st.subheader("Model Parameters")
@@ -1809,6 +6315,7 @@ class ApplicationPages:
                 - **Associations Only**: See how classes relate to each other
                 - **Interface Implementations**: Focus on interfaces and implementations
                 - **Simplified View**: Get a high-level overview of the system
+                - **Class Neighborhood**: Show one class and its neighbors within a few hops
                 
                 Use projections to better understand complex systems by focusing on one aspect at a time.
                 """)
@@ -1883,6 +6390,20 @@ class ApplicationPages:
         if application_instance.active_interpreter == INTERPRETER_SELECTION_PLACEHOLDER:
             application_instance.select_diagram_interpreter(INT_PLANTWEB_PLANTUML)
 
+        # Renderer selection: remote Plantweb server or the local PlantUML worker pool
+        with st.sidebar:
+            st.header("Diagram Interpreter")
+            interpreter_options = [INTERPRETER_PLANTWEB_PLANTUML, INTERPRETER_LOCAL_PLANTUML]
+            selected_interpreter = st.selectbox(
+                "Select Interpreter",
+                options=interpreter_options,
+                index=interpreter_options.index(application_instance.active_interpreter)
+                if application_instance.active_interpreter in interpreter_options else 0,
+                help="Local/PlantUML renders offline on a pool of warm PlantUML processes (requires Java and PLANTUML_JAR)"
+            )
+            if application_instance.select_diagram_interpreter(selected_interpreter):
+                st.success(f"Selected interpreter: {selected_interpreter}")
+
         # Add projection controls to sidebar
         with st.sidebar:
             st.header("Diagram Projections")
@@ -1902,6 +6423,53 @@ class ApplicationPages:
                 help="Choose different ways to visualize your UML diagram"
             )
 
+            # Focus class and hop count for the neighborhood projection
+            st.session_state.projection_options = None
+            if selected_projection in projection_manager.parameterized_projections:
+                graph_index = get_shared_diagram_model_cache().get_graph_index(st.session_state.get("editor_code", ""))
+                if graph_index.node_names:
+                    focus_class = st.selectbox(
+                        "Focus Class",
+                        options=graph_index.node_names,
+                        help="Class at the center of the neighborhood"
+                    )
+                    neighborhood_hops = st.number_input(
+                        "Neighborhood Hops",
+                        min_value=0,
+                        max_value=CLASS_NEIGHBORHOOD_MAX_HOPS,
+                        value=CLASS_NEIGHBORHOOD_DEFAULT_HOPS,
+                        step=1,
+                        help="Number of relationship hops to include around the focus class"
+                    )
+                    st.session_state.projection_options = {"focus_class": focus_class, "hops": int(neighborhood_hops)}
+                else:
+                    st.warning("The diagram has no classes to focus on")
+
+            # Optional fixed number of classes for the core classes projection
+            if selected_projection == "Core Classes Only":
+                core_class_count = st.number_input(
+                    "Core Class Count",
+                    min_value=0,
+                    max_value=CORE_CLASSES_MAX_COUNT,
+                    value=0,
+                    step=1,
+                    help="Number of most central classes to keep; 0 keeps a share of all classes"
+                )
+                if core_class_count:
+                    st.session_state.projection_options = {"top_k": int(core_class_count)}
+
+            # Switch instantly when the selected projection was already rendered in the background
+            if (selected_projection != st.session_state.current_projection and "current_diagram" in st.session_state
+                    and not st.session_state.projection_options):
+                editor_code = st.session_state.get("editor_code", "")
+                if application_instance.speculative_renderer.get_completed_render(
+                        editor_code, application_instance.get_render_context(), selected_projection):
+                    processed_code, diagram_result = application_instance.render_diagram(
+                        editor_code, selected_projection
+                    )
+                    st.session_state["current_diagram"] = diagram_result
+                    st.session_state["last_processed_code"] = processed_code
+
             # Update the current projection
             st.session_state.current_projection = selected_projection
 
@@ -1924,6 +6492,7 @@ class ApplicationPages:
                 - **Associations Only**: See how classes relate to each other
                 - **Interface Implementations**: Focus on interfaces and implementations
                 - **Simplified View**: Get a high-level overview of the system
+                - **Class Neighborhood**: Show one class and its neighbors within a few hops
                 
                 Use projections to better understand complex systems by focusing on one aspect at a time.
                 """)
@@ -1965,6 +6534,16 @@ class ApplicationPages:
             )
             st.session_state.editor_code = plant_uml_code
 
+            # Cancel speculative projection renders of code that has since been edited
+            application_instance.speculative_renderer.discard_stale(
+                plant_uml_code, application_instance.get_render_context())
+
+            # Patch the cached diagram model with just the edited part of the buffer
+            diagram_model = application_instance.diagram_model_parser.update(plant_uml_code)
+            st.caption(f"{len(diagram_model.classifiers)} classifiers, "
+                       f"{len(diagram_model.relationships)} relationships, "
+                       f"{len(diagram_model.packages)} packages")
+
             button_column1, button_column2, button_column3 = st.columns(3)
 
             # Render button that stays on this page
@@ -1973,7 +6552,8 @@ class ApplicationPages:
                     with st.spinner("Rendering..."):
                         # Process the diagram code with the selected projection
                         processed_code, diagram_result = application_instance.render_diagram(
-                            plant_uml_code, st.session_state.current_projection
+                            plant_uml_code, st.session_state.current_projection,
+                            st.session_state.get("projection_options")
                         )
 
                         # Store results
@@ -1981,6 +6561,12 @@ class ApplicationPages:
                             st.session_state["current_diagram"] = diagram_result
                             st.session_state["last_processed_code"] = processed_code
                             st.session_state["last_successful_code"] = plant_uml_code
+
+                            # Pre-render the other projections so switching views is instant
+                            if st.session_state.current_projection == "Full Diagram":
+                                application_instance.prerender_projections(
+                                    plant_uml_code, processed_code, diagram_result
+                                )
                         else:
                             st.error("Failed to generate diagram")
 
@@ -2023,7 +6609,8 @@ class ApplicationPages:
                         # Render the diagram with the selected projection
                         processed_code, svg_content = application_instance.render_diagram(
                             plant_uml_code,
-                            projection_name=projection_name
+                            projection_name=projection_name,
+                            projection_options=st.session_state.get("projection_options")
                         )
 
                         # Store the results in session state
@@ -2149,15 +6736,50 @@ class ApplicationMain:
 
 
 # Application entry point
+def print_command_line_usage():
+    """Print the command line options"""
+    print(f"{APPLICATION_TITLE} {APPLICATION_VERSION}")
+    print("Usage: python UML_Diagram_Generator.py [options]")
+    print("\nOptions:")
+    print("  -h, --help           Show this help message")
+    print("  --export-log PATH    Rebuild the JSON log of a .jsonl conversation log, or of every log in a directory")
+
+
+def parse_command_line_options(command_line_arguments):
+    """Return the recognized options; unknown ones, such as those meant for Streamlit, are reported and skipped"""
+    remaining_arguments = list(command_line_arguments)
+    while True:
+        try:
+            command_line_options, _ = getopt.gnu_getopt(remaining_arguments, "h", ["help", "export-log="])
+            return command_line_options
+        except getopt.GetoptError as error:
+            print(f"Ignoring command line argument: {error}")
+            skipped_arguments = [
+                argument for argument in remaining_arguments
+                if argument == f"--{error.opt}" or argument.startswith(f"--{error.opt}=")
+                or (len(error.opt) == 1 and argument.startswith("-") and not argument.startswith("--")
+                    and error.opt in argument[1:])
+            ]
+            if not error.opt or not skipped_arguments:
+                return []
+            skipped_index = remaining_arguments.index(skipped_arguments[0])
+            if skipped_arguments[0].startswith("--") or skipped_arguments[0] == f"-{error.opt}":
+                del remaining_arguments[skipped_index]
+            else:
+                # Keep the other options of a group of short options such as -hx
+                remaining_arguments[skipped_index] = skipped_arguments[0].replace(error.opt, "", 1)
+
+
 if __name__ == "__main__":
     try:
-        # Handle command line arguments
-        if "--help" in sys.argv or "-h" in sys.argv:
-            print(f"{APPLICATION_TITLE} {APPLICATION_VERSION}")
-            print("Usage: python UML_Diagram_Generator.py [options]")
-            print("\nOptions:")
-            print("  -h, --help  Show this help message")
-            sys.exit(0)
+        # Handle command line arguments; unknown ones, such as those meant for Streamlit, do not stop the application
+        for option_name, option_value in parse_command_line_options(sys.argv[1:]):
+            if option_name in ("-h", "--help"):
+                print_command_line_usage()
+                sys.exit(0)
+            if option_name == "--export-log":
+                export_conversation_logs(option_value)
+                sys.exit(0)
 
         # Start the application
         ApplicationMain.execute_application()
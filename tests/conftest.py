@@ -0,0 +1,53 @@
+"""Shared fixtures: load the application module, with a minimal streamlit stand-in when it is not installed."""
+
+import functools
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+APPLICATION_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "UML_Diagram_development_Assistant_V1.0.py"
+)
+
+
+def install_streamlit_stub():
+    """Register a module that provides what the application uses from streamlit at import time."""
+    streamlit_stub = types.ModuleType("streamlit")
+
+    def cache_resource(func=None, **_):
+        def decorate(wrapped_function):
+            cached_results = {}
+
+            @functools.wraps(wrapped_function)
+            def wrapper(*args, **kwargs):
+                cache_key = (args, tuple(sorted(kwargs.items())))
+                if cache_key not in cached_results:
+                    cached_results[cache_key] = wrapped_function(*args, **kwargs)
+                return cached_results[cache_key]
+
+            wrapper.clear = cached_results.clear
+            return wrapper
+
+        return decorate(func) if func else decorate
+
+    streamlit_stub.cache_resource = cache_resource
+    streamlit_stub.session_state = {}
+    sys.modules["streamlit"] = streamlit_stub
+
+
+try:
+    import streamlit  # noqa: F401
+except ImportError:
+    install_streamlit_stub()
+
+
+@pytest.fixture(scope="session")
+def application():
+    # The application file name is not importable as a module name, so it is loaded from its path
+    module_spec = importlib.util.spec_from_file_location("uml_diagram_development_assistant", APPLICATION_PATH)
+    application_module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(application_module)
+    return application_module
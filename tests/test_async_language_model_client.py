@@ -0,0 +1,129 @@
+"""The asyncio LLM client against a local mock SSE server."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+RESPONSE_DELAY_S = 0.2
+
+
+class MockLanguageModelHandler(BaseHTTPRequestHandler):
+    """Streams chat completions as server-sent events and Ollama generations as JSON lines."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_):
+        pass
+
+    def do_POST(self):
+        request_data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.counter_lock:
+            server.active_requests += 1
+            server.peak_active_requests = max(server.peak_active_requests, server.active_requests)
+        try:
+            time.sleep(RESPONSE_DELAY_S)
+            if self.path.endswith("chat/completions"):
+                prompt = request_data["messages"][-1]["content"]
+                response_lines = ["data: " + json.dumps({"choices": [{"delta": {"content": fragment}}]})
+                                  for fragment in ("echo:", " ", prompt)]
+                response_lines[1:1] = [": keep-alive comment", "data: not json"]
+                response_lines.append("data: [DONE]")
+                # Events are separated by a blank line
+                self.send_streamed_lines("text/event-stream", [line + "\n\n" for line in response_lines])
+            else:
+                response_lines = [json.dumps({"response": fragment}) for fragment in ("ollama:", request_data["prompt"])]
+                response_lines.append(json.dumps({"response": "", "done": True, "context": [1, 2, 3]}))
+                self.send_streamed_lines("application/x-ndjson", [line + "\n" for line in response_lines])
+        finally:
+            with server.counter_lock:
+                server.active_requests -= 1
+
+    def send_streamed_lines(self, content_type, response_lines):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for response_line in response_lines:
+            encoded_line = response_line.encode("utf-8")
+            self.wfile.write(f"{len(encoded_line):x}\r\n".encode("ascii") + encoded_line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLanguageModelHandler)
+    server.daemon_threads = True
+    server.counter_lock = threading.Lock()
+    server.active_requests = 0
+    server.peak_active_requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def async_client(application):
+    client = application.AsyncLanguageModelApiClient(
+        provider_concurrency={application.API_PROVIDER_BIGMODEL: 2, application.API_PROVIDER_OLLAMA: 1})
+    yield client
+    client.shutdown()
+
+
+def chat_request(application, mock_server, prompt):
+    return {
+        "provider": application.API_PROVIDER_BIGMODEL,
+        "model_name": "mock-model",
+        "base_url": f"http://127.0.0.1:{mock_server.server_address[1]}/",
+        "api_key": "test-key",
+        "conversation_context": [
+            {"role": "user", "format": "pr", "message": prompt},
+            {"role": "interpreter", "format": "re/int", "message": "not sent to the provider"},
+        ],
+    }
+
+
+def test_stream_prompt_sync_yields_parsed_fragments(application, mock_server, async_client):
+    fragments = list(async_client.stream_prompt_sync(**chat_request(application, mock_server, "hello")))
+    assert fragments == ["echo:", " ", "hello"]
+    assert async_client.get_statistics()["failures"] == 0
+
+
+def test_ollama_lines_report_context(application, mock_server, async_client):
+    reported_contexts = []
+    fragments = list(async_client.stream_prompt_sync(
+        provider=application.API_PROVIDER_OLLAMA, model_name="mock-model", user_prompt="hi",
+        base_url=f"http://127.0.0.1:{mock_server.server_address[1]}/api/generate",
+        context_callback=reported_contexts.append))
+    assert fragments == ["ollama:", "hi"]
+    assert reported_contexts == [[1, 2, 3]]
+
+
+def test_complete_many_respects_provider_limit(application, mock_server, async_client):
+    prompt_requests = [chat_request(application, mock_server, f"prompt {index}") for index in range(6)]
+    start_time = time.monotonic()
+    responses = async_client.complete_many_sync(prompt_requests)
+    elapsed_time = time.monotonic() - start_time
+
+    assert responses == [f"echo: prompt {index}" for index in range(6)]
+    assert mock_server.peak_active_requests == 2
+    assert async_client.get_statistics()["peak_active_requests"] == 2
+    # Six requests two at a time take three rounds, not one or six
+    assert 3 * RESPONSE_DELAY_S <= elapsed_time < 6 * RESPONSE_DELAY_S
+
+
+def test_failed_request_is_raised_and_counted(application, async_client):
+    prompt_request = {
+        "provider": application.API_PROVIDER_BIGMODEL, "model_name": "mock-model",
+        "base_url": "http://127.0.0.1:9/", "api_key": "test-key", "conversation_context": [],
+    }
+    with pytest.raises(Exception):
+        list(async_client.stream_prompt_sync(**prompt_request))
+    assert async_client.get_statistics()["failures"] == 1
@@ -0,0 +1,96 @@
+"""Ordering guarantees of the background conversation writer."""
+
+import json
+import threading
+import time
+
+import pytest
+
+
+class RecordingSink:
+    """Storage stand-in that records log batches and can hold the writer back."""
+
+    def __init__(self):
+        self.log_records = []
+        self.write_allowed = threading.Event()
+        self.write_allowed.set()
+
+    def write_log_batch(self, log_records, conversation_id=None):
+        self.write_allowed.wait()
+        self.log_records.extend((conversation_id, log_record) for log_record in log_records)
+
+    def write_content_batch(self, content_files):
+        pass
+
+
+@pytest.fixture
+def conversation_writer(application, monkeypatch):
+    writer = application.BackgroundConversationWriter(flush_interval_seconds=0.05)
+    monkeypatch.setattr(application, "get_conversation_writer", lambda: writer)
+    yield writer
+    writer.shutdown()
+
+
+def read_log_entries(log_file_path):
+    with open(log_file_path, encoding="utf-8") as log_file:
+        return [log_record["entry"] for log_record in map(json.loads, log_file) if log_record["record"] == "entry"]
+
+
+def test_queued_records_stay_with_their_conversation(application, conversation_writer, tmp_path, monkeypatch):
+    # Conversation logs are written below the working directory
+    monkeypatch.chdir(tmp_path)
+    storage = application.ConversationDataStorage()
+    storage.set_background_writes(True)
+
+    storage.create_new_conversation("First")
+    first_log_file = storage.conversation_log_file
+    for prompt_index in range(50):
+        storage.record_user_prompt(f"first {prompt_index}")
+    storage.create_new_conversation("Second")
+    storage.record_user_prompt("second 0")
+    assert conversation_writer.flush()
+    storage.close_log_file()
+
+    first_entries = read_log_entries(first_log_file)
+    assert [entry["user_prompt"] for entry in first_entries if "user_prompt" in entry] == [
+        f"first {prompt_index}" for prompt_index in range(50)]
+    assert [entry["message_id"] for entry in first_entries] == list(range(51))
+    second_entries = read_log_entries(storage.conversation_log_file)
+    assert [entry.get("init_message", entry.get("user_prompt")) for entry in second_entries] == ["Second", "second 0"]
+
+
+def test_full_queue_applies_backpressure_in_order(application):
+    writer = application.BackgroundConversationWriter(max_queue_size=2, batch_size=2, flush_interval_seconds=0.01)
+    storage_sink = RecordingSink()
+    storage_sink.write_allowed.clear()
+
+    def submit_records():
+        for record_index in range(20):
+            writer.submit("log", storage_sink, ("conversation", record_index), timeout_seconds=0.05)
+
+    producer_thread = threading.Thread(target=submit_records)
+    producer_thread.start()
+    time.sleep(0.3)
+    storage_sink.write_allowed.set()
+    producer_thread.join()
+    assert writer.flush()
+    writer.shutdown()
+
+    assert [log_record for _, log_record in storage_sink.log_records] == list(range(20))
+    writer_statistics = writer.get_statistics()
+    assert writer_statistics["backpressure_waits"] > 0
+    assert writer_statistics["synchronous_writes"] == 0
+
+
+def test_stopped_writer_writes_leftover_records_first(application):
+    writer = application.BackgroundConversationWriter()
+    writer.shutdown()
+    storage_sink = RecordingSink()
+    # Records that reached the queue just as the writer stopped
+    for record_index in range(2):
+        writer.write_queue.put(("log", storage_sink, ("conversation", record_index), time.perf_counter_ns()))
+
+    writer.submit("log", storage_sink, ("conversation", 2))
+    assert writer.flush()
+    assert [log_record for _, log_record in storage_sink.log_records] == [0, 1, 2]
+    assert writer.get_statistics()["synchronous_writes"] == 3
@@ -0,0 +1,86 @@
+"""Append-only JSON Lines conversation logs and their export to the three-section document."""
+
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def storage(application, tmp_path, monkeypatch):
+    # Conversation logs are written below the working directory
+    monkeypatch.chdir(tmp_path)
+    conversation_storage = application.ConversationDataStorage()
+    conversation_storage.create_new_conversation("Welcome")
+    yield conversation_storage
+    conversation_storage.close_log_file()
+
+
+def record_sample_turn(storage):
+    storage.record_language_model_configuration("Ollama - llama3", {"temperature": 0.2})
+    storage.record_interpreter_configuration("PlantUML", {"Output format": "SVG"})
+    storage.record_user_prompt("Draw an order system")
+    storage.record_language_model_response("Here is the diagram", 2_000_000_000)
+    storage.record_interpreter_input("@startuml\nclass Order\n@enduml")
+    storage.record_interpreter_output("<svg>Order</svg>", 500_000_000)
+
+
+def test_log_is_a_header_followed_by_entry_records(storage):
+    record_sample_turn(storage)
+    storage.close_log_file()
+
+    with open(storage.conversation_log_file, encoding="utf-8") as log_file:
+        log_records = [json.loads(log_line) for log_line in log_file]
+    assert log_records[0]["record"] == "header"
+    assert log_records[0]["conversation_id"] == storage.conversation_identifier
+    assert {log_record["record"] for log_record in log_records[1:]} == {"entry"}
+
+
+def test_export_round_trip(application, storage):
+    record_sample_turn(storage)
+    storage.close_log_file()
+
+    exported_path = application.ConversationDataStorage.export_conversation_log(storage.conversation_log_file)
+    with open(exported_path, encoding="utf-8") as exported_file:
+        log_document = json.load(exported_file)
+
+    assert exported_path == os.path.splitext(storage.conversation_log_file)[0] + ".json"
+    assert [entry["llm"] for entry in log_document["llm_configurations"]] == ["Ollama - llama3"]
+    assert [entry["interpreter"] for entry in log_document["int_configurations"]] == ["PlantUML"]
+    assert log_document["conversation"] == [
+        {"timestamp": log_document["conversation"][0]["timestamp"], "message_id": 0, "init_message": "Welcome"},
+        {"timestamp": log_document["conversation"][1]["timestamp"], "message_id": 1,
+         "user_prompt": "Draw an order system"},
+        {"timestamp": log_document["conversation"][2]["timestamp"], "message_id": 2, "execution_duration_s": 2.0,
+         "llm_response": "Here is the diagram"},
+        {"timestamp": log_document["conversation"][3]["timestamp"], "message_id": 3,
+         "int_input": "@startuml\nclass Order\n@enduml"},
+        {"timestamp": log_document["conversation"][4]["timestamp"], "message_id": 4, "execution_duration_s": 0.5,
+         "int_output": "<svg>Order</svg>"},
+    ]
+
+
+def test_export_skips_a_torn_last_line(application, storage, tmp_path):
+    record_sample_turn(storage)
+    storage.close_log_file()
+    with open(storage.conversation_log_file, "a", encoding="utf-8") as log_file:
+        log_file.write('{"record": "entry", "section": "conversation", "entry": {"message_id": 5, "user_pro')
+
+    exported_path = application.ConversationDataStorage.export_conversation_log(
+        storage.conversation_log_file, str(tmp_path / "export.json"))
+    with open(exported_path, encoding="utf-8") as exported_file:
+        log_document = json.load(exported_file)
+    assert [entry["message_id"] for entry in log_document["conversation"]] == [0, 1, 2, 3, 4]
+
+
+def test_export_rejects_a_corrupt_line_before_the_end(application, storage):
+    record_sample_turn(storage)
+    storage.close_log_file()
+    with open(storage.conversation_log_file, encoding="utf-8") as log_file:
+        log_lines = log_file.read().splitlines()
+    log_lines[2] = log_lines[2][:10]
+    with open(storage.conversation_log_file, "w", encoding="utf-8") as log_file:
+        log_file.write("\n".join(log_lines) + "\n")
+
+    with pytest.raises(json.JSONDecodeError):
+        application.ConversationDataStorage.export_conversation_log(storage.conversation_log_file)
@@ -0,0 +1,102 @@
+"""Retention sweeps of the conversation log directory."""
+
+import os
+import time
+
+import pytest
+
+DAY_S = 86400
+
+
+def set_age(directory_path, age_seconds):
+    modification_time = time.time() - age_seconds
+    for walk_directory, _, file_names in os.walk(directory_path):
+        for file_name in file_names:
+            os.utime(os.path.join(walk_directory, file_name), (modification_time, modification_time))
+
+
+@pytest.fixture
+def log_root(tmp_path):
+    return tmp_path / "logs"
+
+
+@pytest.fixture
+def blob_store(application, log_root, monkeypatch):
+    artifact_blob_store = application.ContentAddressedBlobStore(str(log_root / "blobs"))
+    monkeypatch.setattr(application, "get_artifact_blob_store", lambda: artifact_blob_store)
+    return artifact_blob_store
+
+
+def record_conversation(storage, diagram_output):
+    storage.create_new_conversation("Welcome")
+    storage.record_user_prompt("Draw it")
+    storage.record_interpreter_output(diagram_output, 1_000_000)
+    storage.close_log_file()
+    return storage.log_directory
+
+
+def create_storage(application, log_root):
+    storage = application.ConversationDataStorage()
+    storage.log_root_directory = str(log_root)
+    storage.deduplicate_artifacts = True
+    return storage
+
+
+def test_sweep_skips_open_conversations_and_new_blobs(application, log_root, blob_store):
+    closed_storage = create_storage(application, log_root)
+    closed_directory = record_conversation(closed_storage, "<svg>closed</svg>")
+    closed_storage.create_new_conversation("Next")
+    open_storage = create_storage(application, log_root)
+    open_directory = record_conversation(open_storage, "<svg>open</svg>")
+    set_age(closed_directory, 40 * DAY_S)
+    set_age(open_directory, 40 * DAY_S)
+    set_age(str(log_root / "blobs"), 2 * DAY_S)
+    # Stored moments ago by a record that may not be in any log yet
+    new_digest = blob_store.store("<svg>not yet referenced</svg>")
+
+    retention_manager = application.ConversationRetentionManager(
+        str(log_root), str(log_root / "blobs"), max_age_seconds=30 * DAY_S)
+    retention_manager.sweep()
+
+    assert not os.path.exists(closed_directory)
+    assert os.path.exists(open_directory)
+    assert blob_store.load(blob_store.compute_digest("<svg>closed</svg>")) is None
+    assert blob_store.load(blob_store.compute_digest("<svg>open</svg>")) == "<svg>open</svg>"
+    assert blob_store.load(new_digest) == "<svg>not yet referenced</svg>"
+    assert retention_manager.get_statistics()["expired_conversations"] == 1
+
+
+def test_deduplicated_store_refreshes_the_blob(application, blob_store):
+    content_digest = blob_store.store("<svg>shared</svg>")
+    blob_path = blob_store.find_blob(content_digest)[0]
+    os.utime(blob_path, (0, 0))
+
+    blob_store.store("<svg>shared</svg>")
+    assert time.time() - os.path.getmtime(blob_path) < 60
+    assert blob_store.get_statistics()["deduplicated"] == 1
+
+
+def test_global_cap_counts_blobs_and_stops_once_under(application, log_root, blob_store):
+    storage = create_storage(application, log_root)
+    conversation_directories = [record_conversation(storage, f"<svg>{index}</svg>" + "y" * 200_000)
+                                for index in range(3)]
+    storage.create_new_conversation("Idle")
+    for age_days, directory_path in zip((5, 4, 3), conversation_directories):
+        set_age(directory_path, age_days * DAY_S)
+    set_age(str(log_root / "blobs"), 5 * DAY_S)
+
+    total_bytes = sum(os.path.getsize(os.path.join(walk_directory, file_name))
+                      for walk_directory, _, file_names in os.walk(log_root) for file_name in file_names)
+    largest_blob_bytes = max(os.path.getsize(os.path.join(walk_directory, file_name))
+                             for walk_directory, _, file_names in os.walk(log_root / "blobs") for file_name in file_names)
+    retention_manager = application.ConversationRetentionManager(
+        str(log_root), str(log_root / "blobs"), max_total_bytes=total_bytes - largest_blob_bytes,
+        max_age_seconds=30 * DAY_S)
+    retention_manager.sweep()
+
+    # The oldest conversation and the blob only it references are enough
+    assert [os.path.exists(directory_path) for directory_path in conversation_directories] == [False, True, True]
+    retention_statistics = retention_manager.get_statistics()
+    assert retention_statistics["evicted_conversations"] == 1
+    assert retention_statistics["deleted_blobs"] == 1
+    assert retention_statistics["managed_bytes"] <= total_bytes - largest_blob_bytes
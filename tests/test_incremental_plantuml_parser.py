@@ -0,0 +1,94 @@
+"""Randomized equivalence of incremental re-parsing and a full parse."""
+
+import random
+
+import pytest
+
+SOURCE_LINE_POOL = [
+    "@startuml",
+    "@enduml",
+    "",
+    "' a comment",
+    "class Order {",
+    "class Customer",
+    'class "Line Item" as LineItem {',
+    "abstract class Shape <<entity>> {",
+    "interface Payable {",
+    "enum Status { NEW }",
+    "class Inline { +id : int }",
+    "  +total() : float",
+    "  -items : List",
+    "  #status : Status",
+    "}",
+    "package billing {",
+    'package "core model" {',
+    "namespace app.domain {",
+    "together {",
+    "Order --> Customer",
+    "Order *-- LineItem : contains",
+    "Customer o-- Order",
+    "Order ..|> Payable",
+    "Shape <|-- Order",
+    "Order ..> Status : uses",
+    'Customer "1" -- "*" Order',
+]
+
+
+def describe_model(diagram_model):
+    """Return a comparable description of everything a projection can read from a model."""
+    return {
+        "classifiers": [
+            (classifier.name, classifier.kind, classifier.display_name, classifier.stereotype, classifier.package,
+             [(member.text, member.visibility, member.is_method) for member in classifier.members])
+            for classifier in diagram_model.classifiers.values()
+        ],
+        "relationships": [
+            (relationship.source, relationship.target, relationship.kind, relationship.label, relationship.source_line)
+            for relationship in diagram_model.relationships
+        ],
+        "packages": [
+            (package.name, package.parent.name if package.parent else None, list(package.classifier_names))
+            for package in diagram_model.packages.values()
+        ],
+        "segments": [(segment.line_count, segment.package_path) for segment in diagram_model.segments],
+        "segment_starts": list(diagram_model.segment_starts),
+        "source_lines": list(diagram_model.source_lines),
+    }
+
+
+def apply_random_edit(random_generator, source_lines):
+    """Insert, delete or replace a short run of lines at a random position; a buffer always has a line."""
+    edited_lines = list(source_lines)
+    edit_position = random_generator.randint(0, len(edited_lines))
+    edit_kind = random_generator.choice(("insert", "delete", "replace"))
+    run_length = random_generator.randint(1, 3)
+    new_lines = [random_generator.choice(SOURCE_LINE_POOL) for _ in range(run_length)]
+    if edit_kind == "insert" or not edited_lines:
+        edited_lines[edit_position:edit_position] = new_lines
+    elif edit_kind == "delete":
+        del edited_lines[edit_position:edit_position + run_length]
+    else:
+        edited_lines[edit_position:edit_position + run_length] = new_lines
+    return edited_lines or [""]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reparse_matches_full_parse_after_random_edits(application, seed):
+    random_generator = random.Random(seed)
+    diagram_parser = application.PlantUMLParser()
+    source_lines = [random_generator.choice(SOURCE_LINE_POOL) for _ in range(random_generator.randint(1, 30))]
+    diagram_model = diagram_parser.parse("\n".join(source_lines))
+
+    for _ in range(250):
+        source_lines = apply_random_edit(random_generator, source_lines)
+        diagram_model = diagram_parser.reparse(diagram_model, source_lines)
+        assert describe_model(diagram_model) == describe_model(diagram_parser.parse("\n".join(source_lines)))
+
+
+def test_editor_parser_counts_incremental_updates(application):
+    editor_parser = application.IncrementalPlantUMLParser()
+    editor_parser.update("@startuml\nclass A\n@enduml")
+    editor_parser.update("@startuml\nclass A\nclass B\n@enduml")
+    editor_parser.update("@startuml\nclass A\nclass B\n@enduml")
+    assert editor_parser.statistics == {"full_parses": 1, "incremental_parses": 1, "unchanged": 1}
+    assert list(editor_parser.diagram_model.classifiers) == ["A", "B"]
@@ -0,0 +1,144 @@
+"""Golden cases for the PlantUML syntax corrector."""
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def corrector(application):
+    return application.PlantUMLSyntaxCorrector()
+
+
+GOLDEN_CASES = [
+    (
+        "labeled_inheritance",
+        '@startuml\nclass Car <-(Vehicle) : "is a" {\n  +drive()\n}\n@enduml',
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed labeled inheritance: 'class Car <-(Vehicle) : \"is a\"' → 'class Car' with 'Car --|> Vehicle : \"is a\"'",
+            "",
+            "class Car {",
+            "  +drive()",
+            "}",
+            "",
+            'Car --|> Vehicle : "is a"',
+            "@enduml",
+        ]),
+    ),
+    (
+        "inheritance",
+        "@startuml\nclass Dog <-(Animal) {\n}\nclass Cat <-(Animal) {\n}\n@enduml",
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed inheritance syntax: 'class Dog <-(Animal)' → 'class Dog' with 'Dog --|> Animal'",
+            "' Fixed inheritance syntax: 'class Cat <-(Animal)' → 'class Cat' with 'Cat --|> Animal'",
+            "",
+            "class Dog {",
+            "}",
+            "class Cat {",
+            "}",
+            "",
+            "Dog --|> Animal",
+            "",
+            "Cat --|> Animal",
+            "@enduml",
+        ]),
+    ),
+    (
+        "upright_instance",
+        '@startuml\nUser admin :upright: "Administrator" as adm\n@enduml',
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed instance declaration: 'User admin :upright: \"Administrator\" as adm' → 'User \"Administrator\" as adm'",
+            "",
+            'User "Administrator" as adm',
+            "@enduml",
+        ]),
+    ),
+    (
+        "upright_relationships",
+        "@startuml\nOrder o1 :upright -> Customer :is\nA -upright: B\n@enduml",
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed relationship arrow: 'Order oN :upright -> Customer :is' → 'Order --> Customer'",
+            "' Fixed upright relationship: 'A -upright: B' → 'A --> B'",
+            "",
+            "Order --> Customer",
+            "A --> B",
+            "@enduml",
+        ]),
+    ),
+    (
+        "prefix_braces_and_directives",
+        "plantuml\n\nclass Box <-(Shape) {\n",
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed inheritance syntax: 'class Box <-(Shape)' → 'class Box' with 'Box --|> Shape'",
+            "' Added 1 missing closing braces '}'",
+            "' Added missing @startuml directive",
+            "' Added missing @enduml directive",
+            "",
+            "class Box {",
+            "",
+            "Box --|> Shape",
+            "}",
+            "",
+            "@enduml",
+        ]),
+    ),
+    (
+        "already_valid",
+        "@startuml\nclass A\nA --> B\n@enduml",
+        "@startuml\nclass A\nA --> B\n@enduml",
+    ),
+    # Labels are no longer pasted into a regex, so regex metacharacters are corrected like any other label
+    (
+        "label_with_regex_metacharacters",
+        '@startuml\nclass Car <-(Vehicle) : "a+b (v2)" {\n}\n@enduml',
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed labeled inheritance: 'class Car <-(Vehicle) : \"a+b (v2)\"' → 'class Car' with 'Car --|> Vehicle : \"a+b (v2)\"'",
+            "",
+            "class Car {",
+            "}",
+            "",
+            'Car --|> Vehicle : "a+b (v2)"',
+            "@enduml",
+        ]),
+    ),
+    # Nor into a replacement string, so backslashes are kept verbatim
+    (
+        "label_with_backslashes",
+        '@startuml\nUser admin :upright: "C:\\temp\\x" as adm\n@enduml',
+        "\n".join([
+            "@startuml",
+            "",
+            "' Fixed instance declaration: 'User admin :upright: \"C:\\temp\\x\" as adm' → 'User \"C:\\temp\\x\" as adm'",
+            "",
+            'User "C:\\temp\\x" as adm',
+            "@enduml",
+        ]),
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "diagram_code, expected_code",
+    [(diagram_code, expected_code) for _, diagram_code, expected_code in GOLDEN_CASES],
+    ids=[case_name for case_name, _, _ in GOLDEN_CASES],
+)
+def test_format_plantuml_code_matches_golden(corrector, diagram_code, expected_code):
+    assert corrector.format_plantuml_code(diagram_code) == expected_code
+
+
+def test_disabled_rule_is_skipped(corrector):
+    corrector.set_rule_enabled("upright_relationship", False)
+    try:
+        assert corrector.format_plantuml_code("@startuml\nA -upright: B\n@enduml") == "@startuml\nA -upright: B\n@enduml"
+    finally:
+        corrector.set_rule_enabled("upright_relationship", True)
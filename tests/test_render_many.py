@@ -0,0 +1,108 @@
+"""Batch rendering through UMLDiagramGenerationApp.render_many."""
+
+import threading
+
+import pytest
+
+
+class FakeWorkerPool:
+    """Stands in for the local PlantUML worker pool and fails on diagrams that mention a failure."""
+
+    def __init__(self):
+        self.active_renders = 0
+        self.peak_active_renders = 0
+        self.render_lock = threading.Lock()
+        self.release_renders = threading.Event()
+
+    def render(self, diagram_code):
+        with self.render_lock:
+            self.active_renders += 1
+            self.peak_active_renders = max(self.peak_active_renders, self.active_renders)
+        try:
+            self.release_renders.wait(1)
+            if "timeout" in diagram_code:
+                raise TimeoutError()
+            if "broken" in diagram_code:
+                raise ValueError("Syntax error in line 2")
+            return f"<svg>{diagram_code.count(chr(10))}</svg>".encode("utf-8")
+        finally:
+            with self.render_lock:
+                self.active_renders -= 1
+
+
+class RecordingConversationStore:
+    def __init__(self):
+        self.recorded_entries = []
+
+    def record_interpreter_input(self, processed_code):
+        self.recorded_entries.append(("input", processed_code))
+
+    def record_interpreter_output(self, rendering_output, execution_duration):
+        self.recorded_entries.append(("output", rendering_output))
+
+
+@pytest.fixture
+def worker_pool(application, monkeypatch):
+    fake_worker_pool = FakeWorkerPool()
+    monkeypatch.setattr(application, "get_local_plantuml_worker_pool", lambda *pool_settings: fake_worker_pool)
+    return fake_worker_pool
+
+
+@pytest.fixture
+def batch_application(application, worker_pool):
+    application_instance = application.UMLDiagramGenerationApp()
+    application_instance.conversation_store = RecordingConversationStore()
+    application_instance.active_interpreter = application.INTERPRETER_LOCAL_PLANTUML
+    application_instance.diagram_interpreter.initialize_interpreter(
+        application.INTERPRETER_LOCAL_PLANTUML, {"Output format": "SVG", "Use cache": False})
+    return application_instance
+
+
+def test_render_many_reports_each_failure_in_input_order(batch_application, worker_pool):
+    worker_pool.release_renders.set()
+    diagram_codes = [
+        "class Order\nclass Customer",
+        "class broken",
+        "class Invoice",
+        "class timeout",
+    ]
+
+    batch_results = batch_application.render_many(diagram_codes, max_workers=2)
+
+    assert [batch_result["index"] for batch_result in batch_results] == [0, 1, 2, 3]
+    assert [batch_result["diagram_code"] for batch_result in batch_results] == diagram_codes
+    assert batch_results[0]["error"] is None and batch_results[0]["output"].startswith("<svg>")
+    assert batch_results[1]["error"] == "Syntax error in line 2" and batch_results[1]["output"] is None
+    assert batch_results[2]["error"] is None and batch_results[2]["output"].startswith("<svg>")
+    assert batch_results[3]["error"] == "TimeoutError"
+    # Only successful renders are logged, in input order
+    recorded_outputs = [
+        entry_value for entry_kind, entry_value in batch_application.conversation_store.recorded_entries
+        if entry_kind == "output"
+    ]
+    assert recorded_outputs == [batch_results[0]["output"], batch_results[2]["output"]]
+
+
+def test_render_many_bounds_concurrency(batch_application, worker_pool):
+    threading.Timer(0.2, worker_pool.release_renders.set).start()
+
+    batch_results = batch_application.render_many([f"class Item{index}" for index in range(6)], max_workers=3)
+
+    assert all(batch_result["error"] is None for batch_result in batch_results)
+    assert worker_pool.peak_active_renders == 3
+
+
+def test_render_many_without_interpreter(batch_application, application):
+    batch_application.active_interpreter = application.INTERPRETER_SELECTION_PLACEHOLDER
+
+    batch_results = batch_application.render_many(["class Order"])
+
+    assert batch_results[0]["error"] == "No diagram interpreter selected"
+
+
+def test_single_render_still_returns_none_on_failure(batch_application, worker_pool):
+    worker_pool.release_renders.set()
+
+    processed_code, rendering_output = batch_application.diagram_interpreter.execute_diagram_generation("class broken")
+
+    assert rendering_output is None
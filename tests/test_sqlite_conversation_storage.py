@@ -0,0 +1,61 @@
+"""Search and replay of the SQLite conversation store, including blob-backed rows."""
+
+import pytest
+
+DIAGRAM_CODE = "@startuml\nclass Invoice\nInvoice --> Customer\n@enduml"
+
+
+@pytest.fixture(params=["fts", "like"])
+def storage(application, tmp_path, request, monkeypatch):
+    # Diagram code was deduplicated by earlier versions, so databases still hold such rows
+    monkeypatch.setattr(application, "ARTIFACT_DEDUPLICATED_FIELDS", ("int_input", "int_output"))
+    conversation_storage = application.SQLiteConversationDataStorage(str(tmp_path / "conversations.sqlite3"))
+    conversation_storage.log_root_directory = str(tmp_path)
+    conversation_storage.deduplicate_artifacts = True
+    conversation_storage.create_new_conversation("Welcome")
+    conversation_storage.record_user_prompt("Model 100% of the invoices")
+    conversation_storage.record_interpreter_input(DIAGRAM_CODE)
+    conversation_storage.record_interpreter_output("<svg>Invoice</svg>", 1_000_000)
+    if request.param == "like":
+        conversation_storage.full_text_search_available = False
+    elif not conversation_storage.full_text_search_available:
+        pytest.skip("SQLite was built without FTS5")
+    return conversation_storage
+
+
+def test_diagram_code_is_stored_as_a_blob(storage):
+    content, blob_digest = storage.database_connection.execute(
+        "SELECT content, blob_digest FROM messages WHERE kind = 'int_input'").fetchone()
+    assert content is None
+    assert blob_digest is not None
+
+
+def test_search_finds_blob_backed_diagram_code(storage):
+    matching_messages = storage.search_messages("Invoice --> Customer")
+    assert [(message["kind"], message["content"]) for message in matching_messages] == [("int_input", DIAGRAM_CODE)]
+
+
+def test_search_finds_inline_prompts(storage):
+    matching_messages = storage.search_messages("invoices")
+    assert [(message["kind"], message["content"]) for message in matching_messages] == [
+        ("user_prompt", "Model 100% of the invoices")]
+
+
+def test_search_without_a_match_is_empty(storage):
+    assert storage.search_messages("Shipment") == []
+    assert storage.search_messages("since", since_timestamp=2 ** 40) == []
+
+
+def test_like_search_treats_wildcards_literally(storage):
+    if storage.full_text_search_available:
+        pytest.skip("FTS5 queries are phrases, not patterns")
+    assert [message["kind"] for message in storage.search_messages("100%")] == ["user_prompt"]
+    assert storage.search_messages("1_0") == []
+
+
+def test_replay_resolves_blobs(storage):
+    conversation_messages = storage.get_conversation_messages(storage.conversation_identifier)
+    assert [message["kind"] for message in conversation_messages] == [
+        "init_message", "user_prompt", "int_input", "int_output"]
+    assert conversation_messages[2]["content"] == DIAGRAM_CODE
+    assert conversation_messages[3]["content"] == "<svg>Invoice</svg>"